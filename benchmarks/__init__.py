@@ -0,0 +1,4 @@
+# ****************************************************************
+# benchmarks - synthetic crash data and timing scripts, run from the repo root
+# python -m benchmarks.bench_suite --rows 100000 1000000 5000000
+# ****************************************************************
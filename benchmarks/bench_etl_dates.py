@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# run from the repo root or from benchmarks/ - either way modules/ should be importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from modules.etl import const_crash_date_format, etl_crash_data
+
+
+# ****************************************************************
+# datetime parsing and calendar fields: the previous etl code against the vectorized path
+# python benchmarks/bench_etl_dates.py --rows 1000000 5000000
+# ****************************************************************
+
+def make_crash_dates(rows: int, seed: int = 521) -> pd.Series:
+    """
+    Builds export style CRASH_DATE strings spread over 2015 - 2025.
+    Args:
+        rows (int): Number of timestamps
+        seed (int): Random seed so runs are comparable
+    Returns:
+        A series of 'MM/DD/YYYY HH:MM:SS AM' strings
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2015-01-01').value // 10 ** 9
+    end = pd.Timestamp('2025-03-19').value // 10 ** 9
+    seconds = rng.integers(start, end, rows)
+    return pd.Series(pd.to_datetime(seconds, unit='s').strftime(const_crash_date_format))
+
+
+def previous_calendar_fields(dates: pd.Series) -> pd.DataFrame:
+    """
+    The calendar derivation etl_crash_data used to do.
+    """
+    df = pd.DataFrame({'CRASH_DATE': dates})
+    df['CRASH_DATE'] = pd.to_datetime(df['CRASH_DATE'], format=const_crash_date_format)
+    df['CRASH_YEAR'] = df['CRASH_DATE'].dt.year
+    df['CRASH_YEAR'] = df['CRASH_DATE'].dt.year
+    df['CRASH_DAY_NAME'] = df['CRASH_DATE'].dt.day_name()
+    df['CRASH_MONTH_NAME'] = df['CRASH_DATE'].dt.month_name()
+    return df
+
+
+def vectorized_calendar_fields(dates: pd.Series) -> pd.DataFrame:
+    """
+    The calendar derivation etl_crash_data does now - the function itself, on a frame of only the dates.
+    """
+    return etl_crash_data(pd.DataFrame({'CRASH_DATE': dates}))
+
+
+def best_of(func, dates: pd.Series, repeat: int) -> float:
+    """
+    Runs func on a fresh copy of the dates repeat times and keeps the fastest wall time.
+    """
+    timings = []
+    for _ in range(repeat):
+        copy = dates.copy()
+        start = time.perf_counter()
+        func(copy)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CRASH_DATE parsing and calendar fields')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 5_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'previous (s)':>14} {'vectorized (s)':>16} {'speedup':>9}")
+    for rows in args.rows:
+        dates = make_crash_dates(rows)
+
+        # both paths have to agree before their timings mean anything
+        previous = previous_calendar_fields(dates)
+        vectorized = vectorized_calendar_fields(dates)
+        assert (previous['CRASH_DATE'].values == vectorized['CRASH_DATE'].values.astype(previous['CRASH_DATE'].dtype)).all()
+        assert (previous['CRASH_DAY_NAME'] == vectorized['CRASH_DAY_NAME'].astype(str)).all()
+        assert (previous['CRASH_MONTH_NAME'] == vectorized['CRASH_MONTH_NAME'].astype(str)).all()
+
+        previous_time = best_of(previous_calendar_fields, dates, args.repeat)
+        vectorized_time = best_of(vectorized_calendar_fields, dates, args.repeat)
+        print(f"{rows:>10,} {previous_time:>14.3f} {vectorized_time:>16.3f} {previous_time / vectorized_time:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+# ****************************************************************
+# import time of the crash modules in a fresh interpreter each run, and a check that
+# loading and etl (and the plain import of reusable) pull in no plotting, widget or http library
+# python -m benchmarks.bench_import --repeat 5 --max-seconds 2
+# ****************************************************************
+
+const_repo_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# what an import may not load - these come in on the first plot, widget or download
+const_deferred_modules = ['matplotlib', 'seaborn', 'scipy', 'panel', 'ipywidgets', 'IPython', 'requests', 'bokeh']
+
+# measured statements, by name - the last one is what the notebook paid before the imports were deferred
+const_import_statements = {
+    'modules.etl': 'import modules.etl',
+    'modules.reusable': 'import modules.reusable',
+    'from modules.reusable import *': 'from modules.reusable import *',
+    'first plot (reusable + matplotlib + seaborn)':
+        'import modules.reusable as r; r.plt.figure; r.sns.barplot',
+    'eager libraries': 'import matplotlib.pyplot, seaborn, scipy.stats, panel, ipywidgets, IPython.display, requests',
+}
+
+# run in the child: time the statement, then report which deferred modules it loaded
+const_probe = '''
+import sys, time, json
+start = time.perf_counter()
+exec({statement!r})
+seconds = time.perf_counter() - start
+loaded = sorted({{name.split('.')[0] for name in sys.modules}} & set({deferred!r}))
+print(json.dumps({{'seconds': seconds, 'loaded': loaded}}))
+'''
+
+
+def time_import(statement: str) -> dict:
+    """
+    Runs one import statement in a new interpreter started from the repo root.
+    Args:
+        statement (str): Python statement to time
+    Returns:
+        A dictionary with the seconds it took and the deferred modules it loaded
+    """
+    code = const_probe.format(statement=statement, deferred=const_deferred_modules)
+    # the interpreter start itself is not counted, only the statement
+    output = subprocess.run([sys.executable, '-c', code], cwd=const_repo_root, capture_output=True, text=True,
+                            check=True, env={**os.environ, 'MPLBACKEND': 'Agg'})
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def run_imports(repeat: int = 5) -> list:
+    """
+    Times every statement in const_import_statements, keeping the fastest of repeat fresh runs.
+    Returns:
+        A list of result dictionaries (name, seconds, loaded)
+    """
+    results = []
+    for name, statement in const_import_statements.items():
+        runs = [time_import(statement) for _ in range(repeat)]
+        best = min(runs, key=lambda run: run['seconds'])
+        results.append({'name': name, 'seconds': best['seconds'], 'loaded': best['loaded']})
+        print(f"{name:<48} {best['seconds']:>8.3f}s  {', '.join(best['loaded']) or '-'}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the import of the crash modules')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, help='fail when importing modules.reusable takes longer')
+    parser.add_argument('--output', help='json file receiving the results')
+    args = parser.parse_args()
+
+    results = run_imports(args.repeat)
+    by_name = {result['name']: result for result in results}
+
+    # the plain imports must stay free of the deferred libraries
+    failures = [f"{name} loaded {', '.join(by_name[name]['loaded'])}"
+                for name in ('modules.etl', 'modules.reusable', 'from modules.reusable import *')
+                if by_name[name]['loaded']]
+    if args.max_seconds is not None and by_name['modules.reusable']['seconds'] > args.max_seconds:
+        failures.append(f"modules.reusable took {by_name['modules.reusable']['seconds']:.3f}s, "
+                        f"more than {args.max_seconds}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results, 'failures': failures}, f, indent=2)
+        print(f'results written to {args.output}')
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+
+    # non zero exit so a scripted run notices an eager import creeping back in
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')
+
+# run from the repo root or from benchmarks/ - either way modules/ should be importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.synthetic import write_crash_csv
+from modules.etl import get_chicago_crash_data
+from modules.cube import CrashCube
+from modules.rendercache import render_figure
+from modules.reusable import create_dashboard
+from modules.scheduler import RenderScheduler, const_render_debounce
+
+
+# ****************************************************************
+# a slider dragged across the injury counts: every step drawn in turn (the old widget
+# callbacks) against the background scheduler, timed until the last step is on screen
+# python benchmarks/bench_scheduler.py --rows 1000000 --steps 10 --interval 0.05
+# ****************************************************************
+
+def drag_synchronous(df, cube: CrashCube, year: int, steps: int) -> dict:
+    """
+    Every slider value drawn before the next one is taken, as interactive_output does.
+    """
+    start = time.perf_counter()
+    for minimalinjury in range(steps):
+        render_figure(create_dashboard, df, year=year, minimalinjury=minimalinjury, cube=cube)
+    return {'latest_shown': time.perf_counter() - start, 'completed': steps, 'dropped': 0}
+
+
+def drag_scheduled(df, cube: CrashCube, year: int, steps: int, interval: float, debounce: float) -> dict:
+    """
+    The slider values requested interval seconds apart from a scheduler, timed until it has settled.
+    """
+    scheduler = RenderScheduler(debounce=debounce)
+    start = time.perf_counter()
+    for minimalinjury in range(steps):
+        scheduler.request(create_dashboard, df, year=year, minimalinjury=minimalinjury, cube=cube)
+        time.sleep(interval)
+    scheduler.wait()
+    seconds = time.perf_counter() - start
+    stats = scheduler.stats()
+    scheduler.close()
+    return {'latest_shown': seconds, 'completed': stats['completed'], 'dropped': stats['dropped']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time a slider drag with and without the render scheduler')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--steps', type=int, default=10, help='slider values passed through')
+    parser.add_argument('--interval', type=float, default=0.05, help='seconds between slider values')
+    parser.add_argument('--debounce', type=float, default=const_render_debounce)
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'crash-bench'))
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    csvpath = write_crash_csv(args.rows, os.path.join(args.workdir, f'crashes_{args.rows}.csv'))
+    df = get_chicago_crash_data(csvpath, cache_dir=os.path.join(args.workdir, 'cache'))
+    cube = CrashCube.from_frame(df)
+
+    # one render up front so neither side pays for the first import of the plotting libraries
+    render_figure(create_dashboard, df, year=args.year, minimalinjury=0, cube=cube)
+
+    for name, result in (('synchronous', drag_synchronous(df, cube, args.year, args.steps)),
+                         ('scheduled', drag_scheduled(df, cube, args.year, args.steps, args.interval,
+                                                      args.debounce))):
+        print(f"{name:<12} last step shown after {result['latest_shown']:>7.2f}s  "
+              f"completed {result['completed']:>3}  dropped {result['dropped']:>3}")
+
+
+if __name__ == '__main__':
+    main()
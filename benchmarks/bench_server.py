@@ -0,0 +1,111 @@
+import os
+import sys
+import gc
+import time
+import random
+import argparse
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+
+# run from the repo root or from benchmarks/ - either way modules/ should be importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.synthetic import write_crash_csv
+from modules.server import CrashServer, const_server_views, process_memory
+
+
+# ****************************************************************
+# sessions of one server process against memory and latency - the sessions are opened
+# in process, as the server opens one per browser visit, and their widgets are moved
+# the way analysts would; the dataset, cube and render cache are loaded once for all
+# python benchmarks/bench_server.py --rows 1000000 --sessions 1 5 10 25 --changes 5
+# ****************************************************************
+
+def run_sessions(server: CrashServer, count: int, view: str, changes: int, interval: float,
+                 rng: random.Random) -> dict:
+    """
+    Opens count sessions, moves every session's widgets changes times, and closes them again.
+    Returns:
+        A dictionary with the resident memory the open sessions added (freed memory is reused, so small sessions
+        can add next to nothing) and the latencies of their first and last renders
+    """
+    gc.collect()
+    before = process_memory()
+
+    # the first render - from opening the session until it shows
+    start = time.perf_counter()
+    sessions = [server.session(view) for _ in range(count)]
+    first = []
+    for session in sessions:
+        session.scheduler.wait()
+        first.append(time.perf_counter() - start)
+    opened = process_memory()
+
+    # every session changes its widgets at about the same time, as a room full of analysts would
+    years = sessions[0].controls[0].options
+    for _ in range(changes):
+        for session in sessions:
+            session.controls[0].value = rng.choice(years)
+            if len(session.controls) > 1:
+                session.controls[1].value = rng.randint(0, 5)
+        time.sleep(interval)
+
+    # the last change - from the last widget move until its render shows
+    start = time.perf_counter()
+    last = []
+    for session in sessions:
+        session.scheduler.wait()
+        last.append(time.perf_counter() - start)
+
+    stats = server.stats()
+    for session in sessions:
+        server.close_session(session)
+    return {'sessions': count, 'session_bytes': (opened - before) / count, 'rss_bytes': stats['rss_bytes'],
+            'first_p50': float(np.percentile(first, 50)), 'first_max': max(first),
+            'last_p50': float(np.percentile(last, 50)), 'last_p95': float(np.percentile(last, 95)),
+            'last_max': max(last), 'hit_rate': stats['render_cache']['hit_rate']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the multi session server in process')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10, 25])
+    parser.add_argument('--view', choices=list(const_server_views), default='dashboard')
+    parser.add_argument('--changes', type=int, default=5, help='widget changes per session')
+    parser.add_argument('--interval', type=float, default=0.1, help='seconds between rounds of changes')
+    parser.add_argument('--persistent', action='store_true', help='a persistent figure per session')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'crash-bench'))
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    csvpath = write_crash_csv(args.rows, os.path.join(args.workdir, f'crashes_{args.rows}.csv'))
+
+    empty = process_memory()
+    server = CrashServer.load(csvpath, os.path.join(args.workdir, 'cache'), persistent=args.persistent)
+    shared = process_memory() - empty
+    frame = server.df.frame.memory_usage(deep=True).sum()
+    print(f'shared state {shared / 2**20:,.0f} MB (crash frame {frame / 2**20:,.0f} MB) - a kernel per analyst '
+          f'holds a frame each')
+
+    # one session up front so the first row does not pay for importing the plotting and widget libraries
+    warmup = server.session(args.view)
+    warmup.scheduler.wait()
+    server.close_session(warmup)
+
+    rng = random.Random(args.seed)
+    print(f"{'sessions':>8} {'MB/session':>10} {'rss MB':>8} {'first p50':>9} {'first max':>9} "
+          f"{'last p50':>8} {'last p95':>8} {'last max':>8} {'cache hits':>10}")
+    for count in args.sessions:
+        result = run_sessions(server, count, args.view, args.changes, args.interval, rng)
+        print(f"{result['sessions']:>8} {result['session_bytes'] / 2**20:>10.2f} "
+              f"{result['rss_bytes'] / 2**20:>8,.0f} {result['first_p50']:>8.2f}s {result['first_max']:>8.2f}s "
+              f"{result['last_p50']:>7.2f}s {result['last_p95']:>7.2f}s {result['last_max']:>7.2f}s {result['hit_rate']:>10.0%}")
+
+
+if __name__ == '__main__':
+    main()
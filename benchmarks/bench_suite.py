@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import itertools
+import platform
+import tempfile
+import tracemalloc
+
+# headless - nothing is shown, figures are drawn into memory
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+import numpy as np
+import pandas as pd
+
+# run from the repo root or from benchmarks/ - either way modules/ should be importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks.synthetic import write_crash_csv
+from modules.etl import etl_crash_data, crash_csv_dtypes, read_crash_csv, get_chicago_crash_data
+from modules.reusable import plot_crash_count_by_year, plot_violinplot_injuries_by_lighting, \
+    plot_crash_hour_of_day_vs_injuries_with_jitter, plot_histogram_crashes_by_year, \
+    plot_frequency_heatmap_weather_road_condition, create_dashboard, prepare_dashboard, LiveDashboard
+from modules.cube import CrashCube
+from modules.dataset import CrashDataset
+from modules.spatial import SpatialIndex, area_mask
+from modules.sample import CrashSample
+from modules.summary import DistributionSummary
+from modules.crosstab import CrosstabCube
+
+
+# ****************************************************************
+# time and peak memory of the etl, the cached load and every plot entry point
+# on synthetic exports of several sizes, written to a json file and optionally
+# compared against an earlier run
+# python -m benchmarks.bench_suite --rows 100000 1000000 5000000 --output bench.json --baseline previous.json
+# ****************************************************************
+
+const_default_rows = [100_000, 1_000_000, 5_000_000]
+
+# a run is a regression when it is this many times slower (or bigger) than the baseline
+const_default_thresholds = {'seconds': 1.25, 'peak_bytes': 1.25}
+
+# runs shorter than this are too noisy to flag
+const_min_compared_seconds = 0.05
+
+# the year the per year plots select - a full year in the synthetic data
+const_bench_year = 2024
+
+
+def _draw(result=None):
+    """
+    Renders the current (or returned) figure into the Agg buffer and closes it, so plot timings include drawing.
+    """
+    fig = result if isinstance(result, matplotlib.figure.Figure) else plt.gcf()
+    fig.canvas.draw()
+    plt.close('all')
+
+
+def measure(func, repeat: int = 3) -> dict:
+    """
+    Best wall time of repeat calls, then the tracemalloc peak of one more call (kept apart, tracing slows it down).
+    Args:
+        func: Function without arguments to measure
+        repeat (int): Timed calls
+    Returns:
+        A dictionary with seconds (fastest), cpu_seconds (of the fastest) and peak_bytes
+    """
+    best, best_cpu = None, None
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        func()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        if best is None or wall < best:
+            best, best_cpu = wall, cpu
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': best, 'cpu_seconds': best_cpu, 'peak_bytes': peak}
+
+
+def entry_points(csvpath: str, cachedir: str, raw: pd.DataFrame, df: pd.DataFrame, cube: CrashCube) -> dict:
+    """
+    The measured calls, by name. Each one is self contained so it can be repeated.
+    """
+    year = const_bench_year
+
+    def show_patched(func, *args, **kwargs):
+        # the plot functions call plt.show themselves - turn that into an in memory draw
+        def call():
+            show = plt.show
+            plt.show = lambda *a, **k: _draw()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                plt.show = show
+            if plt.get_fignums():
+                _draw(result)
+        return call
+
+    # one persistent dashboard for the widget steps - built by its first call, which the best of repeat leaves out
+    live = LiveDashboard(df, cube)
+
+    # a neighbourhood through the grid index against a scan of every coordinate
+    dataset = CrashDataset(df)
+    latitude, longitude = df['LATITUDE'].to_numpy(), df['LONGITUDE'].to_numpy()
+    # the preview sample at its default fraction - the preview against the exact plain frame dashboard
+    sample = CrashSample.from_frame(df)
+    injury_steps = itertools.cycle([1, 2])
+    year_steps = itertools.cycle([year, year - 1])
+
+    def cold_load():
+        shutil.rmtree(cachedir, ignore_errors=True)
+        get_chicago_crash_data(csvpath, cache_dir=cachedir)
+
+    return {
+        'read_csv': lambda: pd.read_csv(csvpath, dtype=crash_csv_dtypes()),
+        'etl_crash_data': lambda: etl_crash_data(raw.copy(), compact=True),
+        'read_crash_csv[serial]': lambda: read_crash_csv(csvpath, workers=1),
+        'read_crash_csv[parallel]': lambda: read_crash_csv(csvpath, workers=None),
+        'get_chicago_crash_data[cold]': cold_load,
+        'get_chicago_crash_data[warm]': lambda: get_chicago_crash_data(csvpath, cache_dir=cachedir),
+        'CrashCube.from_frame': lambda: CrashCube.from_frame(df),
+        'DistributionSummary.from_frame': lambda: DistributionSummary.from_frame(df),
+        'CrosstabCube.from_frame': lambda: CrosstabCube.from_frame(df),
+        'pd.crosstab[every year]': lambda: [pd.crosstab(part['WEATHER_CONDITION'], part['ROADWAY_SURFACE_COND'])
+                                            for _, part in df.groupby('CRASH_YEAR', observed=True)],
+        'plot_crash_count_by_year': show_patched(plot_crash_count_by_year, df),
+        'plot_violinplot_injuries_by_lighting': show_patched(plot_violinplot_injuries_by_lighting, df, year),
+        'plot_violinplot_injuries_by_lighting[summary]':
+            show_patched(plot_violinplot_injuries_by_lighting, df, year, mode='summary'),
+        'plot_crash_hour_of_day_vs_injuries_with_jitter':
+            show_patched(plot_crash_hour_of_day_vs_injuries_with_jitter, df, 1, year),
+        'plot_histogram_crashes_by_year': show_patched(plot_histogram_crashes_by_year, df, year),
+        'plot_frequency_heatmap_weather_road_condition':
+            show_patched(plot_frequency_heatmap_weather_road_condition, df, year),
+        'create_dashboard': show_patched(create_dashboard, df, year, 1),
+        'create_dashboard[cube]': show_patched(create_dashboard, df, year, 1, cube=cube),
+        'LiveDashboard.render[injury step]': lambda: live.render(year=year, minimalinjury=next(injury_steps)),
+        'LiveDashboard.render[year step]': lambda: live.render(year=next(year_steps), minimalinjury=1),
+        'LiveDashboard.encode': lambda: live.png(year=year, minimalinjury=1),
+        'SpatialIndex.from_frame': lambda: SpatialIndex.from_frame(df),
+        'SpatialIndex.query[The Loop]': lambda: dataset.spatial.query('The Loop'),
+        'area_mask[The Loop]': lambda: np.flatnonzero(area_mask(latitude, longitude, 'The Loop')),
+        'create_dashboard[cube, area]': show_patched(create_dashboard, dataset, year, 1, cube=cube, area='The Loop'),
+        'CrashSample.from_frame': lambda: CrashSample.from_frame(df),
+        'create_dashboard[preview]': show_patched(create_dashboard, df, year, 1, sample=sample),
+        'prepare_dashboard': lambda: prepare_dashboard(df, year, 1),
+        'prepare_dashboard[preview]': lambda: prepare_dashboard(df, year, 1, sample=sample),
+    }
+
+
+def run_suite(rows_list: list, workdir: str, repeat: int = 3, only: list = None) -> list:
+    """
+    Generates (or reuses) a synthetic export per size and measures every entry point on it.
+    Args:
+        rows_list (list): Sizes of the synthetic exports
+        workdir (str): Directory holding the generated CSV files and caches
+        repeat (int): Timed calls per entry point
+        only (list): Names of the entry points to run, all when not given
+    Returns:
+        A list of result dictionaries (name, rows, seconds, cpu_seconds, peak_bytes)
+    """
+    results = []
+    for rows in rows_list:
+        csvpath = write_crash_csv(rows, os.path.join(workdir, f'crashes_{rows}.csv'))
+        cachedir = os.path.join(workdir, f'cache_{rows}')
+
+        raw = pd.read_csv(csvpath, dtype=crash_csv_dtypes())
+        df = get_chicago_crash_data(csvpath, cache_dir=cachedir)
+        cube = CrashCube.from_frame(df)
+
+        for name, func in entry_points(csvpath, cachedir, raw, df, cube).items():
+            if only and name not in only:
+                continue
+            result = {'name': name, 'rows': rows, **measure(func, repeat)}
+            results.append(result)
+            print(f"{rows:>10,} {name:<50} {result['seconds']:>9.3f}s {result['peak_bytes'] / 2 ** 20:>10.1f} MB",
+                  flush=True)
+
+        # the cold load leaves a fresh cache behind, later sizes do not need this one
+        del raw, df, cube
+    return results
+
+
+def compare(results: list, baseline: dict, thresholds: dict) -> list:
+    """
+    The results that got slower or bigger than the baseline run by more than the thresholds.
+    Args:
+        results (list): Result dictionaries of this run
+        baseline (dict): A results file written by an earlier run
+        thresholds (dict): Allowed ratio per metric
+    Returns:
+        A list of regression dictionaries (name, rows, metric, baseline, current, ratio)
+    """
+    previous = {(entry['name'], entry['rows']): entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry['name'], entry['rows']))
+        if before is None:
+            continue
+        for metric, allowed in thresholds.items():
+            if metric == 'seconds' and before[metric] < const_min_compared_seconds:
+                continue
+            ratio = entry[metric] / before[metric] if before[metric] else float('inf')
+            if ratio > allowed:
+                regressions.append({'name': entry['name'], 'rows': entry['rows'], 'metric': metric,
+                                    'baseline': before[metric], 'current': entry[metric], 'ratio': ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the crash etl and plots on synthetic data')
+    parser.add_argument('--rows', type=int, nargs='+', default=const_default_rows)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help='entry point names to run')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'crash-bench'))
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='results file of an earlier run to compare against')
+    parser.add_argument('--max-slowdown', type=float, default=const_default_thresholds['seconds'])
+    parser.add_argument('--max-memory-growth', type=float, default=const_default_thresholds['peak_bytes'])
+    args = parser.parse_args()
+
+    thresholds = {'seconds': args.max_slowdown, 'peak_bytes': args.max_memory_growth}
+    results = run_suite(args.rows, args.workdir, args.repeat, args.only)
+
+    report = {
+        'created': pd.Timestamp.now(tz='UTC').isoformat(),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count(), 'pandas': pd.__version__, 'numpy': np.__version__,
+                        'matplotlib': matplotlib.__version__},
+        'thresholds': thresholds,
+        'results': results,
+    }
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        report['regressions'] = compare(results, baseline, thresholds)
+        for regression in report['regressions']:
+            print(f"REGRESSION {regression['rows']:,} {regression['name']} {regression['metric']}: "
+                  f"{regression['baseline']:.4g} -> {regression['current']:.4g} ({regression['ratio']:.2f}x)")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'results written to {args.output}')
+
+    # non zero exit so a scripted run notices regressions
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
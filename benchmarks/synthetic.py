@@ -0,0 +1,254 @@
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# ****************************************************************
+# synthetic crash data shaped like the City of Chicago export - same columns,
+# same CRASH_DATE text layout and roughly the same distributions, so the etl and
+# the plots can be measured at any size without downloading the real file
+# python -m benchmarks.synthetic --rows 1000000 --output /tmp/crashes_1m.csv
+# ****************************************************************
+
+# share of crashes per year, 2025 only runs to the export date like the real file
+const_year_weights = {2015: 0.01, 2016: 0.04, 2017: 0.09, 2018: 0.12, 2019: 0.12, 2020: 0.09, 2021: 0.11,
+                      2022: 0.11, 2023: 0.11, 2024: 0.11, 2025: 0.02}
+const_last_export_day = pd.Timestamp('2025-03-19')
+
+# share of crashes per hour of the day - quiet at night, peaking with the afternoon commute
+const_hour_weights = [1.6, 1.3, 1.1, 0.9, 0.8, 1.0, 1.8, 3.6, 4.6, 4.1, 4.1, 4.6,
+                      5.3, 5.5, 6.0, 6.9, 7.3, 7.2, 6.3, 5.0, 4.0, 3.5, 3.0, 2.5]
+
+# hours that get the night lighting mix
+const_night_hours = [0, 1, 2, 3, 4, 5, 19, 20, 21, 22, 23]
+
+const_weather_weights = {
+    'CLEAR': 0.780, 'RAIN': 0.087, 'UNKNOWN': 0.050, 'SNOW': 0.031, 'CLOUDY/OVERCAST': 0.030,
+    'OTHER': 0.0030, 'FREEZING RAIN/DRIZZLE': 0.0020, 'FOG/SMOKE/HAZE': 0.0015, 'SLEET/HAIL': 0.0012,
+    'BLOWING SNOW': 0.0005, 'SEVERE CROSS WIND GATE': 0.0002, 'BLOWING SAND, SOIL, DIRT': 0.00005,
+}
+
+const_road_weights = {
+    'DRY': 0.80, 'UNKNOWN': 0.08, 'WET': 0.09, 'SNOW OR SLUSH': 0.02, 'ICE': 0.006, 'OTHER': 0.003,
+    'SAND, MUD, DIRT': 0.0004,
+}
+
+# weather that mostly decides the road surface
+const_weather_road = {'RAIN': 'WET', 'FREEZING RAIN/DRIZZLE': 'ICE', 'SNOW': 'SNOW OR SLUSH',
+                      'BLOWING SNOW': 'SNOW OR SLUSH', 'SLEET/HAIL': 'WET'}
+
+const_day_lighting_weights = {'DAYLIGHT': 0.86, 'UNKNOWN': 0.04, 'DUSK': 0.04, 'DAWN': 0.03,
+                              'DARKNESS, LIGHTED ROAD': 0.02, 'DARKNESS': 0.01}
+const_night_lighting_weights = {'DARKNESS, LIGHTED ROAD': 0.68, 'DARKNESS': 0.15, 'UNKNOWN': 0.06, 'DUSK': 0.05,
+                                'DAWN': 0.02, 'DAYLIGHT': 0.04}
+
+const_cause_weights = {
+    'UNABLE TO DETERMINE': 0.38, 'FAILING TO YIELD RIGHT-OF-WAY': 0.11, 'FOLLOWING TOO CLOSELY': 0.10,
+    'NOT APPLICABLE': 0.05, 'IMPROPER OVERTAKING/PASSING': 0.05, 'FAILING TO REDUCE SPEED TO AVOID CRASH': 0.04,
+    'IMPROPER BACKING': 0.04, 'IMPROPER LANE USAGE': 0.04, 'DRIVING SKILLS/KNOWLEDGE/EXPERIENCE': 0.04,
+    'IMPROPER TURNING/NO SIGNAL': 0.03, 'DISREGARDING TRAFFIC SIGNALS': 0.02, 'WEATHER': 0.02,
+    'OPERATING VEHICLE IN ERRATIC, RECKLESS, CARELESS, NEGLIGENT OR AGGRESSIVE MANNER': 0.02,
+    'DISREGARDING STOP SIGN': 0.01, 'DISTRACTION - FROM INSIDE VEHICLE': 0.01,
+    'UNDER THE INFLUENCE OF ALCOHOL/DRUGS (USE WHEN ARREST IS EFFECTED)': 0.01,
+    'PHYSICAL CONDITION OF DRIVER': 0.01, 'VISION OBSCURED (SIGNS, TREE LIMBS, BUILDINGS, ETC.)': 0.01,
+}
+
+const_crash_type_weights = {'PARKED MOTOR VEHICLE': 0.23, 'REAR END': 0.22, 'SIDESWIPE SAME DIRECTION': 0.15,
+                            'TURNING': 0.14, 'ANGLE': 0.11, 'FIXED OBJECT': 0.05, 'PEDESTRIAN': 0.02,
+                            'PEDALCYCLIST': 0.015, 'SIDESWIPE OPPOSITE DIRECTION': 0.015, 'HEAD ON': 0.01,
+                            'OTHER OBJECT': 0.01, 'REAR TO FRONT': 0.01, 'REAR TO SIDE': 0.01, 'ANIMAL': 0.005}
+
+const_control_weights = {'NO CONTROLS': 0.57, 'TRAFFIC SIGNAL': 0.28, 'STOP SIGN/FLASHER': 0.10, 'UNKNOWN': 0.04,
+                         'OTHER': 0.01}
+
+const_speed_weights = {30: 0.74, 35: 0.07, 25: 0.07, 20: 0.04, 15: 0.03, 10: 0.02, 40: 0.01, 0: 0.01, 45: 0.01}
+
+# share of crashes with no injuries at all, then the tail of 1, 2, ... injuries falls off geometrically
+const_no_injury_share = 0.86
+const_injury_tail = 0.35
+
+# how the injured split over the severity columns: fatal, incapacitating, non incapacitating, reported not evident
+const_severity_weights = [0.004, 0.08, 0.52, 0.396]
+
+# share of rows missing the injury counts or the location, as in the real export
+const_missing_injuries = 0.002
+const_missing_location = 0.007
+
+# city bounding box the crash locations fall in
+const_latitude_range = (41.64, 42.02)
+const_longitude_range = (-87.94, -87.52)
+
+const_street_names = ['WESTERN AVE', 'PULASKI RD', 'CICERO AVE', 'ASHLAND AVE', 'HALSTED ST', 'KEDZIE AVE',
+                      'MICHIGAN AVE', 'STATE ST', 'LAKE SHORE DR NB', 'LAKE SHORE DR SB', 'CHICAGO AVE',
+                      'NORTH AVE', 'DIVISION ST', 'FULLERTON AVE', '79TH ST', '87TH ST', '63RD ST', 'IRVING PARK RD']
+
+
+def _choice(rng: np.random.Generator, weights: dict, rows: int) -> np.ndarray:
+    """
+    Draws rows values from the keys of weights with probabilities proportional to the weights.
+    """
+    values = np.array(list(weights.keys()), dtype=object)
+    p = np.array(list(weights.values()), dtype='float64')
+    return values[rng.choice(len(values), size=rows, p=p / p.sum())]
+
+
+def _crash_timestamps(rng: np.random.Generator, rows: int) -> pd.DatetimeIndex:
+    """
+    Crash times spread over the years and hours of the day with the weights above.
+    """
+    years = np.array(list(const_year_weights.keys()))
+    p = np.array(list(const_year_weights.values()))
+    year = years[rng.choice(len(years), size=rows, p=p / p.sum())]
+
+    # a uniform day within the year, the last year cut at the export day
+    starts = pd.to_datetime(pd.Series(year).astype(str) + '-01-01').to_numpy()
+    year_days = np.where(year % 4 == 0, 366, 365)
+    year_days = np.where(year == const_last_export_day.year, const_last_export_day.dayofyear, year_days)
+    day = (rng.random(rows) * year_days).astype('int64')
+
+    hours = np.array(const_hour_weights)
+    hour = rng.choice(24, size=rows, p=hours / hours.sum())
+    seconds = day * 86400 + hour * 3600 + rng.integers(0, 3600, rows)
+    return pd.DatetimeIndex(starts + seconds.astype('timedelta64[s]'))
+
+
+def format_crash_dates(timestamps: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Formats timestamps in the export layout 'MM/DD/YYYY HH:MM:SS AM' without going through strftime row by row -
+    the digits are written into a byte matrix, the reverse of parse_crash_dates.
+    Args:
+        timestamps (pd.DatetimeIndex): The crash times
+    Returns:
+        A numpy array of strings
+    """
+    rows = len(timestamps)
+    hour = timestamps.hour.to_numpy()
+    hour12 = np.where(hour % 12 == 0, 12, hour % 12)
+
+    chars = np.full((rows, 22), ord(' '), dtype=np.uint8)
+    fields = [(0, 2, timestamps.month.to_numpy()), (3, 2, timestamps.day.to_numpy()),
+              (6, 4, timestamps.year.to_numpy()), (11, 2, hour12), (14, 2, timestamps.minute.to_numpy()),
+              (17, 2, timestamps.second.to_numpy())]
+    for start, width, values in fields:
+        for i in range(width):
+            chars[:, start + i] = ord('0') + (values // 10 ** (width - 1 - i)) % 10
+
+    chars[:, [2, 5]] = ord('/')
+    chars[:, [13, 16]] = ord(':')
+    chars[:, 20] = np.where(hour < 12, ord('A'), ord('P'))
+    chars[:, 21] = ord('M')
+    return chars.view('S22').ravel().astype(str)
+
+
+def make_crash_frame(rows: int, seed: int = 521) -> pd.DataFrame:
+    """
+    Builds a raw (pre etl) crash frame with the export's column names and text layouts.
+    Args:
+        rows (int): Number of crashes
+        seed (int): Random seed, the same seed always gives the same frame
+    Returns:
+        A pandas DataFrame shaped like pd.read_csv of the export
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = _crash_timestamps(rng, rows)
+    hour = timestamps.hour.to_numpy()
+
+    # skewed injury counts - most crashes have none, the rest fall off geometrically
+    injured = rng.random(rows) >= const_no_injury_share
+    total = np.where(injured, rng.geometric(1 - const_injury_tail, rows), 0)
+    severity = rng.multinomial(total, const_severity_weights)
+    injuries = {
+        'INJURIES_TOTAL': total,
+        'INJURIES_FATAL': severity[:, 0],
+        'INJURIES_INCAPACITATING': severity[:, 1],
+        'INJURIES_NON_INCAPACITATING': severity[:, 2],
+        'INJURIES_REPORTED_NOT_EVIDENT': severity[:, 3],
+        'INJURIES_NO_INDICATION': rng.poisson(1.0, rows) + 1,
+        'INJURIES_UNKNOWN': np.zeros(rows, dtype='int64'),
+    }
+    missing = rng.random(rows) < const_missing_injuries
+    injuries = {name: np.where(missing, np.nan, values.astype('float64')) for name, values in injuries.items()}
+
+    weather = _choice(rng, const_weather_weights, rows)
+    road = _choice(rng, const_road_weights, rows)
+    for condition, surface in const_weather_road.items():
+        follows = (weather == condition) & (rng.random(rows) < 0.75)
+        road[follows] = surface
+
+    night = np.isin(hour, const_night_hours)
+    lighting = np.where(night, _choice(rng, const_night_lighting_weights, rows),
+                        _choice(rng, const_day_lighting_weights, rows))
+
+    located = rng.random(rows) >= const_missing_location
+    latitude = np.where(located, rng.uniform(*const_latitude_range, rows), np.nan)
+    longitude = np.where(located, rng.uniform(*const_longitude_range, rows), np.nan)
+
+    notified = timestamps + pd.to_timedelta(rng.exponential(3600, rows).astype('int64'), unit='s')
+
+    df = pd.DataFrame({
+        # 40 hex digits like the export's record ids
+        'CRASH_RECORD_ID': np.frombuffer(rng.bytes(20 * rows).hex().encode(), dtype='S40').astype(str),
+        'CRASH_DATE_EST_I': np.where(rng.random(rows) < 0.07, 'Y', None),
+        'CRASH_DATE': format_crash_dates(timestamps),
+        'POSTED_SPEED_LIMIT': _choice(rng, const_speed_weights, rows).astype('int64'),
+        'TRAFFIC_CONTROL_DEVICE': _choice(rng, const_control_weights, rows),
+        'WEATHER_CONDITION': weather,
+        'LIGHTING_CONDITION': lighting,
+        'FIRST_CRASH_TYPE': _choice(rng, const_crash_type_weights, rows),
+        'ROADWAY_SURFACE_COND': road,
+        'PRIM_CONTRIBUTORY_CAUSE': _choice(rng, const_cause_weights, rows),
+        'STREET_NO': rng.integers(1, 12000, rows),
+        'STREET_NAME': np.array(const_street_names, dtype=object)[rng.integers(0, len(const_street_names), rows)],
+        'BEAT_OF_OCCURRENCE': rng.integers(111, 2535, rows).astype('float64'),
+        'DATE_POLICE_NOTIFIED': format_crash_dates(notified),
+        'NUM_UNITS': 1 + rng.poisson(1.0, rows),
+        **injuries,
+        'CRASH_HOUR': hour,
+        # the export counts days of the week from 1 = Sunday
+        'CRASH_DAY_OF_WEEK': (timestamps.dayofweek.to_numpy() + 1) % 7 + 1,
+        'CRASH_MONTH': timestamps.month.to_numpy(),
+        'LATITUDE': latitude,
+        'LONGITUDE': longitude,
+    })
+    return df
+
+
+def write_crash_csv(rows: int, path: str, seed: int = 521, force: bool = False) -> str:
+    """
+    Writes a synthetic export to path, reusing an existing file of the same size and seed.
+    Args:
+        rows (int): Number of crashes
+        path (str): Destination CSV file
+        seed (int): Random seed
+        force (bool): Regenerate even when the file exists
+    Returns:
+        The path of the CSV file
+    """
+    marker = path + '.seed'
+    if not force and os.path.exists(path) and os.path.exists(marker):
+        with open(marker, 'r') as f:
+            if f.read() == f'{rows}:{seed}':
+                return path
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    make_crash_frame(rows, seed).to_csv(path, index=False)
+    with open(marker, 'w') as f:
+        f.write(f'{rows}:{seed}')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic Chicago crash export')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=521)
+    parser.add_argument('--output', default='assets/data/synthetic_crashes.csv')
+    args = parser.parse_args()
+
+    print(write_crash_csv(args.rows, args.output, args.seed, force=True))
+
+
+if __name__ == '__main__':
+    main()
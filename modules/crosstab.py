@@ -0,0 +1,154 @@
+# data access and manipulation libraries
+import pandas as pd
+import numpy as np
+
+from .dataset import CrashDataset
+from .profiling import profiled
+
+# ****************************************************************
+# code based crosstab - two categorical columns and the year reduced to integer
+# codes once, every crash counted with a single bincount into a year x row x column
+# array, so the contingency table of any year is a slice instead of a pd.crosstab
+# ****************************************************************
+
+# largest year x row x column array built - pairs of high cardinality columns belong in pd.crosstab
+const_crosstab_max_cells = 50_000_000
+
+
+def _column_codes(values: pd.Series) -> tuple:
+    """
+    Integer codes of a column (-1 for missing) and the values they stand for, in pd.crosstab's order.
+    Categorical columns use their own codes and keep their dtype, anything else is factorized sorted.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(dtype='int64'), values.cat.categories, values.dtype
+
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype('int64'), pd.Index(uniques), None
+
+
+class CrosstabCube:
+    """
+    Crash counts of year x row category x column category as one dense array. A year's contingency table (or the
+    total over years) is a slice laid out exactly like pd.crosstab of the two columns over that year's crashes.
+    """
+
+    def __init__(self, counts: np.ndarray, years: pd.Index, rows: pd.Index, columns: pd.Index, row: str, column: str,
+                 row_dtype=None, column_dtype=None):
+        """
+        Args:
+            counts (np.ndarray): int64 array of shape (years, rows, columns)
+            years (pd.Index): The year of each first axis position
+            rows (pd.Index): The category of each second axis position
+            columns (pd.Index): The category of each third axis position
+            row (str): Name of the row column
+            column (str): Name of the column column
+            row_dtype, column_dtype (pd.CategoricalDtype): The source dtypes when the columns were categorical
+        """
+        self.counts = counts
+        self.years = years
+        self.rows = rows
+        self.columns = columns
+        self.row = row
+        self.column = column
+        self.row_dtype = row_dtype
+        self.column_dtype = column_dtype
+
+    @classmethod
+    @profiled('aggregate', 'CrosstabCube.from_frame')
+    def from_frame(cls, df: pd.DataFrame, row: str = 'WEATHER_CONDITION', column: str = 'ROADWAY_SURFACE_COND',
+                   by: str = 'CRASH_YEAR', weights=None) -> 'CrosstabCube':
+        """
+        Counts every crash into the year x row x column array with one bincount over
+        (year_code * n_rows + row_code) * n_columns + column_code. Rows missing any of the three are left out,
+        as pd.crosstab drops them.
+        Args:
+            df (pd.DataFrame or CrashDataset): The crash dataframe
+            row (str): Categorical column giving the table rows
+            column (str): Categorical column giving the table columns
+            by (str): Column giving the first axis, one table per value
+            weights (np.ndarray): Count each row this many times, e.g. the counts of an aggregated table
+        Returns:
+            A CrosstabCube
+        """
+        if isinstance(df, CrashDataset):
+            df = df.frame
+
+        year_codes, years, _ = _column_codes(df[by])
+        row_codes, rows, row_dtype = _column_codes(df[row])
+        column_codes, columns, column_dtype = _column_codes(df[column])
+
+        shape = (len(years), len(rows), len(columns))
+        if np.prod(shape, dtype='int64') > const_crosstab_max_cells:
+            raise ValueError(f"{row} x {column} by {by} needs {np.prod(shape, dtype='int64'):,} cells, "
+                             f"more than {const_crosstab_max_cells:,} - use pd.crosstab for these columns")
+
+        valid = (year_codes >= 0) & (row_codes >= 0) & (column_codes >= 0)
+        flat = (year_codes[valid] * shape[1] + row_codes[valid]) * shape[2] + column_codes[valid]
+        if weights is None:
+            counts = np.bincount(flat, minlength=int(np.prod(shape)))
+        else:
+            counts = np.rint(np.bincount(flat, weights=np.asarray(weights)[valid], minlength=int(np.prod(shape))))
+
+        return cls(counts.astype('int64').reshape(shape), years, rows, columns, row, column, row_dtype, column_dtype)
+
+    @classmethod
+    def from_counts(cls, counts: pd.Series) -> 'CrosstabCube':
+        """
+        Builds the array from crash counts indexed by (year, row category, column category), e.g. a CrashCube table.
+        """
+        levels = counts.index.to_frame(index=False)
+        by, row, column = levels.columns
+        return cls.from_frame(levels, row, column, by, weights=counts.to_numpy())
+
+    def table(self, year=None) -> np.ndarray:
+        """
+        The rows x columns counts of a year, summed over every year when None.
+        """
+        if year is None:
+            return self.counts.sum(axis=0)
+        if year not in self.years:
+            return np.zeros(self.counts.shape[1:], dtype='int64')
+        return self.counts[self.years.get_loc(year)]
+
+    def crosstab(self, year=None) -> pd.DataFrame:
+        """
+        A year's contingency table, the same frame pd.crosstab(rows, columns) gives over the year's crashes: only
+        the categories seen in it, in category (or sorted) order, categorical columns as a CategoricalIndex of
+        their dtype.
+        Args:
+            year: The year to slice, None for every year
+        Returns:
+            A pandas DataFrame of int64 counts
+        """
+        table = self.table(year)
+        seen_rows = table.sum(axis=1) > 0
+        seen_columns = table.sum(axis=0) > 0
+
+        index = self.rows[seen_rows]
+        if self.row_dtype is not None:
+            index = pd.CategoricalIndex(index, dtype=self.row_dtype)
+        columns = self.columns[seen_columns]
+        if self.column_dtype is not None:
+            columns = pd.CategoricalIndex(columns, dtype=self.column_dtype)
+
+        return pd.DataFrame(table[np.ix_(seen_rows, seen_columns)], index=index.rename(self.row),
+                            columns=columns.rename(self.column))
+
+
+def code_crosstab(df: pd.DataFrame, row: str, column: str) -> pd.DataFrame:
+    """
+    pd.crosstab(df[row], df[column]) computed from column codes with a bincount.
+    Args:
+        df (pd.DataFrame or CrashDataset): The crash dataframe (or a selection of it)
+        row (str): Categorical column giving the table rows
+        column (str): Categorical column giving the table columns
+    Returns:
+        A pandas DataFrame of int64 counts
+    """
+    if isinstance(df, CrashDataset):
+        df = df.frame
+
+    # a single group - the year axis of the cube has length one
+    frame = pd.DataFrame({'group': np.zeros(len(df), dtype='int8'), row: df[row], column: df[column]}, copy=False)
+    return CrosstabCube.from_frame(frame, row, column, 'group').crosstab(None)
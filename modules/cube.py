@@ -0,0 +1,337 @@
+import os
+import json
+import shutil
+
+# data access and manipulation libraries
+import pandas as pd
+import numpy as np
+
+from .datacache import const_default_cache_dir, source_fingerprint, write_frame_part, read_frame_parts
+from .dataset import CrashDataset
+from .profiling import profiled
+from .summary import DistributionSummary
+from .crosstab import CrosstabCube
+
+# ****************************************************************
+# aggregate cube - crash counts grouped once over the whole frame
+# widget callbacks answer from these small tables instead of scanning millions of rows
+# ****************************************************************
+
+# bump whenever the tables below change so stale cubes on disk are rebuilt
+const_cube_version = 2
+
+# table name -> the columns it counts crashes by, year always first
+const_cube_tables = {
+    'year_hour': ['CRASH_YEAR', 'CRASH_HOUR'],
+    'year_injuries_hour': ['CRASH_YEAR', 'INJURIES_TOTAL', 'CRASH_HOUR'],
+    'year_weather_road': ['CRASH_YEAR', 'WEATHER_CONDITION', 'ROADWAY_SURFACE_COND'],
+    # INJURIES_TOTAL is a small whole number, each distinct count is its own bucket
+    'year_lighting_injuries': ['CRASH_YEAR', 'LIGHTING_CONDITION', 'INJURIES_TOTAL'],
+}
+
+
+class CrashCube:
+    """
+    Crash counts by year x hour, year x injuries x hour, year x weather x road surface and
+    year x lighting x injuries. Every lookup is a slice of one of these tables, and the original rows
+    for a (year, minimal injury) selection can be rebuilt from the counts with expand.
+    The crash hour moments and histogram of every year come from a DistributionSummary kept alongside.
+    """
+
+    def __init__(self, counts: dict, summary: DistributionSummary = None):
+        """
+        Args:
+            counts (dict): Table name to a Series of crash counts indexed by the table's columns
+            summary (DistributionSummary): CRASH_HOUR summary by CRASH_YEAR, None when the frame had no hours
+        """
+        self.counts = counts
+        self.summary = summary
+        # year x category x category arrays of the condition tables, built on first use
+        self._crosstabs = {}
+
+    @classmethod
+    @profiled('aggregate', 'CrashCube.from_frame')
+    def from_frame(cls, df: pd.DataFrame) -> 'CrashCube':
+        """
+        Builds the cube in one grouped pass per table. Tables whose columns are not in the frame are skipped.
+        Args:
+            df (pd.DataFrame or CrashDataset): The transformed crash dataframe
+        Returns:
+            A CrashCube
+        """
+        if isinstance(df, CrashDataset):
+            df = df.frame
+
+        counts = {}
+        for name, columns in const_cube_tables.items():
+            if all(column in df.columns for column in columns):
+                counts[name] = df.groupby(columns, observed=True).size()
+
+        summary = None
+        if 'CRASH_YEAR' in df.columns and 'CRASH_HOUR' in df.columns:
+            summary = DistributionSummary.from_frame(df)
+        return cls(counts, summary)
+
+    def has(self, name: str) -> bool:
+        """
+        Whether the cube carries a table - a projected frame may not have had the columns for it.
+        """
+        return name in self.counts
+
+    def find(self, columns: list) -> str:
+        """
+        The name of the table counting crashes by year and exactly these columns, None when the cube has none.
+        Args:
+            columns (list): The columns after CRASH_YEAR, in table order
+        """
+        for name, table_columns in const_cube_tables.items():
+            if name in self.counts and table_columns[1:] == list(columns):
+                return name
+        return None
+
+    def table(self, name: str) -> pd.Series:
+        """
+        The counts of a table, failing with the columns it needs when the frame the cube was built from lacked them.
+        Args:
+            name (str): The table name, a key of const_cube_tables
+        Returns:
+            A Series of counts indexed by the table's columns
+        """
+        if name not in const_cube_tables:
+            raise ValueError(f"Unknown cube table {name}, expected one of {', '.join(const_cube_tables)}")
+        if name not in self.counts:
+            raise ValueError(f"The cube has no {name} table - the frame it was built from had no "
+                             f"{' or '.join(const_cube_tables[name])} column, "
+                             f"load it with those columns or pass the frame instead of the cube")
+        return self.counts[name]
+
+    def _year_table(self) -> pd.Series:
+        """
+        A table to count the years from - year_hour, or when the projection left it out any other, all of them
+        count by CRASH_YEAR first.
+        """
+        for name in const_cube_tables:
+            if name in self.counts:
+                return self.counts[name]
+        return self.table('year_hour')
+
+    def years(self) -> list:
+        """
+        The years present in the data, ascending.
+        """
+        return sorted(self._year_table().index.get_level_values(0).unique().tolist())
+
+    def hours(self) -> list:
+        """
+        The crash hours present in the data, ascending - from year_hour, or year_injuries_hour without it.
+        """
+        name = 'year_injuries_hour' if 'year_hour' not in self.counts and 'year_injuries_hour' in self.counts \
+            else 'year_hour'
+        return sorted(self.table(name).index.get_level_values('CRASH_HOUR').unique().tolist())
+
+    def select(self, name: str, year: int = None) -> pd.Series:
+        """
+        The counts of a table for one year, or summed over every year.
+        Args:
+            name (str): The table name, a key of const_cube_tables
+            year (int): The year to slice, None for all years
+        Returns:
+            A Series of counts indexed by the remaining columns of the table
+        """
+        counts = self.table(name)
+        levels = list(range(1, counts.index.nlevels))
+
+        if year is None:
+            return counts.groupby(level=levels, observed=True).sum()
+
+        if year not in counts.index.get_level_values(0):
+            return counts.iloc[:0].droplevel(0)
+        return counts.xs(year, level=0)
+
+    def year_counts(self) -> pd.Series:
+        """
+        Crash count per year.
+        """
+        return self._year_table().groupby(level=0).sum()
+
+    def hour_counts(self, year: int = None) -> pd.Series:
+        """
+        Crash count per hour of the day for a year (or all years).
+        """
+        return self.select('year_hour', year)
+
+    def injury_hour_counts(self, year: int = None, minimalinjury: int = 0) -> pd.Series:
+        """
+        Crash count per (total injuries, hour) for crashes with at least minimalinjury injuries.
+        """
+        counts = self.select('year_injuries_hour', year)
+        return counts[counts.index.get_level_values(0) >= minimalinjury]
+
+    def lighting_injury_counts(self, year: int = None) -> pd.Series:
+        """
+        Crash count per (lighting condition, total injuries).
+        """
+        return self.select('year_lighting_injuries', year)
+
+    def hour_moments(self, year: int = None) -> dict:
+        """
+        Mean, std, variance, skewness and kurtosis of the crash hours of a year (or all years).
+        """
+        if self.summary is None:
+            raise ValueError("The cube has no crash hour summary - the frame it was built from had no CRASH_YEAR "
+                             "or CRASH_HOUR column")
+        return self.summary.moments(year)
+
+    def crosstab(self, row: str, column: str, year: int = None) -> pd.DataFrame:
+        """
+        Crash counts of two categorical columns for a year (or all years), the frame pd.crosstab gives on them.
+        The table is turned into a year x row x column array once, every later year is a slice of it.
+        Args:
+            row (str): The column giving the rows
+            column (str): The column giving the columns
+            year (int): The year to slice, None for all years
+        Returns:
+            A pandas DataFrame of int64 counts, None when no table of the cube counts the two columns
+        """
+        name = self.find([row, column])
+        if name is None:
+            return None
+        if name not in self._crosstabs:
+            self._crosstabs[name] = CrosstabCube.from_counts(self.counts[name])
+        return self._crosstabs[name].crosstab(year)
+
+    def condition_crosstab(self, year: int = None) -> pd.DataFrame:
+        """
+        Weather x road surface crash counts laid out like pd.crosstab of the two columns.
+        """
+        cross_tab = self.crosstab('WEATHER_CONDITION', 'ROADWAY_SURFACE_COND', year)
+
+        # plain labels for the heatmap ticks, the same whether the frame was compacted or not
+        if isinstance(cross_tab.index, pd.CategoricalIndex):
+            cross_tab.index = cross_tab.index.astype(cross_tab.index.categories.dtype)
+        if isinstance(cross_tab.columns, pd.CategoricalIndex):
+            cross_tab.columns = cross_tab.columns.astype(cross_tab.columns.categories.dtype)
+        return cross_tab
+
+    @staticmethod
+    def expand(counts: pd.Series) -> dict:
+        """
+        Rebuilds the individual rows behind a table slice - each index value repeated by its count.
+        Args:
+            counts (pd.Series): A slice returned by one of the lookups
+        Returns:
+            A dictionary of column name to numpy array, one entry per crash
+        """
+        repeats = counts.to_numpy()
+        index = counts.index
+        if index.nlevels == 1:
+            return {index.name: np.repeat(index.to_numpy(), repeats)}
+        return {name: np.repeat(index.get_level_values(i).to_numpy(), repeats) for i, name in enumerate(index.names)}
+
+    def merge(self, other: 'CrashCube', sign: int = 1) -> 'CrashCube':
+        """
+        Adds (or with sign=-1 removes) the counts of another cube, e.g. one built from newly synced rows.
+        Args:
+            other (CrashCube): Cube over the rows to add or remove
+            sign (int): 1 to add, -1 to subtract
+        Returns:
+            A new CrashCube with the combined counts
+        """
+        counts = {}
+        for name, table in self.counts.items():
+            if name in other.counts:
+                table = table.add(sign * other.counts[name], fill_value=0).astype('int64')
+                table = table[table > 0]
+            counts[name] = table
+
+        summary = self.summary
+        if summary is not None and other.summary is not None:
+            summary = summary.merge(other.summary, sign)
+        return CrashCube(counts, summary)
+
+    def save(self, path: str):
+        """
+        Writes every table as a directory of .npy columns under path.
+        Args:
+            path (str): Directory receiving the cube
+        """
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+
+        for name, table in self.counts.items():
+            tabledir = os.path.join(path, name)
+            os.makedirs(tabledir)
+            write_frame_part(table.rename('count').reset_index(), tabledir, 0)
+
+        if self.summary is not None:
+            self.summary.save(os.path.join(path, 'summary'))
+
+    @classmethod
+    def load(cls, path: str) -> 'CrashCube':
+        """
+        Reads a cube written by save.
+        Args:
+            path (str): Directory holding the cube
+        Returns:
+            A CrashCube
+        """
+        counts = {}
+        for name, columns in const_cube_tables.items():
+            tabledir = os.path.join(path, name)
+            if os.path.isdir(tabledir):
+                table = read_frame_parts(tabledir)
+                counts[name] = table.set_index(columns)['count']
+
+        summary = None
+        if os.path.isdir(os.path.join(path, 'summary')):
+            summary = DistributionSummary.load(os.path.join(path, 'summary'))
+        return cls(counts, summary)
+
+
+def load_crash_cube(filepath: str, df: pd.DataFrame = None, cache_dir: str = const_default_cache_dir,
+                    fingerprint: dict = None, variant: str = '') -> CrashCube:
+    """
+    Gets the cube of a crash CSV from the cache next to the columnar data cache, building and storing it from
+    the transformed frame when the cache is missing or the source changed.
+    Args:
+        filepath (str): The source CSV file
+        df (pd.DataFrame): The transformed crash dataframe, only needed when the cube has to be built
+        cache_dir (str): Directory holding the caches
+        fingerprint (dict): Key of the source from source_fingerprint, computed when not given
+        variant (str): Flavour of df from cache_variant - a projected frame has fewer tables, so its cube is
+                       stored and keyed apart from the full one
+    Returns:
+        A CrashCube, or None when it has to be built and no dataframe was given
+    """
+    name = os.path.basename(filepath)
+    if variant:
+        name = f'{name}.{variant}'
+    cubepath = os.path.join(cache_dir, name + '.cube')
+    manifestpath = cubepath + '.manifest.json'
+
+    if fingerprint is None:
+        fingerprint = source_fingerprint(filepath, cache_dir)
+
+    if os.path.exists(manifestpath) and os.path.isdir(cubepath):
+        try:
+            with open(manifestpath, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('source') == fingerprint and manifest.get('cube_version') == const_cube_version and \
+                    manifest.get('variant', '') == variant:
+                return CrashCube.load(cubepath)
+        except (IOError, ValueError):
+            pass
+
+    if df is None:
+        return None
+
+    cube = CrashCube.from_frame(df)
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.exists(manifestpath):
+        os.remove(manifestpath)
+    cube.save(cubepath)
+    with open(manifestpath, 'w') as f:
+        json.dump({'source': fingerprint, 'cube_version': const_cube_version, 'variant': variant}, f)
+
+    return cube
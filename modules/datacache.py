@@ -0,0 +1,358 @@
+import os
+import json
+import shutil
+import hashlib
+
+# data access and manipulation libraries
+import pandas as pd
+import numpy as np
+from pandas.api.types import union_categoricals
+
+# ****************************************************************
+# columnar on-disk cache of the post-etl crash dataframe
+# a warm kernel reloads the typed columns instead of re-parsing the raw csv
+# ****************************************************************
+
+const_default_cache_dir = 'assets/data/cache'
+const_cache_formats = ('npy', 'parquet', 'feather')
+
+# bump whenever etl_crash_data changes the frame it produces so stale caches are rebuilt
+const_etl_version = 3
+
+# read the source in 8 MB pieces while hashing
+const_hash_chunk_size = 8 * 1024 * 1024
+
+# absolute path -> the last fingerprint taken of it in this process
+_fingerprints = {}
+
+
+def source_fingerprint(filepath: str, cache_dir: str = None) -> dict:
+    """
+    Builds the cache key of a source file from its size, modification time and content hash.
+    The content is only hashed when the size or modification time differ from the last fingerprint taken of the
+    file - kept in memory and, with a cache_dir, next to the caches - so a warm load costs a stat, not a pass over
+    the whole CSV.
+    Args:
+        filepath (str): The source CSV file
+        cache_dir (str): Directory holding the caches, where the last fingerprint is remembered across processes
+    Returns:
+        A dictionary with the size, mtime (ns) and blake2b content hash of the file
+    """
+    stat = os.stat(filepath)
+    memopath = os.path.join(cache_dir, os.path.basename(filepath) + '.fingerprint.json') if cache_dir else None
+
+    known = _fingerprints.get(os.path.abspath(filepath))
+    if known is None and memopath is not None and os.path.exists(memopath):
+        try:
+            with open(memopath, 'r') as f:
+                known = json.load(f)
+        except (IOError, ValueError):
+            known = None
+    if known is not None and known.get('size') == stat.st_size and known.get('mtime_ns') == stat.st_mtime_ns:
+        _fingerprints[os.path.abspath(filepath)] = known
+        return dict(known)
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(const_hash_chunk_size), b''):
+            digest.update(chunk)
+
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest.hexdigest()}
+    _fingerprints[os.path.abspath(filepath)] = fingerprint
+    if memopath is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(memopath + '.tmp', 'w') as f:
+                json.dump(fingerprint, f)
+            os.replace(memopath + '.tmp', memopath)
+        except OSError:
+            pass
+    return dict(fingerprint)
+
+
+def cache_variant(columns: list = None, compact: bool = True) -> str:
+    """
+    Names the flavour of a cached frame so projected or differently typed loads do not overwrite each other.
+    Args:
+        columns (list): Projected source columns, None when every column is loaded
+        compact (bool): Whether compact dtypes were applied
+    Returns:
+        A short string that is empty for the full, compact frame
+    """
+    parts = [] if compact else ['wide']
+    if columns is not None:
+        parts.append('cols-' + hashlib.blake2b(','.join(sorted(columns)).encode(), digest_size=4).hexdigest())
+    return '-'.join(parts)
+
+
+def tag_frame_version(df: pd.DataFrame, fingerprint: dict, variant: str = '') -> pd.DataFrame:
+    """
+    Attaches the version of a loaded frame - its source fingerprint, flavour and etl version - to df.attrs, which
+    pandas hands on to copies and reorderings of the same rows. dataset_version then reads it instead of hashing
+    the whole frame.
+    Args:
+        df (pd.DataFrame): The frame loaded from the source
+        fingerprint (dict): The source's fingerprint, see source_fingerprint
+        variant (str): Flavour of the frame from cache_variant
+    Returns:
+        df
+    """
+    df.attrs['version'] = f"{fingerprint['hash']}:{variant}:{const_etl_version}"
+    # a filtered frame inherits the attrs as well - the row count tells it apart
+    df.attrs['version_rows'] = len(df)
+    return df
+
+
+def frame_version(df: pd.DataFrame) -> str:
+    """
+    The version attached by tag_frame_version, None when the frame has none or is not the tagged set of rows.
+    """
+    if df.attrs.get('version') is None or df.attrs.get('version_rows') != len(df):
+        return None
+    return df.attrs['version']
+
+
+def _cache_paths(filepath: str, cache_dir: str, cache_format: str, variant: str = '') -> tuple:
+    """
+    Resolves where the cached data and its manifest live for a given source file.
+    Args:
+        filepath (str): The source CSV file
+        cache_dir (str): Directory holding the caches
+        cache_format (str): One of 'npy', 'parquet' or 'feather'
+        variant (str): Flavour of the cached frame from cache_variant
+    Returns:
+        A tuple of (data path, manifest path)
+    """
+    if cache_format not in const_cache_formats:
+        raise ValueError(f"Unknown cache format {cache_format}, expected one of {const_cache_formats}")
+
+    name = os.path.basename(filepath)
+    if variant:
+        name = f'{name}.{variant}'
+    datapath = os.path.join(cache_dir, f'{name}.{cache_format}')
+    return datapath, datapath + '.manifest.json'
+
+
+def _save_npy_columns(df: pd.DataFrame, datapath: str) -> list:
+    """
+    Stores each column of the frame as its own .npy file, categorical columns as codes plus categories.
+    Args:
+        df (pd.DataFrame): Frame to store
+        datapath (str): Directory that receives the column files
+    Returns:
+        The column descriptions needed to rebuild the frame with the same dtypes
+    """
+    os.makedirs(datapath)
+    columns = []
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        entry = {'name': name, 'file': f'{i}.npy', 'dtype': str(col.dtype)}
+
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            entry['kind'] = 'category'
+            entry['ordered'] = bool(col.dtype.ordered)
+            entry['categories_dtype'] = str(col.dtype.categories.dtype)
+            np.save(os.path.join(datapath, f'{i}.categories.npy'),
+                    np.asarray(col.dtype.categories, dtype=object), allow_pickle=True)
+            np.save(os.path.join(datapath, entry['file']), col.cat.codes.to_numpy())
+        elif isinstance(col.dtype, np.dtype) and col.dtype != object:
+            # plain numpy dtypes (numbers, bools, datetime64) store natively
+            entry['kind'] = 'numpy'
+            np.save(os.path.join(datapath, entry['file']), col.to_numpy())
+        else:
+            # strings and extension dtypes are stored as objects and cast back on load
+            entry['kind'] = 'object'
+            np.save(os.path.join(datapath, entry['file']), col.to_numpy(dtype=object), allow_pickle=True)
+
+        columns.append(entry)
+    return columns
+
+
+def _load_npy_columns(datapath: str, columns: list, mmap_mode: str = None) -> pd.DataFrame:
+    """
+    Rebuilds a frame from the .npy column files written by _save_npy_columns.
+    Args:
+        datapath (str): Directory holding the column files
+        columns (list): Column descriptions from the manifest
+        mmap_mode (str): 'r' maps numeric columns and categorical codes from disk instead of reading them,
+                         so processes loading the same files share the pages (string columns are still read)
+    Returns:
+        The restored pandas DataFrame
+    """
+    data = {}
+    for entry in columns:
+        mappable = entry['kind'] != 'object'
+        values = np.load(os.path.join(datapath, entry['file']), allow_pickle=entry['kind'] != 'numpy',
+                         mmap_mode=mmap_mode if mappable else None)
+
+        if entry['kind'] == 'category':
+            categories = np.load(os.path.join(datapath, entry['file'].replace('.npy', '.categories.npy')),
+                                 allow_pickle=True)
+            categories = pd.Index(categories).astype(entry['categories_dtype'])
+            data[entry['name']] = pd.Categorical.from_codes(values, categories=categories, ordered=entry['ordered'])
+        elif entry['kind'] == 'object':
+            data[entry['name']] = pd.Series(values).astype(entry['dtype'])
+        else:
+            data[entry['name']] = values
+
+    # without a copy the mapped columns stay backed by the files
+    return pd.DataFrame(data, copy=mmap_mode is None)
+
+
+def save_cached_frame(df: pd.DataFrame, filepath: str, fingerprint: dict = None,
+                      cache_dir: str = const_default_cache_dir, cache_format: str = 'npy', variant: str = '') -> str:
+    """
+    Stores the post-etl frame of a source file in the columnar cache, replacing any older copy.
+    Args:
+        df (pd.DataFrame): The transformed crash dataframe
+        filepath (str): The source CSV file the frame was built from
+        fingerprint (dict): Key of the source from source_fingerprint, computed when not given
+        cache_dir (str): Directory holding the caches
+        cache_format (str): One of 'npy', 'parquet' or 'feather'
+        variant (str): Flavour of the cached frame from cache_variant
+    Returns:
+        The path of the cached data
+    """
+    datapath, manifestpath = _cache_paths(filepath, cache_dir, cache_format, variant)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    if fingerprint is None:
+        fingerprint = source_fingerprint(filepath, cache_dir)
+
+    manifest = {'source': fingerprint, 'etl_version': const_etl_version, 'format': cache_format, 'rows': len(df)}
+
+    # write next to the final location first so a crash mid-write never leaves a half cache behind
+    tmppath = datapath + '.tmp'
+    if os.path.isdir(tmppath):
+        shutil.rmtree(tmppath)
+    elif os.path.exists(tmppath):
+        os.remove(tmppath)
+
+    df = df.reset_index(drop=True)
+    if cache_format == 'npy':
+        manifest['columns'] = _save_npy_columns(df, tmppath)
+    elif cache_format == 'parquet':
+        df.to_parquet(tmppath, index=False)
+    else:
+        df.to_feather(tmppath)
+
+    # drop the manifest first - data without a manifest is never trusted
+    if os.path.exists(manifestpath):
+        os.remove(manifestpath)
+    if os.path.isdir(datapath):
+        shutil.rmtree(datapath)
+    os.replace(tmppath, datapath)
+
+    with open(manifestpath + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifestpath + '.tmp', manifestpath)
+
+    return datapath
+
+
+def load_cached_frame(filepath: str, fingerprint: dict = None, cache_dir: str = const_default_cache_dir,
+                      cache_format: str = 'npy', variant: str = '') -> pd.DataFrame:
+    """
+    Loads the cached post-etl frame of a source file when the cache still matches the source.
+    Args:
+        filepath (str): The source CSV file
+        fingerprint (dict): Key of the source from source_fingerprint, computed when not given
+        cache_dir (str): Directory holding the caches
+        cache_format (str): One of 'npy', 'parquet' or 'feather'
+        variant (str): Flavour of the cached frame from cache_variant
+    Returns:
+        The cached pandas DataFrame, or None when there is no valid cache
+    """
+    datapath, manifestpath = _cache_paths(filepath, cache_dir, cache_format, variant)
+    if not os.path.exists(manifestpath) or not os.path.exists(datapath):
+        return None
+
+    try:
+        with open(manifestpath, 'r') as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return None
+
+    if fingerprint is None:
+        fingerprint = source_fingerprint(filepath, cache_dir)
+
+    if manifest.get('source') != fingerprint or manifest.get('etl_version') != const_etl_version:
+        return None
+
+    if cache_format == 'npy':
+        return _load_npy_columns(datapath, manifest['columns'])
+    if cache_format == 'parquet':
+        return pd.read_parquet(datapath)
+    return pd.read_feather(datapath)
+
+
+def concat_frames(frames: list) -> pd.DataFrame:
+    """
+    Stacks frames produced piece by piece (chunks, byte ranges) into one, unifying categorical columns so the
+    result carries the same sorted categories a single full load would have.
+    Args:
+        frames (list): The pandas DataFrames to stack, all with the same columns
+    Returns:
+        One pandas DataFrame with a fresh RangeIndex
+    """
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    first = frames[0]
+    categorical = [name for name in first.columns if isinstance(first[name].dtype, pd.CategoricalDtype)]
+    if categorical:
+        frames = [frame.copy(deep=False) for frame in frames]
+        for name in categorical:
+            # frames built from the same lookup table (e.g. day names) already agree - keep their order
+            if all(frame[name].dtype == first[name].dtype for frame in frames):
+                continue
+            unified = union_categoricals([frame[name] for frame in frames], sort_categories=True)
+            dtype = pd.CategoricalDtype(unified.categories, ordered=unified.ordered)
+            for frame in frames:
+                frame[name] = frame[name].cat.set_categories(dtype.categories)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_frame_part(df: pd.DataFrame, partsdir: str, part: int) -> str:
+    """
+    Stores one piece of a larger frame as a directory of .npy columns inside partsdir.
+    Args:
+        df (pd.DataFrame): The piece to store
+        partsdir (str): Directory collecting all the pieces
+        part (int): Sequence number of the piece, pieces are read back in this order
+    Returns:
+        The path of the stored piece
+    """
+    partpath = os.path.join(partsdir, f'part-{part:05d}')
+    if os.path.isdir(partpath):
+        shutil.rmtree(partpath)
+
+    columns = _save_npy_columns(df.reset_index(drop=True), partpath)
+    with open(os.path.join(partpath, 'columns.json'), 'w') as f:
+        json.dump(columns, f)
+    return partpath
+
+
+def read_frame_parts(partsdir: str, mmap_mode: str = None) -> pd.DataFrame:
+    """
+    Reads back every piece stored with write_frame_part and stacks them in order.
+    Args:
+        partsdir (str): Directory collecting all the pieces
+        mmap_mode (str): 'r' maps the columns from disk (see _load_npy_columns) - only a single piece stays mapped,
+                         stacking several copies them
+    Returns:
+        The combined pandas DataFrame, or None when there are no pieces
+    """
+    frames = []
+    for name in sorted(os.listdir(partsdir)):
+        partpath = os.path.join(partsdir, name)
+        if not name.startswith('part-') or not os.path.isdir(partpath):
+            continue
+        with open(os.path.join(partpath, 'columns.json'), 'r') as f:
+            columns = json.load(f)
+        frames.append(_load_npy_columns(partpath, columns, mmap_mode))
+
+    if not frames:
+        return None
+    return concat_frames(frames)
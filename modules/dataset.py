@@ -0,0 +1,213 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# the version get_chicago_crash_data attaches to a frame
+from .datacache import frame_version
+
+# uniform grid over the crash coordinates - area selections read the cells they touch
+from .spatial import SpatialIndex, resolve_area
+
+# ****************************************************************
+# crash dataset wrapper - rows laid out by year, then by total injuries
+# so every (year, minimal injury) selection is one contiguous slice of the frame
+# ****************************************************************
+
+# row positions of the latest areas asked for - the dashboard panels all select the same one
+const_area_cache_entries = 16
+
+
+class CrashDataset:
+    """
+    Owns the crash frame, reordered once so each CRASH_YEAR is a contiguous block of rows sorted by
+    INJURIES_TOTAL (original order kept within ties). A (year, minimalinjury) query is then two binary searches
+    and a positional slice - no copy of the full history and no boolean scan over it. Crashes with coordinates are
+    also indexed by a spatial grid (see SpatialIndex), so an area narrows a selection by the rows inside it only.
+    The plot functions accept a CrashDataset anywhere they accept the dataframe.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: str = None):
+        """
+        Args:
+            df (pd.DataFrame): The transformed crash dataframe. The dataset keeps a reordered copy, so the
+                               original can be released afterwards.
+            version (str): Identifies this content for caches (e.g. the source fingerprint), taken from the frame
+                           (see dataset_version) when not given - a reloaded or synced dataset gets a new version
+        """
+        years = df['CRASH_YEAR'].to_numpy()
+        if 'INJURIES_TOTAL' in df.columns:
+            order = np.lexsort((df['INJURIES_TOTAL'].to_numpy(), years))
+        else:
+            order = np.argsort(years, kind='stable')
+
+        self.frame = df.take(order).reset_index(drop=True)
+        self.order = order
+
+        # [start, end) row positions of each year
+        sorted_years = self.frame['CRASH_YEAR'].to_numpy()
+        self._years = np.unique(sorted_years)
+        starts = np.searchsorted(sorted_years, self._years, side='left')
+        ends = np.searchsorted(sorted_years, self._years, side='right')
+        self.partitions = {int(year): (int(start), int(end)) for year, start, end in zip(self._years, starts, ends)}
+
+        self._injuries = self.frame['INJURIES_TOTAL'].to_numpy() if 'INJURIES_TOTAL' in self.frame.columns else None
+
+        self.spatial = None
+        if 'LATITUDE' in self.frame.columns and 'LONGITUDE' in self.frame.columns:
+            self.spatial = SpatialIndex.from_frame(self.frame)
+        self._areas = OrderedDict()
+        self._areas_lock = threading.Lock()
+
+        self.version = version if version is not None else dataset_version(self.frame)
+
+    @property
+    def columns(self) -> pd.Index:
+        return self.frame.columns
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __getitem__(self, column: str) -> pd.Series:
+        return self.frame[column]
+
+    def years(self) -> list:
+        """
+        The years present in the data, ascending.
+        """
+        return [int(year) for year in self._years]
+
+    def year_counts(self) -> pd.Series:
+        """
+        Crash count per year, straight from the partition sizes.
+        """
+        return pd.Series({year: end - start for year, (start, end) in self.partitions.items()}, name='count')
+
+    def bounds(self, year: int, minimalinjury: int = None) -> tuple:
+        """
+        The [start, end) row positions of a year's crashes with at least minimalinjury injuries.
+        Args:
+            year (int): The year to select
+            minimalinjury (int): Lowest INJURIES_TOTAL to keep, None keeps every crash
+        Returns:
+            A (start, end) tuple, empty (0, 0) when the year is not in the data
+        """
+        if year not in self.partitions:
+            return 0, 0
+
+        start, end = self.partitions[year]
+        if minimalinjury is not None and self._injuries is not None:
+            start = start + int(np.searchsorted(self._injuries[start:end], minimalinjury, side='left'))
+        return start, end
+
+    def area_positions(self, area) -> np.ndarray:
+        """
+        The sorted row positions of every crash in an area, from the spatial index.
+        Args:
+            area: A name of const_chicago_areas, a (south, west, north, east) box or a (latitude, longitude, metres)
+                  circle
+        Returns:
+            A numpy array of row positions, treat it as read only
+        """
+        if self.spatial is None:
+            raise ValueError('An area needs the LATITUDE and LONGITUDE columns, the dataset has no coordinates')
+
+        area = resolve_area(area)
+        with self._areas_lock:
+            if area in self._areas:
+                self._areas.move_to_end(area)
+                return self._areas[area]
+
+        rows = self.spatial.query(area)
+        with self._areas_lock:
+            self._areas[area] = rows
+            while len(self._areas) > const_area_cache_entries:
+                self._areas.popitem(last=False)
+        return rows
+
+    def positions(self, year: int = None, minimalinjury: int = None, area=None):
+        """
+        The rows of a selection as a slice when they are contiguous (one year), else as an array of positions.
+        Args:
+            year (int): The year to select, None for every year
+            minimalinjury (int): Lowest INJURIES_TOTAL to keep, None keeps every crash
+            area: Only the crashes in this area (see area_positions), None keeps every crash
+        Returns:
+            A slice or a numpy array of row positions
+        """
+        if area is not None:
+            rows = self.area_positions(area)
+            if year is not None:
+                # the area's rows are sorted, so the year's [start, end) is two binary searches into them
+                start, end = self.bounds(year, minimalinjury)
+                return rows[np.searchsorted(rows, start):np.searchsorted(rows, end)]
+            if minimalinjury is not None and self._injuries is not None:
+                return rows[self._injuries[rows] >= minimalinjury]
+            return rows
+
+        if year is not None:
+            return slice(*self.bounds(year, minimalinjury))
+        if minimalinjury is None:
+            return slice(0, len(self.frame))
+
+        ranges = [self.bounds(int(y), minimalinjury) for y in self._years]
+        return np.concatenate([np.arange(start, end) for start, end in ranges]) if ranges else np.arange(0)
+
+    def select(self, year: int = None, minimalinjury: int = None, area=None) -> pd.DataFrame:
+        """
+        The crashes of a year (or every year) with at least minimalinjury injuries.
+        A single year is a positional slice of the owned frame - no rows are copied.
+        Args:
+            year (int): The year to select, None for every year
+            minimalinjury (int): Lowest INJURIES_TOTAL to keep, None keeps every crash
+            area: Only the crashes in this area (see area_positions), None keeps every crash
+        Returns:
+            A pandas DataFrame, treat it as read only
+        """
+        positions = self.positions(year, minimalinjury, area)
+        if isinstance(positions, slice):
+            return self.frame.iloc[positions]
+        return self.frame.take(positions)
+
+    def column(self, name: str, year: int = None, minimalinjury: int = None, area=None) -> pd.Series:
+        """
+        One column of a selection, a view on the owned data for a single year.
+        Args:
+            name (str): Column to return
+            year (int): The year to select, None for every year
+            minimalinjury (int): Lowest INJURIES_TOTAL to keep, None keeps every crash
+            area: Only the crashes in this area (see area_positions), None keeps every crash
+        Returns:
+            A pandas Series, treat it as read only
+        """
+        positions = self.positions(year, minimalinjury, area)
+        if isinstance(positions, slice):
+            return self.frame[name].iloc[positions]
+        return self.frame[name].take(positions)
+
+
+def dataset_version(df) -> str:
+    """
+    A short fingerprint of a crash dataset's content, used to key anything derived from it.
+    A CrashDataset carries its version already. A dataframe loaded by get_chicago_crash_data carries the source
+    fingerprint it was loaded from (see tag_frame_version), anything else is hashed row by row (one pass over the
+    data). A frame changed in place keeps its version - invalidate what was derived from it.
+    Args:
+        df (pd.DataFrame or CrashDataset): The crash dataset
+    Returns:
+        A hex string that changes whenever the rows or columns change
+    """
+    if isinstance(df, CrashDataset):
+        return df.version
+
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(','.join(map(str, df.columns)).encode())
+    version = frame_version(df)
+    if version is not None:
+        # a projection of the loaded frame is other content - the columns stay part of the version
+        digest.update(version.encode())
+    else:
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
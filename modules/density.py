@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+
+# scipy is only imported once a large kde is binned
+from .lazy import lazy_import
+signal = lazy_import('scipy.signal')
+
+# ****************************************************************
+# binned kernel density - the data is reduced to counts first so the cost of
+# evaluating the curve depends on the distinct values, not the number of crashes
+# ****************************************************************
+
+# fewest points of the regular grid the fft variant bins continuous data onto
+const_kde_grid_size = 1024
+
+# grid points per bandwidth - keeps the binning error small on long tailed columns
+const_kde_grid_per_bandwidth = 20
+
+# most grid points, whatever the spread of the data
+const_kde_max_grid_size = 2 ** 20
+
+# the gaussian kernel is negligible past this many bandwidths
+const_kde_cutoff = 4.0
+
+
+def distinct_counts(values) -> tuple:
+    """
+    Reduces a column to its distinct values and how often each occurs.
+    Small non negative whole numbers (hours, injury counts) are counted with bincount, anything else with unique.
+    Args:
+        values (pd.Series or np.ndarray): The column, missing values are dropped
+    Returns:
+        A tuple of (distinct values, counts) numpy arrays, values ascending
+    """
+    values = pd.Series(values).dropna().to_numpy()
+    if values.dtype.kind in 'iu' and len(values) and values.min() >= 0:
+        counts = np.bincount(values)
+        seen = np.flatnonzero(counts)
+        return seen, counts[seen]
+    return np.unique(values, return_counts=True)
+
+
+def kde_bandwidth(values: np.ndarray, counts: np.ndarray, bw_method='scott') -> float:
+    """
+    The kernel standard deviation scipy's gaussian_kde would pick for the data the counts describe.
+    Args:
+        values (np.ndarray): Distinct values
+        counts (np.ndarray): How often each value occurs
+        bw_method (str or float): 'scott', 'silverman' or a scalar factor, as in gaussian_kde
+    Returns:
+        The bandwidth in the units of the data
+    """
+    values = np.asarray(values, dtype='float64')
+    counts = np.asarray(counts, dtype='float64')
+    n = counts.sum()
+
+    # sample (ddof=1) variance, as gaussian_kde's covariance
+    mean = np.dot(values, counts) / n
+    variance = np.dot((values - mean) ** 2, counts) / (n - 1)
+
+    if bw_method == 'scott':
+        factor = n ** (-1.0 / 5)
+    elif bw_method == 'silverman':
+        factor = (n * 3.0 / 4.0) ** (-1.0 / 5)
+    elif np.isscalar(bw_method) and not isinstance(bw_method, str):
+        factor = float(bw_method)
+    else:
+        raise ValueError(f"Unknown bandwidth method {bw_method}, expected 'scott', 'silverman' or a number")
+
+    return float(np.sqrt(variance) * factor)
+
+
+def counts_kde(values, counts, points, bw_method='scott') -> np.ndarray:
+    """
+    Gaussian kernel density of data given as distinct values with counts, evaluated at points.
+    Matches gaussian_kde over the expanded data (every value repeated by its count) at a cost of
+    distinct values x points.
+    Args:
+        values (np.ndarray): Distinct values
+        counts (np.ndarray): How often each value occurs
+        points (np.ndarray): Where to evaluate the density
+        bw_method (str or float): 'scott', 'silverman' or a scalar factor, as in gaussian_kde
+    Returns:
+        The density at each point
+    """
+    values = np.asarray(values, dtype='float64')
+    counts = np.asarray(counts, dtype='float64')
+    points = np.asarray(points, dtype='float64')
+
+    bandwidth = kde_bandwidth(values, counts, bw_method)
+    z = (points[:, None] - values[None, :]) / bandwidth
+    kernel = np.exp(-0.5 * z ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    return kernel @ counts / counts.sum()
+
+
+def fft_kde(values, points, weights=None, bw_method='scott', gridsize: int = const_kde_grid_size) -> np.ndarray:
+    """
+    Gaussian kernel density of a continuous column: the data is linearly binned onto a regular grid, the grid is
+    convolved with the kernel through an FFT and the result interpolated at points. The cost is one pass over the
+    data plus grid log grid, close to gaussian_kde when the grid is fine compared to the bandwidth.
+    Args:
+        values (np.ndarray): The observations
+        points (np.ndarray): Where to evaluate the density
+        weights (np.ndarray): Optional weight (count) of each observation
+        bw_method (str or float): 'scott', 'silverman' or a scalar factor, as in gaussian_kde
+        gridsize (int): Fewest grid points, more are used when the bandwidth is small against the spread
+    Returns:
+        The density at each point
+    """
+    values = np.asarray(values, dtype='float64')
+    weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype='float64')
+    points = np.asarray(points, dtype='float64')
+
+    # every observation weighted by its count, the values need not be distinct
+    bandwidth = kde_bandwidth(values, weights, bw_method)
+
+    low = min(values.min(), points.min()) - const_kde_cutoff * bandwidth
+    high = max(values.max(), points.max()) + const_kde_cutoff * bandwidth
+    gridsize = int(min(max(gridsize, np.ceil((high - low) / bandwidth * const_kde_grid_per_bandwidth)),
+                       const_kde_max_grid_size))
+    grid, step = np.linspace(low, high, gridsize, retstep=True)
+
+    # linear binning - each observation is split between its two neighbouring grid points
+    position = (values - low) / step
+    left = np.clip(np.floor(position).astype('int64'), 0, gridsize - 2)
+    fraction = position - left
+    binned = np.bincount(left, weights=weights * (1 - fraction), minlength=gridsize)
+    binned += np.bincount(left + 1, weights=weights * fraction, minlength=gridsize)
+
+    reach = int(np.ceil(const_kde_cutoff * bandwidth / step))
+    offsets = np.arange(-reach, reach + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+
+    density = signal.fftconvolve(binned, kernel, mode='same') / weights.sum()
+    return np.interp(points, grid, density)
+
+
+def count_moments(values, counts) -> dict:
+    """
+    Mean, population standard deviation and Fisher kurtosis of data given as distinct values with counts,
+    the same numbers np.mean, np.std and scipy.stats.kurtosis give on the expanded data.
+    Args:
+        values (np.ndarray): Distinct values
+        counts (np.ndarray): How often each value occurs
+    Returns:
+        A dictionary with n, mean, std and kurtosis
+    """
+    values = np.asarray(values, dtype='float64')
+    counts = np.asarray(counts, dtype='float64')
+    n = counts.sum()
+
+    mean = np.dot(values, counts) / n
+    deviation = values - mean
+    m2 = np.dot(deviation ** 2, counts) / n
+    m4 = np.dot(deviation ** 4, counts) / n
+    return {'n': int(n), 'mean': float(mean), 'std': float(np.sqrt(m2)), 'kurtosis': float(m4 / m2 ** 2 - 3.0)}
+
+
+def count_quantiles(values, counts, q) -> np.ndarray:
+    """
+    Quantiles of data given as distinct values with counts - np.quantile's default (linear) interpolation on the
+    expanded data, found by a search over the cumulative counts.
+    Args:
+        values (np.ndarray): Distinct values, ascending
+        counts (np.ndarray): How often each value occurs
+        q (float or np.ndarray): Quantiles to compute, between 0 and 1
+    Returns:
+        The quantiles, one per q
+    """
+    values = np.asarray(values, dtype='float64')
+    cumulative = np.cumsum(np.asarray(counts, dtype='int64'))
+    position = (cumulative[-1] - 1) * np.atleast_1d(np.asarray(q, dtype='float64'))
+
+    # the sorted data's elements below and above each position, and how far between them it sits
+    below = np.floor(position)
+    lower = values[np.searchsorted(cumulative, below, side='right')]
+    upper = values[np.searchsorted(cumulative, np.minimum(below + 1, cumulative[-1] - 1), side='right')]
+    return lower + (position - below) * (upper - lower)
+
+
+def violin_stats(values, counts, bw_method='scott', cut: float = 2.0, gridsize: int = 100) -> dict:
+    """
+    Everything a violin of the data is drawn from, computed from distinct values with counts: seaborn's kde curve
+    (same bandwidth, cut and grid) and matplotlib's boxplot_stats quartiles and whiskers.
+    Args:
+        values (np.ndarray): Distinct values, ascending
+        counts (np.ndarray): How often each value occurs
+        bw_method (str or float): 'scott', 'silverman' or a scalar factor, as in gaussian_kde
+        cut (float): Bandwidths the curve reaches past the smallest and largest value
+        gridsize (int): Points the curve is evaluated at
+    Returns:
+        A dictionary with n, mean, support and density (None when the data has no spread), q1, median, q3 and
+        the whisker ends whislo and whishi
+    """
+    values = np.asarray(values, dtype='float64')
+    counts = np.asarray(counts, dtype='int64')
+    q1, median, q3 = count_quantiles(values, counts, [0.25, 0.5, 0.75])
+
+    # whiskers reach the furthest data within 1.5 inter quartile ranges of the box
+    iqr = q3 - q1
+    low = values[values >= q1 - 1.5 * iqr]
+    high = values[values <= q3 + 1.5 * iqr]
+    stats = {'n': int(counts.sum()), 'mean': float(np.dot(values, counts) / counts.sum()),
+             'q1': float(q1), 'median': float(median), 'q3': float(q3),
+             'whislo': float(min(low.min(), q1)) if len(low) else float(q1),
+             'whishi': float(max(high.max(), q3)) if len(high) else float(q3),
+             'support': None, 'density': None}
+
+    # a single distinct value (or a single crash) has no curve - drawn as a line
+    if len(values) < 2 or counts.sum() < 2:
+        return stats
+
+    bandwidth = kde_bandwidth(values, counts, bw_method)
+    support = np.linspace(values.min() - bandwidth * cut, values.max() + bandwidth * cut, gridsize)
+    stats.update({'support': support, 'density': counts_kde(values, counts, support, bw_method)})
+    return stats
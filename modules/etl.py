@@ -0,0 +1,981 @@
+import io
+import os
+import json
+import mmap
+import shutil
+import time
+import hashlib
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# data access and manipulation libraries
+import pandas as pd
+import numpy as np
+
+# typed columnar cache of the transformed data
+from .datacache import const_default_cache_dir, source_fingerprint, cache_variant, load_cached_frame, \
+    save_cached_frame, write_frame_part, concat_frames, tag_frame_version
+
+# opt in stage spans (download, parse, etl)
+from .profiling import profiled, profiler, span
+
+# per year power sums and hour histogram, merged chunk by chunk and across syncs
+from .summary import DistributionSummary
+
+# http client - only imported once something is downloaded
+from .lazy import lazy_import
+requests = lazy_import('requests')
+
+# ****************************************************************
+# loading and etl - download, parse, transform and sync the crash export
+# with nothing heavier than pandas and numpy, no plotting or widget libraries
+# ****************************************************************
+
+const_default_storage_dir = 'assets/data'
+const_src_url = "https://data.cityofchicago.org/api/views/85ca-t3if/rows.csv?fourfour=85ca-t3if&cacheBust=1742398767&date=20250319&accessType=DOWNLOAD"
+const_default_storage_file = "assets/data/chicago_traffic_crashes.csv"
+
+# timestamp layout used by the csv export
+const_crash_date_format = "%m/%d/%Y %I:%M:%S %p"
+
+# where the digits sit in 03/19/2025 02:15:00 PM
+const_date_digit_positions = [0, 1, 3, 4, 6, 7, 8, 9, 11, 12, 14, 15, 17, 18]
+
+# lookup tables for the derived name columns, in calendar order
+const_day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+const_month_names = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September',
+                     'October', 'November', 'December']
+
+# SODA api of the same dataset - used to pull only new or changed crashes
+const_soda_url = "https://data.cityofchicago.org/resource/85ca-t3if.csv"
+const_sync_page_size = 50_000
+const_export_date_columns = ['CRASH_DATE', 'DATE_POLICE_NOTIFIED']
+
+# the columns read by the plotting functions - pass as columns= to get_chicago_crash_data for a lean frame
+const_injury_columns = ['INJURIES_TOTAL', 'INJURIES_FATAL', 'INJURIES_INCAPACITATING', 'INJURIES_NO_INDICATION',
+                        'INJURIES_NON_INCAPACITATING', 'INJURIES_UNKNOWN', 'INJURIES_REPORTED_NOT_EVIDENT']
+const_category_columns = ['LIGHTING_CONDITION', 'WEATHER_CONDITION', 'ROADWAY_SURFACE_COND']
+const_plot_columns = ['CRASH_DATE', 'CRASH_HOUR'] + const_injury_columns + const_category_columns
+
+# rows parsed at a time by etl_crash_data_chunked
+const_etl_chunk_size = 250_000
+
+# running totals kept by etl_crash_data_chunked when no other aggregates are asked for
+const_default_chunk_aggregates = {
+    'crashes_by_year': lambda df: df.groupby('CRASH_YEAR').size(),
+    'crashes_by_year_hour': lambda df: df.groupby(['CRASH_YEAR', 'CRASH_HOUR']).size(),
+    'hour_summary': DistributionSummary.from_frame,
+}
+
+# stream downloads to disk in 1 MB pieces so the whole export never sits in memory
+const_download_chunk_size = 1024 * 1024
+
+# the least csv bytes per worker of a parallel load - below it the pool costs more than it saves
+const_parallel_min_bytes = 32 * 1024 * 1024
+
+# quotes are counted this many bytes at a time while aligning byte ranges on records
+const_quote_scan_block = 64 * 1024 * 1024
+
+
+def _read_download_meta(metapath: str) -> dict:
+    """
+    Reads the sidecar metadata (ETag, Last-Modified, completion flag) kept next to a downloaded file.
+    Args:
+        metapath (str): Path of the json sidecar file
+    Returns:
+        A dictionary with the stored metadata, empty when nothing is stored or it is unreadable
+    """
+    if not os.path.exists(metapath):
+        return {}
+    try:
+        with open(metapath, 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def _write_download_meta(metapath: str, meta: dict):
+    """
+    Writes the sidecar metadata for a download, replacing the previous copy atomically.
+    Args:
+        metapath (str): Path of the json sidecar file
+        meta (dict): Metadata to store
+    """
+    tmppath = metapath + '.tmp'
+    with open(tmppath, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmppath, metapath)
+
+
+@profiled('download')
+def download_chicago_crashdata(storein: str = const_default_storage_file, src_url: str = const_src_url,
+                               force: bool = False, chunk_size: int = const_download_chunk_size,
+                               resume: bool = True, conditional: bool = True, timeout: float = 60) -> dict:
+    """
+    Downloads the Chicago crash data from the public site and stores it in the provided filepath.
+    The body is streamed to a temporary '.part' file in fixed size chunks and renamed into place once complete,
+    so memory stays flat regardless of the file size.  A partial file left by a dropped connection is resumed
+    with an HTTP Range request and an existing file is only transferred again when the server's
+    ETag/Last-Modified show it changed.
+    Args:
+        storein (str): File where to store the downloaded data
+        src_url (str): Url of the CSV export (point it to a local server for testing)
+        force (bool): Delete any existing or partial file and download everything again
+        chunk_size (int): Number of bytes read from the connection and written to disk at a time
+        resume (bool): Continue a partial download instead of starting over
+        conditional (bool): Ask the server if an existing file changed before transferring it again
+        timeout (float): Seconds to wait on the connection before giving up
+    Returns:
+        A dictionary with the outcome ('status'), bytes transferred, elapsed seconds, bytes/sec and the
+        peak memory (bytes) allocated while downloading - measured only while profiling (see enable_profiling)
+    """
+    url = src_url
+    partpath = storein + '.part'
+    metapath = storein + '.meta.json'
+
+    stats = {'status': 'present', 'bytes': 0, 'seconds': 0.0, 'bytes_per_sec': 0.0, 'peak_memory_bytes': 0}
+
+    # only delete the file on force and it exists
+    if force == True:
+        for path in (storein, partpath, metapath):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                    print(f"Existing file {path} deleted via Force being set to True.")
+                except OSError as e:
+                    print(f"Error deleting existing file: {e}. Please delete or replace manually if needed.")
+
+    meta = _read_download_meta(metapath)
+    headers = {}
+
+    if resume == True and os.path.exists(partpath) and meta.get('complete') == False:
+        # pick up where the last attempt stopped - If-Range makes the server send everything again if it changed
+        offset = os.path.getsize(partpath)
+        headers['Range'] = f'bytes={offset}-'
+        validator = meta.get('etag') or meta.get('last_modified')
+        if validator:
+            headers['If-Range'] = validator
+    elif os.path.exists(storein):
+        if conditional == False or meta.get('complete') != True:
+            print(f"CSV present in {storein}.")
+            return stats
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        if not headers:
+            print(f"CSV present in {storein}.")
+            return stats
+
+    # the assets/data directory is made on the first download rather than on import
+    os.makedirs(os.path.dirname(storein) or '.', exist_ok=True)
+
+    # the peak allocation is only measured while profiling traces memory - tracemalloc slows the chunk loop down
+    tracing = profiler.enabled and profiler.trace_memory and tracemalloc.is_tracing()
+    if tracing:
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+
+    try:
+        response = requests.get(url, headers=headers, stream=True, timeout=timeout)
+        if response.status_code == 416 and 'Range' in headers:
+            # the range asked for is past the end - the partial file is of no use, start over once without it
+            response.close()
+            os.remove(partpath)
+            headers = {}
+            response = requests.get(url, stream=True, timeout=timeout)
+
+        with response:
+            if response.status_code == 304:
+                stats['status'] = 'not_modified'
+                print(f"CSV in {storein} is up to date.")
+                return stats
+
+            response.raise_for_status()
+
+            # 206 means the server honoured the range, anything else is the full body from the start
+            if response.status_code == 206:
+                mode = 'ab'
+                stats['status'] = 'resumed'
+            else:
+                mode = 'wb'
+                meta = {}
+                stats['status'] = 'downloaded'
+
+            meta = {'etag': response.headers.get('ETag', meta.get('etag')),
+                    'last_modified': response.headers.get('Last-Modified', meta.get('last_modified')),
+                    'url': url,
+                    'complete': False}
+            _write_download_meta(metapath, meta)
+
+            with open(partpath, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        stats['bytes'] += len(chunk)
+
+        # the download is whole - move it into place in a single step
+        os.replace(partpath, storein)
+        meta['complete'] = True
+        meta['size'] = os.path.getsize(storein)
+        _write_download_meta(metapath, meta)
+        print(f"CSV saved to {storein}")
+    except requests.exceptions.RequestException as e:
+        stats['status'] = 'error'
+        print(f"Error fetching or saving CSV: {e}")
+    except IOError as e:
+        stats['status'] = 'error'
+        print(f"Error writing to file: {e}")
+    finally:
+        stats['seconds'] = time.perf_counter() - start
+        if tracing:
+            stats['peak_memory_bytes'] = max(tracemalloc.get_traced_memory()[1] - base, 0)
+
+    if stats['seconds'] > 0:
+        stats['bytes_per_sec'] = stats['bytes'] / stats['seconds']
+
+    if stats['bytes'] > 0:
+        memory = f", peak memory {stats['peak_memory_bytes'] / 1e6:.2f} MB" if tracing else ''
+        print(f"Transferred {stats['bytes']:,} bytes in {stats['seconds']:.2f}s "
+              f"({stats['bytes_per_sec'] / 1e6:.2f} MB/s{memory})")
+
+    return stats
+
+
+def crash_csv_dtypes(compact: bool = True) -> dict:
+    """
+    The dtypes handed to read_csv for the crash export.
+    Condition columns become categories and the injury counts float32 - they still carry NaN until
+    etl_crash_data fills them and narrows them to the smallest integer type.
+    Args:
+        compact (bool): When False no dtypes are forced and pandas infers them
+    Returns:
+        A dictionary of column name to dtype
+    """
+    if compact == False:
+        return {}
+
+    dtypes = {column: 'category' for column in const_category_columns}
+    dtypes.update({column: 'float32' for column in const_injury_columns})
+    return dtypes
+
+
+def _count_quotes(buffer: np.ndarray, start: int, end: int) -> int:
+    """
+    Number of double quote bytes in buffer[start:end], counted a block at a time to keep the mask small.
+    """
+    count = 0
+    for block in range(start, end, const_quote_scan_block):
+        count += int(np.count_nonzero(buffer[block:min(block + const_quote_scan_block, end)] == ord('"')))
+    return count
+
+
+def _record_end(mm: mmap.mmap, buffer: np.ndarray, position: int, quotes: int) -> tuple:
+    """
+    The end of the record holding position - just past the first newline at or after it with an even number of
+    quotes before it. quotes is the count of quotes before position.
+    Returns:
+        A tuple of the end offset (the file size when no record ends) and the quote count before it
+    """
+    while True:
+        newline = mm.find(b'\n', position)
+        if newline == -1:
+            return len(mm), quotes
+        quotes += _count_quotes(buffer, position, newline + 1)
+        position = newline + 1
+        if quotes % 2 == 0:
+            return position, quotes
+
+
+def csv_record_ranges(filepath: str, parts: int) -> tuple:
+    """
+    Splits a CSV file into byte ranges of about the same size that start and end on record boundaries.
+    A newline only ends a record when an even number of quotes precede it, so the newlines inside quoted fields
+    (the crash narratives) never split a record - escaped quotes ("") count twice and leave the parity alone.
+    Args:
+        filepath (str): The CSV file
+        parts (int): Number of ranges wanted, fewer come back when the file has fewer records
+    Returns:
+        A tuple of the header line (bytes) and a list of (start, end) byte offsets covering every record after it
+    """
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return b'', []
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buffer = np.frombuffer(mm, dtype=np.uint8)
+
+            header_end, quotes = _record_end(mm, buffer, 0, 0)
+            header = mm[:header_end]
+
+            boundaries = [header_end]
+            for part in range(1, parts):
+                target = header_end + (size - header_end) * part // parts
+                if target <= boundaries[-1]:
+                    continue
+                quotes += _count_quotes(buffer, boundaries[-1], target)
+                boundary, quotes = _record_end(mm, buffer, target, quotes)
+                if boundary >= size:
+                    break
+                boundaries.append(boundary)
+            boundaries.append(size)
+
+            # the mapping cannot close while numpy still views it
+            del buffer
+
+    ranges = [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+    return header, ranges
+
+
+def _etl_byte_range(filepath: str, header: bytes, start: int, end: int, columns: list = None,
+                    compact: bool = True) -> pd.DataFrame:
+    """
+    Parses one byte range of the CSV (with the header line put in front) and runs etl_crash_data on it.
+    Runs inside a worker process of read_crash_csv.
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    df = pd.read_csv(io.BytesIO(header + data), usecols=_projection(columns), dtype=crash_csv_dtypes(compact))
+    return etl_crash_data(df, compact=compact)
+
+
+def _align_range_dtypes(frames: list) -> list:
+    """
+    A range where a column is entirely empty parses it as float NaN, where a single read of the file would have
+    taken the type of the rows that do carry values. Those columns get the type the other ranges agree on.
+    Categories are left to concat_frames.
+    """
+    for name in frames[0].columns:
+        dtypes = [frame[name].dtype for frame in frames]
+        if all(dtype == dtypes[0] for dtype in dtypes) or any(isinstance(d, pd.CategoricalDtype) for d in dtypes):
+            continue
+
+        filled = [frame[name].dtype for frame in frames if frame[name].notna().any()]
+        if not filled or any(dtype != filled[0] for dtype in filled):
+            continue
+        for frame in frames:
+            if frame[name].dtype != filled[0]:
+                frame[name] = frame[name].astype(filled[0])
+    return frames
+
+
+def read_crash_csv(filepath: str, columns: list = None, compact: bool = True, workers: int = 1) -> pd.DataFrame:
+    """
+    Parses the crash CSV and runs etl_crash_data on it, in parallel when there are workers and bytes enough.
+    The file is cut into byte ranges on record boundaries (see csv_record_ranges), every range is parsed and
+    transformed by its own process and the pieces are stacked with the categories unified - the same frame a
+    single read_csv and etl_crash_data give.
+    Args:
+        filepath (str): The crash CSV file
+        columns (list): Only read these source columns, None reads everything
+        compact (bool): Store conditions as categories and counts/hours in the smallest integer types
+        workers (int): Processes parsing at once, None for one per core. Files smaller than
+                       const_parallel_min_bytes per worker get fewer workers, 1 parses in this process
+    Returns:
+        The transformed pandas DataFrame
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, os.path.getsize(filepath) // const_parallel_min_bytes))
+
+    if workers == 1:
+        with span('parse', 'read_csv'):
+            df = pd.read_csv(filepath, usecols=_projection(columns), dtype=crash_csv_dtypes(compact))
+        return etl_crash_data(df, compact=compact)
+
+    with span('parse', 'read_crash_csv[parallel]'):
+        header, ranges = csv_record_ranges(filepath, workers)
+
+        # forked workers start without pickling anything, elsewhere the defaults spawn fresh interpreters
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = [pool.submit(_etl_byte_range, filepath, header, start, end, columns, compact)
+                       for start, end in ranges]
+            frames = [future.result() for future in futures]
+
+        return concat_frames(_align_range_dtypes(frames))
+
+
+def get_chicago_crash_data(filepath: str = const_default_storage_file, use_cache: bool = True,
+                           cache_format: str = 'npy', cache_dir: str = const_default_cache_dir,
+                           columns: list = None, compact: bool = True, workers: int = None) -> pd.DataFrame:
+    """
+    Gets a CSV dataset via the url
+    The transformed frame is kept in a typed columnar cache keyed by the size, modification time and content
+    hash of the CSV, so a warm load skips both the csv parsing and etl_crash_data. With the cache the frame also
+    carries that fingerprint as its version (see tag_frame_version).
+    Args:
+
+        filepath (str): The path to save the CSV file.
+        use_cache (bool): Read from / write to the columnar cache
+        cache_format (str): Cache storage - 'npy' (a .npy file per column), 'parquet' or 'feather' (needs pyarrow)
+        cache_dir (str): Directory holding the cache
+        columns (list): Only read these source columns, e.g. const_plot_columns. None reads everything.
+                        CRASH_DATE is always read since the etl derives from it.
+        compact (bool): Store conditions as categories and counts/hours in the smallest integer types
+        workers (int): Processes parsing a cold load, None for one per core (see read_crash_csv)
+    Returns:
+        A pandas DataFrame containing the CSV file content
+    """
+
+    # if the file does exist locally - we will go grab it
+    if os.path.exists(filepath):
+        variant = cache_variant(columns, compact)
+        try:
+            fingerprint = None
+            if use_cache == True:
+                fingerprint = source_fingerprint(filepath, cache_dir)
+                with span('parse', 'load_cached_frame'):
+                    df = load_cached_frame(filepath, fingerprint, cache_dir, cache_format, variant)
+                if df is not None:
+                    return tag_frame_version(df, fingerprint, variant)
+
+            df = read_crash_csv(filepath, columns, compact, workers)
+        except Exception as e:
+            print(f"Error loading the CSV: {e}")
+            return None
+
+        if use_cache == True:
+            try:
+                save_cached_frame(df, filepath, fingerprint, cache_dir, cache_format, variant)
+            except Exception as e:
+                print(f"Error writing the {cache_format} cache: {e}")
+            # the caches derived from the frame key it by the fingerprint just taken, not by hashing its rows
+            tag_frame_version(df, fingerprint, variant)
+
+        return df
+
+    # not force and the file is already there - voila
+    print(f"No file called::{filepath} found")
+    return None
+
+
+def parse_crash_dates(values: pd.Series) -> pd.Series:
+    """
+    Parses export timestamps like '03/19/2025 02:15:00 PM' into datetime64.
+    Every value has the same 22 character layout, so the text is viewed as a byte matrix and the fields are
+    pulled out of fixed positions with integer arithmetic. Anything not in that layout falls back to pd.to_datetime.
+    Args:
+        values (pd.Series): CRASH_DATE as read from the csv
+    Returns:
+        A datetime64[ns] series aligned with values
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    parsed = _parse_fixed_width_dates(values)
+    if parsed is None:
+        return pd.to_datetime(values, format=const_crash_date_format).astype('datetime64[ns]')
+    return pd.Series(parsed, index=values.index, name=values.name)
+
+
+def _parse_fixed_width_dates(values: pd.Series) -> np.ndarray:
+    """
+    The vectorized half of parse_crash_dates.
+    Args:
+        values (pd.Series): CRASH_DATE as read from the csv
+    Returns:
+        A datetime64[ns] numpy array, or None when any value does not follow the layout exactly
+    """
+    try:
+        raw = np.asarray(values.to_numpy(dtype=object), dtype='S')
+    except (UnicodeEncodeError, ValueError, TypeError):
+        return None
+    if len(raw) == 0 or raw.dtype.itemsize != 22:
+        return None
+
+    # one row of 22 bytes per timestamp: MM/DD/YYYY HH:MM:SS AM
+    chars = raw.view(np.uint8).reshape(-1, 22)
+    if not ((chars[:, [2, 5]] == ord('/')).all() and (chars[:, [10, 19]] == ord(' ')).all()
+            and (chars[:, [13, 16]] == ord(':')).all() and (chars[:, 21] == ord('M')).all()):
+        return None
+
+    digits = chars[:, const_date_digit_positions].astype(np.int64) - ord('0')
+    if ((digits < 0) | (digits > 9)).any():
+        return None
+
+    month = digits[:, 0] * 10 + digits[:, 1]
+    day = digits[:, 2] * 10 + digits[:, 3]
+    year = digits[:, 4] * 1000 + digits[:, 5] * 100 + digits[:, 6] * 10 + digits[:, 7]
+    hour = digits[:, 8] * 10 + digits[:, 9]
+    minute = digits[:, 10] * 10 + digits[:, 11]
+    second = digits[:, 12] * 10 + digits[:, 13]
+    pm = chars[:, 20] == ord('P')
+
+    if not (((chars[:, 20] == ord('A')) | pm).all() and ((month >= 1) & (month <= 12)).all()
+            and ((hour >= 1) & (hour <= 12)).all() and (minute < 60).all() and (second < 60).all()):
+        return None
+
+    # whole months since the epoch, then the day inside that month - rejecting days the month does not have
+    months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    month_start = months.astype('datetime64[D]')
+    month_length = ((months + 1).astype('datetime64[D]') - month_start).astype(np.int64)
+    if ((day < 1) | (day > month_length)).any():
+        return None
+
+    # 12 AM is midnight and 12 PM is noon
+    hour = hour % 12 + 12 * pm
+    seconds = month_start.astype(np.int64) * 86400 + (day - 1) * 86400 + hour * 3600 + minute * 60 + second
+    return seconds.astype('datetime64[s]').astype('datetime64[ns]')
+
+
+@profiled('etl')
+def etl_crash_data(df: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    """
+    Does some transformation and extraction of additional data into our crash dataset that can be helpful calculating visualization
+    Args:
+
+        df (pandas dataframe): Dataframe to modify and pass back to the caller
+        compact (bool): Narrow the injury counts, hour and year to the smallest integer types that hold them
+    Returns:
+        A modified dataframe with some additional enriched data.
+    """
+
+    # call out why this is important - the fixed layout is sliced apart with numpy instead of parsed row by row
+    df['CRASH_DATE'] = parse_crash_dates(df['CRASH_DATE'])
+    df['CRASH_YEAR'] = df['CRASH_DATE'].dt.year
+
+    # names come from small lookup tables as categories - no python string per row, code -1 (NaN) without a date
+    day = df['CRASH_DATE'].dt.dayofweek.fillna(-1).astype('int8')
+    month = (df['CRASH_DATE'].dt.month - 1).fillna(-1).astype('int8')
+    df['CRASH_DAY_NAME'] = pd.Categorical.from_codes(day, categories=const_day_names)
+    df['CRASH_MONTH_NAME'] = pd.Categorical.from_codes(month, categories=const_month_names)
+
+    # we want to insure our numeric data is properly set to 0 where NaN is encountered
+    # a projected frame may only carry some of the injury columns
+    for column in const_injury_columns:
+        if column in df.columns:
+            df[column] = df[column].fillna(0)
+
+    if compact == True:
+        df = compact_crash_frame(df)
+
+    return df
+
+
+def compact_crash_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Narrows the injury counts, hour and year of a transformed frame to the smallest integer types that hold them.
+    Args:
+        df (pd.DataFrame): Frame whose injury columns have already had NaN filled
+    Returns:
+        The same dataframe with narrowed columns
+    """
+    # the counts are whole numbers once the NaN are gone - no need for 8 bytes each
+    for column in const_injury_columns + ['CRASH_HOUR', 'CRASH_YEAR']:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+
+    return df
+
+
+@profiled('etl')
+def etl_crash_data_chunked(filepath: str = const_default_storage_file, chunksize: int = const_etl_chunk_size,
+                           outdir: str = None, aggregates: dict = None, columns: list = None,
+                           compact: bool = True) -> dict:
+    """
+    Runs etl_crash_data over the CSV one chunk at a time so the raw frame is never held in memory - peak memory
+    follows the chunk size rather than the file size.
+    Each transformed chunk is either written to outdir (read it back with read_frame_parts, which gives the same
+    frame as get_chicago_crash_data) and/or reduced into running aggregates.
+    Args:
+        filepath (str): The crash CSV file
+        chunksize (int): Number of rows parsed and transformed at a time
+        outdir (str): Directory receiving the compacted chunks, nothing is written when None
+        aggregates (dict): Name to function(chunk) returning counts (Series/DataFrame) that are summed across
+                           chunks, or an object with a merge method (DistributionSummary, CrashCube) that is merged.
+                           Defaults to const_default_chunk_aggregates when no outdir is given.
+        columns (list): Only read these source columns, None reads everything
+        compact (bool): Store conditions as categories and counts/hours in the smallest integer types
+    Returns:
+        A dictionary with the rows and chunks processed, the outdir and the summed aggregates
+    """
+    if aggregates is None and outdir is None:
+        aggregates = const_default_chunk_aggregates
+
+    usecols = _projection(columns)
+    if outdir is not None:
+        if os.path.isdir(outdir):
+            shutil.rmtree(outdir)
+        os.makedirs(outdir)
+
+    result = {'rows': 0, 'chunks': 0, 'outdir': outdir, 'aggregates': {}}
+    totals = {}
+
+    reader = pd.read_csv(filepath, usecols=usecols, dtype=crash_csv_dtypes(compact), chunksize=chunksize)
+    for chunk in reader:
+        chunk = etl_crash_data(chunk, compact=compact)
+
+        if outdir is not None:
+            write_frame_part(chunk, outdir, result['chunks'])
+
+        for name, aggregate in (aggregates or {}).items():
+            counts = aggregate(chunk)
+            if name not in totals:
+                totals[name] = counts
+            elif hasattr(counts, 'merge') and not isinstance(counts, (pd.Series, pd.DataFrame)):
+                totals[name] = totals[name].merge(counts)
+            else:
+                totals[name] = totals[name].add(counts, fill_value=0)
+
+        result['rows'] += len(chunk)
+        result['chunks'] += 1
+
+    # add() with fill_value promotes to float - counts go back to whole numbers
+    result['aggregates'] = {name: total.astype('int64') if isinstance(total, (pd.Series, pd.DataFrame)) else total
+                            for name, total in totals.items()}
+    return result
+
+
+def frame_memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compares the resident size of two versions of the crash frame column by column, e.g. a full load against
+    a projected and compacted one.
+    Args:
+        before (pd.DataFrame): The reference frame
+        after (pd.DataFrame): The reduced frame
+    Returns:
+        A dataframe with the bytes used per column by each frame and the dtypes they ended up with
+    """
+    report = pd.DataFrame({'before_bytes': before.memory_usage(index=False, deep=True),
+                           'before_dtype': before.dtypes.astype(str),
+                           'after_bytes': after.memory_usage(index=False, deep=True),
+                           'after_dtype': after.dtypes.astype(str)})
+    report['after_bytes'] = report['after_bytes'].fillna(0).astype('int64')
+
+    before_total = report['before_bytes'].sum()
+    after_total = report['after_bytes'].sum()
+    ratio = before_total / after_total if after_total > 0 else float('inf')
+    print(f"Frame size: {before_total / 1e6:.1f} MB -> {after_total / 1e6:.1f} MB ({ratio:.1f}x smaller)")
+
+    return report.sort_values('before_bytes', ascending=False)
+
+
+def _read_sync_state(storein: str) -> dict:
+    """
+    Reads what the last incremental sync recorded about a local store in its '.meta.json' sidecar: the high water
+    mark, the rows at it and when the sync ran. A new download replaces the sidecar, and with it this state.
+    Args:
+        storein (str): The local crash CSV
+    Returns:
+        A dictionary with the stored state, empty when the store was never synced
+    """
+    meta = _read_download_meta(storein + '.meta.json')
+    return {key: meta[key] for key in ('high_water_mark', 'high_water_rows', 'synced_at') if key in meta}
+
+
+def _write_sync_state(storein: str, state: dict):
+    """
+    Records the state of a sync next to the download metadata, which is kept.
+    """
+    metapath = storein + '.meta.json'
+    _write_download_meta(metapath, {**_read_download_meta(metapath), **state})
+
+
+def _row_digests(rows: pd.DataFrame) -> dict:
+    """
+    A digest of every raw csv row (string values in the header's order) by CRASH_RECORD_ID - kept for the rows at
+    the high water mark, which the api sends back on every sync, to tell an unchanged copy from an update without
+    reading the store.
+    """
+    digests = {}
+    for record_id, values in zip(rows['CRASH_RECORD_ID'], rows.itertuples(index=False, name=None)):
+        digests[record_id] = hashlib.blake2b('\x1f'.join(values).encode(), digest_size=16).hexdigest()
+    return digests
+
+
+def crash_data_high_water_mark(storein: str = const_default_storage_file,
+                               chunksize: int = const_etl_chunk_size) -> pd.Timestamp:
+    """
+    Finds the most recent CRASH_DATE in the local store, reading only that column a chunk at a time.
+    sync_chicago_crashdata only scans for it when neither the sidecar nor the columnar cache has it.
+    Args:
+        storein (str): The local crash CSV
+        chunksize (int): Number of rows read at a time
+    Returns:
+        The latest crash timestamp, NaT when the store is empty
+    """
+    latest = pd.NaT
+    for chunk in pd.read_csv(storein, usecols=['CRASH_DATE'], dtype=str, chunksize=chunksize):
+        chunk_latest = parse_crash_dates(chunk['CRASH_DATE'].dropna()).max()
+        if pd.isna(latest) or chunk_latest > latest:
+            latest = chunk_latest
+    return latest
+
+
+@profiled('download')
+def fetch_crash_data_delta(since: pd.Timestamp, soda_url: str = const_soda_url,
+                           page_size: int = const_sync_page_size, updated_since: str = None,
+                           timeout: float = 60) -> pd.DataFrame:
+    """
+    Pages through the SODA api for crashes on or after a timestamp (and optionally rows updated since the last sync)
+    and shapes them like rows of the csv export: upper case column names and the export timestamp layout.
+    Args:
+        since (pd.Timestamp): High water mark of CRASH_DATE in the local store
+        soda_url (str): SODA csv endpoint (point it to a local mock for testing)
+        page_size (int): Rows requested per page ($limit)
+        updated_since (str): ISO timestamp, also pull rows whose :updated_at is later than this
+        timeout (float): Seconds to wait on each request
+    Returns:
+        A dataframe of raw string values, one row per crash
+    """
+    where = f"crash_date >= '{since:%Y-%m-%dT%H:%M:%S}'"
+    if updated_since:
+        where = f"{where} OR :updated_at > '{updated_since}'"
+
+    pages = []
+    offset = 0
+    while True:
+        params = {'$where': where, '$order': 'crash_date, crash_record_id', '$limit': page_size, '$offset': offset}
+        response = requests.get(soda_url, params=params, timeout=timeout)
+        response.raise_for_status()
+
+        page = pd.read_csv(io.StringIO(response.text), dtype=str, keep_default_na=False)
+        pages.append(page)
+        if len(page) < page_size:
+            break
+        offset += page_size
+
+    delta = pd.concat(pages, ignore_index=True)
+    delta.columns = [column.upper() for column in delta.columns]
+
+    # the api speaks ISO timestamps, the export uses 03/19/2025 02:15:00 PM
+    for column in const_export_date_columns:
+        if column in delta.columns:
+            parsed = pd.to_datetime(delta[column].where(delta[column] != ''), errors='coerce')
+            delta[column] = parsed.dt.strftime(const_crash_date_format).fillna('')
+
+    return delta
+
+
+def _scan_stored_rows(storein: str, incoming: pd.DataFrame, high_water_mark: pd.Timestamp = None) -> tuple:
+    """
+    Looks the incoming rows up in the store by CRASH_RECORD_ID without changing it, a chunk at a time.
+    Args:
+        storein (str): The local crash CSV
+        incoming (pd.DataFrame): Raw rows indexed by CRASH_RECORD_ID
+        high_water_mark (pd.Timestamp): Also collect the digests of the stored rows at this CRASH_DATE
+    Returns:
+        A tuple of the ids stored unchanged, the ids stored with other values and the digests of the rows at the
+        high water mark (None when not asked for)
+    """
+    unchanged, replaced = set(), set()
+    boundary = {} if high_water_mark is not None else None
+    for chunk in pd.read_csv(storein, dtype=str, keep_default_na=False, chunksize=const_etl_chunk_size):
+        matched = chunk['CRASH_RECORD_ID'].isin(incoming.index)
+        if matched.any():
+            existing = chunk[matched].set_index('CRASH_RECORD_ID')
+            same = (existing == incoming.loc[existing.index, existing.columns]).all(axis=1)
+            unchanged.update(same.index[same])
+            replaced.update(same.index[~same])
+        if boundary is not None:
+            boundary.update(_row_digests(chunk[(parse_crash_dates(chunk['CRASH_DATE']) == high_water_mark).to_numpy()]))
+    return unchanged, replaced, boundary
+
+
+def _append_csv_rows(storein: str, rows: pd.DataFrame):
+    """
+    Appends raw rows (in the header's column order) to the end of a CSV, starting a new line if the file lacks one.
+    """
+    with open(storein, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        ends_in_newline = f.tell() == 0
+        if not ends_in_newline:
+            f.seek(-1, os.SEEK_END)
+            ends_in_newline = f.read(1) == b'\n'
+    with open(storein, 'a', newline='') as f:
+        if not ends_in_newline:
+            f.write('\n')
+        rows.to_csv(f, header=False, index=False)
+
+
+@profiled('download')
+def sync_chicago_crashdata(storein: str = const_default_storage_file, soda_url: str = const_soda_url,
+                           page_size: int = const_sync_page_size, include_updated: bool = True,
+                           use_cache: bool = True, cache_format: str = 'npy', cache_dir: str = const_default_cache_dir,
+                           columns: list = None, compact: bool = True, timeout: float = 60) -> dict:
+    """
+    Brings the local store up to date with only the crashes that arrived (or changed) since it was last synced,
+    instead of downloading the whole history again.
+    Rows are requested from the SODA api with a $where on CRASH_DATE from the high water mark recorded in the
+    store's '.meta.json' sidecar (on the first sync the newest crash of the columnar cache, or of the store).
+    New crashes are appended to the CSV - it is only rewritten when the delta replaces older copies of a
+    CRASH_RECORD_ID - and the matching columnar cache is patched in place.
+    Args:
+        storein (str): The local crash CSV, created by download_chicago_crashdata
+        soda_url (str): SODA csv endpoint (point it to a local mock for testing)
+        page_size (int): Rows requested per page
+        include_updated (bool): Also pull older rows whose :updated_at is past the previous sync
+        use_cache (bool): Patch the columnar cache written by get_chicago_crash_data
+        cache_format (str): Format of the cache to patch
+        cache_dir (str): Directory holding the cache
+        columns (list): Projection of the cache to patch, as given to get_chicago_crash_data
+        compact (bool): Dtype flavour of the cache to patch, as given to get_chicago_crash_data
+        timeout (float): Seconds to wait on each request
+    Returns:
+        A dictionary with the outcome ('status'), rows fetched, added and replaced, the new high water mark, the
+        transformed new rows ('delta'), the CRASH_RECORD_IDs they replaced ('replaced_ids') and the change to the
+        per year hour summary ('summary' - merge it into a DistributionSummary or CrashCube built before the sync)
+    """
+    stats = {'status': 'missing', 'fetched': 0, 'added': 0, 'replaced': 0, 'high_water_mark': None,
+             'delta': None, 'replaced_ids': set(), 'summary': None, 'seconds': 0.0}
+    if not os.path.exists(storein):
+        print(f"No file called::{storein} found, run download_chicago_crashdata first.")
+        return stats
+
+    start = time.perf_counter()
+    state = _read_sync_state(storein)
+
+    # the cache is keyed to the store as it is now - picked up before the store changes
+    variant = cache_variant(columns, compact)
+    cached = None
+    if use_cache == True:
+        cached = load_cached_frame(storein, None, cache_dir, cache_format, variant)
+
+    # the rows stored at the high water mark, None until a sync recorded them
+    boundary = state.get('high_water_rows')
+    if state.get('high_water_mark'):
+        high_water_mark = pd.Timestamp(state['high_water_mark'])
+    elif cached is not None and 'CRASH_DATE' in cached.columns:
+        high_water_mark = cached['CRASH_DATE'].max()
+    else:
+        high_water_mark = crash_data_high_water_mark(storein)
+
+    try:
+        delta = fetch_crash_data_delta(high_water_mark, soda_url, page_size,
+                                       state.get('synced_at') if include_updated else None, timeout)
+    except requests.exceptions.RequestException as e:
+        stats['status'] = 'error'
+        print(f"Error fetching new crash records: {e}")
+        return stats
+
+    stats['fetched'] = len(delta)
+    stats['high_water_mark'] = str(high_water_mark)
+    if delta.empty:
+        if not state.get('high_water_mark'):
+            _write_sync_state(storein, {'high_water_mark': high_water_mark.isoformat()})
+        stats['status'] = 'up_to_date'
+        stats['seconds'] = time.perf_counter() - start
+        print(f"CSV in {storein} is up to date.")
+        return stats
+
+    header = pd.read_csv(storein, nrows=0).columns
+    delta = delta.reindex(columns=header, fill_value='').drop_duplicates('CRASH_RECORD_ID', keep='last')
+    dates = parse_crash_dates(delta['CRASH_DATE']).to_numpy()
+
+    # crashes past the high water mark cannot be stored yet. At the mark (the api sends those rows back on every
+    # sync) the recorded digests tell a repeat from an update or a new crash. Older rows - updated since the last
+    # sync - and the mark's rows while no digests are recorded are looked up in the store
+    unchanged, replaced = set(), set()
+    lookup = dates <= high_water_mark
+    if boundary is not None:
+        at_mark = dates == high_water_mark
+        for record_id, digest in _row_digests(delta[at_mark]).items():
+            if record_id in boundary:
+                (unchanged if boundary[record_id] == digest else replaced).add(record_id)
+        lookup &= ~at_mark
+    if lookup.any():
+        stored_unchanged, stored_replaced, scanned = _scan_stored_rows(
+            storein, delta[lookup].set_index('CRASH_RECORD_ID'), high_water_mark if boundary is None else None)
+        unchanged |= stored_unchanged
+        replaced |= stored_replaced
+        if scanned is not None:
+            boundary = scanned
+
+    written = ~delta['CRASH_RECORD_ID'].isin(unchanged).to_numpy()
+    delta, dates = delta[written], dates[written]
+    if delta.empty:
+        if state.get('high_water_rows') is None:
+            _write_sync_state(storein, {'high_water_mark': high_water_mark.isoformat(), 'high_water_rows': boundary})
+        stats['status'] = 'up_to_date'
+        stats['seconds'] = time.perf_counter() - start
+        print(f"CSV in {storein} is up to date.")
+        return stats
+
+    removed = []
+    if replaced:
+        # the older copies leave the store - the one case it is rewritten, a chunk at a time. They are kept to take
+        # them back out of the summaries
+        tmppath = storein + '.sync.tmp'
+        first = True
+        for chunk in pd.read_csv(storein, dtype=str, keep_default_na=False, chunksize=const_etl_chunk_size):
+            matched = chunk['CRASH_RECORD_ID'].isin(replaced)
+            if matched.any():
+                removed.append(chunk[matched])
+            chunk[~matched].to_csv(tmppath, mode='w' if first else 'a', header=first, index=False)
+            first = False
+        delta.to_csv(tmppath, mode='a', header=first, index=False)
+        os.replace(tmppath, storein)
+    else:
+        _append_csv_rows(storein, delta)
+
+    # parse the new rows exactly like a full load would - a handful of rows can infer other dtypes than the
+    # full history (ids that look numeric, all empty columns) so text columns follow the cache
+    dtypes = crash_csv_dtypes(compact)
+    if cached is not None:
+        dtypes.update({column: str for column in cached.columns
+                       if column in header and pd.api.types.is_string_dtype(cached[column].dtype)})
+    delta_frame = etl_crash_data(pd.read_csv(io.StringIO(delta.to_csv(index=False)), usecols=_projection(columns),
+                                             dtype=dtypes), compact=compact)
+
+    # what the sync changed in the per year hour summary - the new rows in, the copies they replaced out
+    summary = None
+    if 'CRASH_HOUR' in delta_frame.columns:
+        summary = DistributionSummary.from_frame(delta_frame)
+        if removed:
+            removed_frame = etl_crash_data(pd.read_csv(io.StringIO(pd.concat(removed).to_csv(index=False)),
+                                                       usecols=_projection(columns), dtype=dtypes), compact=compact)
+            summary = summary.merge(DistributionSummary.from_frame(removed_frame), sign=-1)
+
+    if cached is not None and 'CRASH_RECORD_ID' in cached.columns:
+        for column in delta_frame.columns:
+            dtype = cached[column].dtype
+            if dtype != delta_frame[column].dtype and not isinstance(dtype, pd.CategoricalDtype) \
+                    and not pd.api.types.is_integer_dtype(dtype):
+                delta_frame[column] = delta_frame[column].astype(dtype)
+
+        patched = concat_frames([cached[~cached['CRASH_RECORD_ID'].isin(replaced)], delta_frame])
+        if compact == True:
+            patched = compact_crash_frame(patched)
+        save_cached_frame(patched, storein, None, cache_dir, cache_format, variant)
+    elif cached is not None:
+        print(f"The {cache_format} cache has no CRASH_RECORD_ID to merge on, it is rebuilt on the next load.")
+
+    # the rows now stored at the high water mark - the delta's newest when it moved, else the mark's rows with
+    # the delta's copies of them
+    latest = dates.max()
+    digests = _row_digests(delta[dates == max(latest, high_water_mark)])
+    if latest > high_water_mark:
+        high_water_mark, boundary = pd.Timestamp(latest), digests
+    elif boundary is not None:
+        boundary = {**boundary, **digests}
+
+    _write_sync_state(storein, {'high_water_mark': high_water_mark.isoformat(), 'high_water_rows': boundary,
+                                'synced_at': pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%dT%H:%M:%S'),
+                                'added': len(delta) - len(replaced), 'replaced': len(replaced)})
+
+    stats.update({'status': 'synced', 'added': len(delta) - len(replaced), 'replaced': len(replaced),
+                  'high_water_mark': str(high_water_mark), 'delta': delta_frame, 'replaced_ids': replaced,
+                  'summary': summary, 'seconds': time.perf_counter() - start})
+    print(f"Synced {storein}: {stats['added']:,} new and {stats['replaced']:,} updated crashes "
+          f"(up to {high_water_mark}).")
+    return stats
+
+
+def _projection(columns: list = None):
+    """
+    Turns a requested column list into a read_csv usecols filter, always keeping CRASH_DATE for the etl.
+    Args:
+        columns (list): Source columns to read, None reads everything
+    Returns:
+        A callable for usecols, or None
+    """
+    if columns is None:
+        return None
+
+    wanted = set(columns) | {'CRASH_DATE'}
+    return lambda column: column in wanted
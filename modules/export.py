@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import shutil
+import inspect
+import functools
+import hashlib
+import tempfile
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .datacache import write_frame_part, read_frame_parts
+from .dataset import CrashDataset, dataset_version
+from .rendercache import render_figure
+
+# visualization libraries - imported by the workers, not on import
+from .lazy import lazy_import
+plt = lazy_import('matplotlib.pyplot')
+
+# ****************************************************************
+# headless batch export - every (figure, year, minimal injury) combination rendered
+# to files by a pool of worker processes, skipping outputs whose inputs did not change
+# ****************************************************************
+
+const_default_export_dir = 'static/export'
+const_export_formats = ('png', 'svg')
+const_export_manifest = 'export.manifest.json'
+
+# what the workers render from - inherited at fork, or mapped from a column store by _start_worker
+_shared = {}
+
+
+def figure_matrix(functions: list, years: list, minimalinjuries: list = None) -> list:
+    """
+    Every combination of figure function, year and minimal injury. Functions without a minimalinjury parameter
+    get one job per year only.
+    Args:
+        functions (list): Plot functions (plot_* or create_dashboard)
+        years (list): Years to render, None in the list renders all years where a function allows it
+        minimalinjuries (list): Minimal injury counts to render
+    Returns:
+        A list of (function, year, minimalinjury) tuples, minimalinjury None where it does not apply
+    """
+    jobs = []
+    for func in functions:
+        parameters = inspect.signature(func).parameters
+        years_for = years if 'year' in parameters else [None]
+        injuries_for = (minimalinjuries or [None]) if 'minimalinjury' in parameters else [None]
+        jobs.extend((func, year, injury) for year, injury in itertools.product(years_for, injuries_for))
+
+    # a function taking neither parameter would otherwise be listed once per year
+    return list(dict.fromkeys(jobs))
+
+
+def _job_kwargs(func, year, minimalinjury) -> dict:
+    """
+    The keyword arguments of one job, only those the function takes.
+    """
+    parameters = inspect.signature(func).parameters
+    kwargs = {}
+    if 'year' in parameters:
+        kwargs['year'] = year
+    if 'minimalinjury' in parameters and minimalinjury is not None:
+        kwargs['minimalinjury'] = minimalinjury
+    return kwargs
+
+
+def _job_name(func, year, minimalinjury) -> str:
+    """
+    The file name (without extension) of one job, e.g. create_dashboard_2024_injury1.
+    """
+    parameters = inspect.signature(func).parameters
+    name = func.__name__
+    if 'year' in parameters:
+        name += f"_{year if year is not None else 'all'}"
+    if 'minimalinjury' in parameters and minimalinjury is not None:
+        name += f'_injury{minimalinjury}'
+    return name
+
+
+@functools.lru_cache(maxsize=None)
+def _modules_version() -> str:
+    """
+    Fingerprint of the source of the modules package. The plot functions draw through helpers (violin_stats,
+    counts_density_image, the cube lookups, ...), a change to any of them changes the figures as well.
+    """
+    package = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(os.listdir(package)):
+        if name.endswith('.py'):
+            with open(os.path.join(package, name), 'rb') as f:
+                digest.update(name.encode())
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _job_key(func, kwargs: dict, version: str, fmt: str, dpi: int) -> str:
+    """
+    Fingerprint of everything an output depends on: the dataset, the arguments, the format, the plot code and the
+    source of the modules it draws with.
+    """
+    code = inspect.unwrap(func).__code__
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((func.__module__, func.__qualname__, sorted(kwargs.items()), version, fmt, dpi)).encode())
+    digest.update(_modules_version().encode())
+    digest.update(code.co_code)
+    digest.update(repr(code.co_consts).encode())
+    return digest.hexdigest()
+
+
+def _start_worker(storepath: str = None, cube=None, version: str = None, dataset: bool = False):
+    """
+    Worker initializer: headless backend, and when the pool could not fork, the dataset mapped from the column
+    store the parent wrote.
+    """
+    plt.switch_backend('Agg')
+    if storepath is not None:
+        df = read_frame_parts(storepath, mmap_mode='r')
+        if dataset:
+            df = CrashDataset(df, version=version)
+        _shared.update({'df': df, 'cube': cube})
+
+
+def _render_job(func, kwargs: dict, paths: dict, dpi: int) -> float:
+    """
+    Renders one figure headless and writes it in every requested format. Runs inside a worker process.
+    Args:
+        func: The plot function
+        kwargs (dict): Its arguments besides the dataset
+        paths (dict): Format to output file
+        dpi (int): Resolution of raster formats
+    Returns:
+        Seconds spent
+    """
+    start = time.perf_counter()
+    if _shared.get('cube') is not None and 'cube' in inspect.signature(func).parameters:
+        kwargs = {**kwargs, 'cube': _shared['cube']}
+    fig = render_figure(func, _shared['df'], **kwargs)
+    for fmt, path in paths.items():
+        # written next to the target first so a killed worker never leaves half a file behind
+        tmppath = path + '.tmp'
+        fig.savefig(tmppath, format=fmt, dpi=dpi)
+        os.replace(tmppath, path)
+    return time.perf_counter() - start
+
+
+def export_figures(df, jobs: list, outdir: str = const_default_export_dir, formats: tuple = ('png',),
+                   workers: int = None, cube=None, dpi: int = 100, force: bool = False,
+                   progress: bool = True) -> dict:
+    """
+    Renders a matrix of figures to files with the Agg backend in a pool of processes.
+    The workers get the dataset without pickling it: forked workers inherit it from this process, where fork is
+    not available it is written once as a column store the workers map from disk.
+    An output is skipped when its file exists and the dataset version, arguments, format, plot code and modules
+    source recorded for it in the export manifest are unchanged.
+    Args:
+        df (pd.DataFrame or CrashDataset): The crash dataset
+        jobs (list): (function, year, minimalinjury) tuples, see figure_matrix
+        outdir (str): Directory receiving the files and the manifest
+        formats (tuple): Any of 'png' and 'svg'
+        workers (int): Worker processes, one per core when not given, 1 renders in this process
+        cube (CrashCube): Precomputed counts of df handed to the functions that take one
+        dpi (int): Resolution of the PNG files
+        force (bool): Render everything, even unchanged outputs
+        progress (bool): Print a line per finished figure
+    Returns:
+        A dictionary with the rendered, skipped and failed output names and the elapsed seconds
+    """
+    for fmt in formats:
+        if fmt not in const_export_formats:
+            raise ValueError(f"Unknown export format {fmt}, expected one of {const_export_formats}")
+
+    os.makedirs(outdir, exist_ok=True)
+    manifestpath = os.path.join(outdir, const_export_manifest)
+    manifest = {}
+    if os.path.exists(manifestpath):
+        try:
+            with open(manifestpath, 'r') as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
+            manifest = {}
+
+    # work out what is stale before starting any process
+    version = dataset_version(df)
+    pending, skipped = [], []
+    for func, year, minimalinjury in jobs:
+        kwargs = _job_kwargs(func, year, minimalinjury)
+        name = _job_name(func, year, minimalinjury)
+        paths, keys = {}, {}
+        for fmt in formats:
+            path = os.path.join(outdir, f'{name}.{fmt}')
+            key = _job_key(func, kwargs, version, fmt, dpi)
+            if force == True or manifest.get(os.path.basename(path)) != key or not os.path.exists(path):
+                paths[fmt], keys[os.path.basename(path)] = path, key
+        if paths:
+            pending.append((name, func, kwargs, paths, keys))
+        else:
+            skipped.append(name)
+
+    stats = {'rendered': [], 'skipped': skipped, 'failed': [], 'seconds': 0.0}
+    if progress == True and skipped:
+        print(f'{len(skipped)} of {len(jobs)} figures unchanged, skipped')
+
+    start = time.perf_counter()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(pending)))
+
+    def finished(name, keys, seconds, error=None):
+        done = len(stats['rendered']) + len(stats['failed']) + 1
+        if error is None:
+            stats['rendered'].append(name)
+            manifest.update(keys)
+            if progress == True:
+                print(f'[{done}/{len(pending)}] {name} ({seconds:.2f}s)')
+        else:
+            stats['failed'].append(name)
+            print(f'Error rendering {name}: {error}')
+
+    storepath = None
+    try:
+        if workers == 1:
+            _shared.update({'df': df, 'cube': cube})
+            for name, func, kwargs, paths, keys in pending:
+                try:
+                    finished(name, keys, _render_job(func, kwargs, paths, dpi))
+                except Exception as e:
+                    finished(name, keys, 0.0, e)
+        else:
+            if 'fork' in multiprocessing.get_all_start_methods():
+                # the children start as copies of this process, dataset included
+                _shared.update({'df': df, 'cube': cube})
+                pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'),
+                                           initializer=_start_worker)
+            else:
+                storepath = tempfile.mkdtemp(prefix='crash-export-')
+                frame = df.frame if isinstance(df, CrashDataset) else df
+                write_frame_part(frame, storepath, 0)
+                pool = ProcessPoolExecutor(workers, initializer=_start_worker,
+                                           initargs=(storepath, cube, version, isinstance(df, CrashDataset)))
+
+            with pool:
+                futures = {pool.submit(_render_job, func, kwargs, paths, dpi): (name, keys)
+                           for name, func, kwargs, paths, keys in pending}
+                for future in as_completed(futures):
+                    name, keys = futures[future]
+                    try:
+                        finished(name, keys, future.result())
+                    except Exception as e:
+                        finished(name, keys, 0.0, e)
+    finally:
+        _shared.clear()
+        if storepath is not None:
+            shutil.rmtree(storepath, ignore_errors=True)
+
+        # record what was written even when the run was interrupted part way
+        with open(manifestpath + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(manifestpath + '.tmp', manifestpath)
+
+    stats['seconds'] = time.perf_counter() - start
+    if progress == True:
+        print(f"rendered {len(stats['rendered'])}, skipped {len(skipped)}, failed {len(stats['failed'])} "
+              f"in {stats['seconds']:.1f}s")
+    return stats
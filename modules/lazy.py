@@ -0,0 +1,59 @@
+import sys
+import importlib
+
+# ****************************************************************
+# deferred imports - the plotting, widget and http libraries are imported the first
+# time a function reads from them, so loading and etl start with pandas and numpy alone
+# ****************************************************************
+
+
+class LazyModule:
+    """
+    Stands in for a module until one of its attributes is first read, then imports it and forwards to it.
+    Use it like the module itself: plt = lazy_import('matplotlib.pyplot') ... plt.subplots()
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        # import_module holds the import lock, concurrent first uses get the same module
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        """
+        True once the module was imported, by this proxy or by anyone else.
+        """
+        return self._module is not None or self._name in sys.modules
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value):
+        # writes go to the real module so patches like plt.show = ... are seen by every user of it
+        if attr.startswith('_'):
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    A module that is imported on first use instead of now.
+    Args:
+        name (str): Dotted module name, e.g. 'matplotlib.pyplot'
+    Returns:
+        A LazyModule
+    """
+    return LazyModule(name)
@@ -0,0 +1,330 @@
+import io
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .profiling import profiled
+
+# visualization libraries - imported with the first persistent figure
+from .lazy import lazy_import
+mfigure = lazy_import('matplotlib.figure')
+mimage = lazy_import('matplotlib.image')
+backend_agg = lazy_import('matplotlib.backends.backend_agg')
+
+# ****************************************************************
+# persistent figures - a figure is built once, later parameter changes update the
+# data of its artists in place and only the panels whose data changed are drawn again:
+# the data is blitted over the panel's saved background, and the panel's axes, ticks
+# and labels are drawn again only when its axis ranges (or labels) actually change -
+# the figure is laid out again only when those new ticks no longer fit
+# ****************************************************************
+
+# pixels kept around a panel's tight box so antialiased edges are cleared with it
+const_panel_pad = 3
+
+# zlib level of the PNG renders - the image is redrawn on every change, speed beats a few percent of size
+const_live_png_compression = 1
+
+
+class LivePanel:
+    """
+    One axes of a persistent figure (a colorbar is a panel of its own) and the artists on it that change with the
+    parameters. Those artists are animated - left out of the drawing of the axes and drawn over its saved
+    background instead. The spines and gridlines are left out of the background too and drawn with them, so they
+    stay on top of the data as in a full draw.
+    """
+
+    def __init__(self, ax):
+        """
+        Args:
+            ax: The matplotlib axis of the panel
+        """
+        self.ax = ax
+        self.artists = []
+        self.labels = ()
+        self.dirty = True
+        # the axes with a grid shown when the panel was built
+        self.grids = [axis for axis in (ax.xaxis, ax.yaxis)
+                      if any(line.get_visible() for line in axis.get_gridlines())]
+
+        # pixel box (x0, y0, x1, y1) from the top left and the pixels of the panel without its animated artists
+        self.region = None
+        self.background = None
+        self.signature = None
+
+    def animate(self, *artists):
+        """
+        Marks artists as the changing part of the panel.
+        """
+        for artist in artists:
+            if artist is None:
+                continue
+            artist.set_animated(True)
+            self.artists.append(artist)
+
+    def overlay(self) -> list:
+        """
+        The animated artists and gridlines in the order the axes would draw them.
+        """
+        layers = [(artist.get_zorder(), artist) for artist in self.artists]
+        for axis in self.grids:
+            # gridlines are drawn with their axis, at its zorder
+            layers.extend((axis.get_zorder(), line) for line in axis.get_gridlines())
+        return [artist for _, artist in sorted(layers, key=lambda layer: layer[0])]
+
+    def hide_grid(self, hidden: bool):
+        """
+        Hides the gridlines while the background is drawn - ticks made meanwhile copy the hidden ones, so every
+        gridline is shown again afterwards.
+        """
+        for axis in self.grids:
+            for line in axis.get_gridlines():
+                line.set_visible(not hidden)
+
+    def ranges(self) -> tuple:
+        """
+        What the static part of the panel depends on: the limits of its axis and the labels set with set_labels.
+        """
+        return self.ax.get_xlim(), self.ax.get_ylim(), self.labels
+
+    def set_labels(self, *labels):
+        """
+        Category labels shown on the axes (e.g. heatmap rows) - a change redraws the panel like a range change.
+        """
+        self.labels = tuple(tuple(str(label) for label in group) for group in labels)
+
+
+class LiveFigure(ABC):
+    """
+    A figure drawn once and then updated in place. Subclasses build the figure and its panels in _build and move
+    the artists' data to new parameters in _update (returning False when the panel has to be built again, e.g.
+    when the categories of a heatmap changed). render and png then redraw only what changed.
+    """
+
+    def __init__(self, figsize: tuple, dpi: int = 100, tight: bool = False):
+        """
+        Args:
+            figsize (tuple): Figure size in inches
+            dpi (int): Resolution of the image
+            tight (bool): Apply tight_layout - done again only when a panel's new ticks no longer fit its room
+        """
+        self.figsize = figsize
+        self.dpi = dpi
+        self.tight = tight
+        self.figure = None
+        self.canvas = None
+        self.panels = []
+        self.params = None
+        self.counts = {'renders': 0, 'builds': 0, 'rebuilds': 0, 'relayouts': 0, 'blits': 0, 'full_draws': 0}
+        self.last_seconds = 0.0
+
+    def _new_figure(self):
+        """
+        A figure outside pyplot with its own Agg canvas - nothing else draws on it or closes it.
+        """
+        self.figure = mfigure.Figure(figsize=self.figsize, dpi=self.dpi)
+        self.canvas = backend_agg.FigureCanvasAgg(self.figure)
+        self.panels = []
+
+    def add_panel(self, ax) -> LivePanel:
+        """
+        Registers an axis whose artists change with the parameters, for _build.
+        """
+        panel = LivePanel(ax)
+        panel.animate(*ax.spines.values())
+        self.panels.append(panel)
+        return panel
+
+    @abstractmethod
+    def _build(self, **params):
+        """
+        Draws the parameters on the new, empty self.figure and registers its changing axes with add_panel.
+        """
+
+    @abstractmethod
+    def _update(self, **params) -> bool:
+        """
+        Moves the data of the panels' artists to the parameters, marking the panels it changed dirty.
+        Returns:
+            False when the figure has to be built again instead
+        """
+
+    @profiled('render', 'LiveFigure.render')
+    def render(self, **params):
+        """
+        Brings the figure to the parameters: built on the first call, updated in place afterwards.
+        Returns:
+            The matplotlib Figure, drawn into its canvas
+        """
+        start = time.perf_counter()
+        try:
+            if self.figure is None:
+                self._new_figure()
+                self._build(**params)
+                self.counts['builds'] += 1
+                self._full_draw()
+            elif params != self.params:
+                if self._update(**params) == False:
+                    # the layout of the figure itself changed - build it again from scratch
+                    self._new_figure()
+                    self._build(**params)
+                    self.counts['rebuilds'] += 1
+                    self._full_draw()
+                else:
+                    self._draw_changes()
+        except Exception:
+            # a half updated figure is not drawn on again - the next render builds a new one
+            self.figure = None
+            self.params = None
+            raise
+        self.params = params
+        self.counts['renders'] += 1
+        self.last_seconds = time.perf_counter() - start
+        return self.figure
+
+    def png(self, **params) -> bytes:
+        """
+        Renders the parameters and returns the image as PNG bytes.
+        """
+        self.render(**params)
+        return self.encode()
+
+    @profiled('render', 'LiveFigure.encode')
+    def encode(self) -> bytes:
+        """
+        The canvas as it is, encoded as PNG - savefig would draw the whole figure again.
+        """
+        buffer = io.BytesIO()
+        mimage.imsave(buffer, np.asarray(self.canvas.buffer_rgba()), format='png',
+                      pil_kwargs={'compress_level': const_live_png_compression})
+        return buffer.getvalue()
+
+    def stats(self) -> dict:
+        """
+        Renders so far and how they were drawn, with the seconds the last one took.
+        """
+        return {**self.counts, 'last_seconds': self.last_seconds}
+
+    def _pixels(self) -> np.ndarray:
+        # the canvas memory itself, rows from the top
+        return np.asarray(self.canvas.buffer_rgba())
+
+    def _panel_region(self, panel: LivePanel, renderer) -> tuple:
+        """
+        The pixel box a panel draws into, from the top left of the canvas.
+        """
+        box = panel.ax.get_tightbbox(renderer)
+        height, width = self._pixels().shape[:2]
+        x0 = max(int(np.floor(box.x0)) - const_panel_pad, 0)
+        x1 = min(int(np.ceil(box.x1)) + const_panel_pad, width)
+        # display coordinates count from the bottom
+        y0 = max(height - int(np.ceil(box.y1)) - const_panel_pad, 0)
+        y1 = min(height - int(np.floor(box.y0)) + const_panel_pad, height)
+        return x0, y0, x1, y1
+
+    def _save_background(self, panel: LivePanel, renderer):
+        panel.region = self._panel_region(panel, renderer)
+        x0, y0, x1, y1 = panel.region
+        panel.background = self._pixels()[y0:y1, x0:x1].copy()
+        panel.signature = panel.ranges()
+
+    def _draw_artists(self, panel: LivePanel):
+        for artist in panel.overlay():
+            if artist.get_visible():
+                panel.ax.draw_artist(artist)
+        panel.dirty = False
+
+    def _full_draw(self):
+        """
+        Draws the static figure, keeps each panel's background, then draws the animated artists on top.
+        """
+        if self.tight == True:
+            self.figure.tight_layout()
+        for panel in self.panels:
+            panel.hide_grid(True)
+        self.canvas.draw()
+        for panel in self.panels:
+            panel.hide_grid(False)
+        renderer = self.canvas.get_renderer()
+
+        # the axes nothing changes on are kept as static panels, so a redrawn panel can tell it would overlap them
+        known = {id(panel.ax) for panel in self.panels}
+        for ax in self.figure.axes:
+            if id(ax) not in known:
+                panel = LivePanel(ax)
+                panel.dirty = False
+                self.panels.append(panel)
+
+        for panel in self.panels:
+            self._save_background(panel, renderer)
+            self._draw_artists(panel)
+        self.counts['full_draws'] += 1
+
+    def _draw_changes(self):
+        """
+        Redraws the panels _update marked dirty: a blit when their ranges held, the panel again when they moved.
+        """
+        renderer = self.canvas.get_renderer()
+        changed = [panel for panel in self.panels if panel.dirty and panel.ranges() != panel.signature]
+
+        pixels = self._pixels()
+        facecolor = (np.asarray(self.figure.get_facecolor()) * 255).round().astype('uint8')
+        for panel in self.panels:
+            if not panel.dirty:
+                continue
+            x0, y0, x1, y1 = panel.region
+            if panel in changed:
+                # clear where the panel was, draw its axes (ticks, labels) for the new ranges - anything outside
+                # the old box belongs to no panel, so the panel may grow into it
+                pixels[y0:y1, x0:x1] = facecolor
+                panel.hide_grid(True)
+                panel.ax.draw(renderer)
+                panel.hide_grid(False)
+                region = panel.region
+                self._save_background(panel, renderer)
+                self.counts['relayouts'] += 1
+                # grown into a neighbour (longer tick labels), or out of the room tight_layout gave it - only a
+                # full draw (laid out again) puts the figure back together
+                grown = self.tight == True and not _contains(region, panel.region)
+                if grown or any(_intersects(panel.region, other.region) for other in self.panels
+                                if other is not panel):
+                    self._full_draw()
+                    return
+            else:
+                pixels[y0:y1, x0:x1] = panel.background
+                self.counts['blits'] += 1
+            self._draw_artists(panel)
+
+
+def _intersects(a: tuple, b: tuple) -> bool:
+    """
+    Whether two pixel boxes (x0, y0, x1, y1) overlap.
+    """
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _contains(outer: tuple, inner: tuple) -> bool:
+    """
+    Whether the pixel box inner (x0, y0, x1, y1) lies within outer.
+    """
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+
+def set_bar_heights(patches, heights):
+    """
+    Moves the bars of a bar chart or histogram to new heights.
+    """
+    for patch, height in zip(patches, heights):
+        patch.set_height(height)
+
+
+def set_legend_labels(legend, labels: dict):
+    """
+    Replaces legend texts, old label to new label - the artists' own labels are left to the caller.
+    """
+    if legend is None:
+        return
+    for text in legend.get_texts():
+        if text.get_text() in labels:
+            text.set_text(labels[text.get_text()])
@@ -0,0 +1,223 @@
+import json
+import time
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+# ****************************************************************
+# opt in stage profiling - named spans around download, parse, etl, filter, aggregate
+# and render record wall time, cpu time and peak allocation while profiling is on,
+# and cost one flag check while it is off
+# ****************************************************************
+
+const_profile_stages = ('download', 'parse', 'etl', 'filter', 'aggregate', 'render')
+
+# handed out while profiling is off
+_disabled_span = nullcontext()
+
+
+class Profiler:
+    """
+    Collects one record per finished span: stage, name, wall and cpu seconds, the part of the wall time not spent
+    in nested spans, and the peak traced allocation above the memory in use when the span started.
+    Spans nest per thread. The cpu time is the thread's own (spans computed concurrently do not see each other),
+    the allocation peak is process wide as tracemalloc keeps a single peak.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracing = False
+
+    def enable(self, trace_memory: bool = True):
+        """
+        Starts recording spans.
+        Args:
+            trace_memory (bool): Also record peak allocations - tracemalloc slows allocation heavy code down
+        """
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stops recording spans, the records collected so far are kept.
+        """
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def clear(self):
+        """
+        Drops every record.
+        """
+        with self._lock:
+            self.records = []
+
+    def mark(self) -> int:
+        """
+        A position in the records, pass it to frame/summary to only look at the spans recorded after it.
+        """
+        return len(self.records)
+
+    def span(self, stage: str, name: str = None):
+        """
+        A context manager timing the code inside it, or a no-op while profiling is off.
+        Args:
+            stage (str): One of const_profile_stages
+            name (str): What exactly ran, defaults to the stage
+        """
+        if not self.enabled:
+            return _disabled_span
+        return self._span(stage, name or stage)
+
+    @contextmanager
+    def _span(self, stage: str, name: str):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        frame = {'children': 0.0, 'peak': 0}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # the enclosing span keeps the peak reached so far before this one resets it
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['base'] = current
+
+        stack.append(frame)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            stack.pop()
+
+            peak_bytes = 0
+            if tracing:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                peak_bytes = max(peak - frame['base'], 0)
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            if stack:
+                stack[-1]['children'] += wall
+
+            record = {'stage': stage, 'name': name, 'depth': len(stack), 'thread': threading.current_thread().name,
+                      'wall_seconds': wall, 'cpu_seconds': cpu, 'self_seconds': wall - frame['children'],
+                      'peak_bytes': peak_bytes}
+            with self._lock:
+                self.records.append(record)
+
+    def frame(self, start: int = 0) -> pd.DataFrame:
+        """
+        The records as a dataframe, one row per span in the order they finished.
+        Args:
+            start (int): A mark, only the spans recorded after it are returned
+        """
+        columns = ['stage', 'name', 'depth', 'thread', 'wall_seconds', 'cpu_seconds', 'self_seconds', 'peak_bytes']
+        return pd.DataFrame(self.records[start:], columns=columns)
+
+    def stats(self, by: str = 'stage', start: int = 0) -> pd.DataFrame:
+        """
+        Totals per stage (or per name): span count, wall/cpu/self seconds and the largest peak allocation.
+        Args:
+            by (str): 'stage', 'name' or a list of both
+            start (int): A mark, only the spans recorded after it are counted
+        Returns:
+            A pandas DataFrame sorted by self seconds, largest first
+        """
+        records = self.frame(start)
+        grouped = records.groupby(by, sort=False).agg(
+            spans=('wall_seconds', 'size'), wall_seconds=('wall_seconds', 'sum'), cpu_seconds=('cpu_seconds', 'sum'),
+            self_seconds=('self_seconds', 'sum'), peak_bytes=('peak_bytes', 'max'))
+        return grouped.sort_values('self_seconds', ascending=False)
+
+    def summary(self, start: int = 0) -> str:
+        """
+        A short text table of where the time went (self seconds per stage and name).
+        Args:
+            start (int): A mark, only the spans recorded after it are counted
+        """
+        if len(self.records) <= start:
+            return 'no spans recorded'
+
+        table = self.stats(['stage', 'name'], start)
+        lines = [f"{'stage':<10} {'name':<45} {'spans':>5} {'self s':>8} {'wall s':>8} {'cpu s':>8} {'peak MB':>8}"]
+        for (stage, name), row in table.iterrows():
+            lines.append(f"{stage:<10} {name:<45} {int(row['spans']):>5} {row['self_seconds']:>8.3f} "
+                         f"{row['wall_seconds']:>8.3f} {row['cpu_seconds']:>8.3f} {row['peak_bytes'] / 1e6:>8.2f}")
+        return '\n'.join(lines)
+
+    def to_json(self, path: str = None, start: int = 0) -> str:
+        """
+        The records (and the per stage totals) as JSON, written to path when given.
+        Args:
+            path (str): File to write, None only returns the text
+            start (int): A mark, only the spans recorded after it are exported
+        Returns:
+            The JSON text
+        """
+        stats = self.stats('stage', start).reset_index() if len(self.records) > start else pd.DataFrame()
+        text = json.dumps({'spans': self.records[start:], 'stages': stats.to_dict(orient='records')}, indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+
+# the profiler the crash modules report to
+profiler = Profiler()
+
+
+def span(stage: str, name: str = None):
+    """
+    A span on the shared profiler - see Profiler.span.
+    """
+    return profiler.span(stage, name)
+
+
+def profiled(stage: str, name: str = None):
+    """
+    Decorator running the whole function inside a span named after it.
+    Args:
+        stage (str): One of const_profile_stages
+        name (str): Span name, defaults to the function name
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with profiler.span(stage, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable_profiling(trace_memory: bool = True) -> Profiler:
+    """
+    Turns the shared profiler on and returns it.
+    """
+    profiler.enable(trace_memory)
+    return profiler
+
+
+def disable_profiling() -> Profiler:
+    """
+    Turns the shared profiler off and returns it, records are kept.
+    """
+    profiler.disable()
+    return profiler
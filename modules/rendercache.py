@@ -0,0 +1,197 @@
+import io
+import inspect
+import weakref
+import threading
+from collections import OrderedDict
+
+from .dataset import dataset_version
+
+# visualization libraries - imported on the first render
+from .lazy import lazy_import
+mfigure = lazy_import('matplotlib.figure')
+ipydisplay = lazy_import('IPython.display')
+
+# ****************************************************************
+# render cache - flipping back to a year already drawn shows the stored image
+# instead of running the plot again
+# ****************************************************************
+
+# arguments that describe how to compute a plot rather than what it shows - left out of the key
+const_render_key_exclude = ('cube',)
+
+
+class RenderCache:
+    """
+    Least recently used store of rendered plots keyed by plot function, its arguments and the dataset version.
+    Holds PNG bytes (kind='png', bounded by entries and bytes) or the figure objects themselves (kind='figure',
+    bounded by entries). A reloaded or synced dataset has another version, so it never hits the old renders.
+    Safe to share between render threads - the store is locked, the plots are drawn outside the lock.
+    """
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 256 * 1024 * 1024, kind: str = 'png', dpi: int = 100):
+        """
+        Args:
+            max_entries (int): Most renders kept at once
+            max_bytes (int): Most PNG bytes kept at once (not applied to figure objects)
+            kind (str): 'png' to keep encoded images, 'figure' to keep matplotlib figures
+            dpi (int): Resolution of the PNG renders
+        """
+        if kind not in ('png', 'figure'):
+            raise ValueError(f"Unknown render cache kind {kind}, expected 'png' or 'figure'")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.kind = kind
+        self.dpi = dpi
+
+        # reentrant - a version's weak reference callback may run while the lock is held by the same thread
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        # id of a dataframe -> (weak reference, version) so a frame is hashed once, not on every lookup
+        self._versions = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def key(self, func, df, *args, **kwargs) -> tuple:
+        """
+        The cache key of a plot call: function name, its bound arguments (defaults filled in) and the dataset version.
+        """
+        bound = inspect.signature(func).bind(df, *args, **kwargs)
+        bound.apply_defaults()
+
+        # the first parameter is the dataset itself - it is represented by its version
+        names = list(bound.arguments)
+        params = tuple((name, bound.arguments[name]) for name in names[1:] if name not in const_render_key_exclude)
+        return func.__name__, params, self.version(df)
+
+    def version(self, df) -> str:
+        """
+        The dataset version of df, remembered for as long as the object lives.
+        """
+        with self._lock:
+            known = self._versions.get(id(df))
+        if known is not None and known[0]() is df:
+            return known[1]
+
+        version = dataset_version(df)
+        with self._lock:
+            self._versions[id(df)] = (weakref.ref(df, lambda ref, key=id(df): self._forget(key)), version)
+        return version
+
+    def _forget(self, key: int):
+        with self._lock:
+            self._versions.pop(key, None)
+
+    def get(self, func, df, *args, **kwargs):
+        """
+        The render of a plot call, drawing it only when it is not cached yet.
+        Args:
+            func: One of the plot_* functions or create_dashboard
+            df (pd.DataFrame or CrashDataset): The crash dataset passed to func
+            args, kwargs: The rest of func's arguments
+        Returns:
+            PNG bytes or a matplotlib Figure, depending on kind
+        """
+        key = self.key(func, df, *args, **kwargs)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = self._render(func, df, *args, **kwargs)
+        with self._lock:
+            # another thread may have drawn the same call meanwhile - its render is kept
+            if key in self._entries:
+                return self._entries[key]
+            self._entries[key] = value
+            self.bytes += self._size(value)
+            self._evict()
+        return value
+
+    def cached(self, func, df, *args, **kwargs) -> bool:
+        """
+        Whether the render of a plot call is stored - a lookup without counting a hit or a miss.
+        """
+        key = self.key(func, df, *args, **kwargs)
+        with self._lock:
+            return key in self._entries
+
+    def show(self, func, df, *args, **kwargs):
+        """
+        Displays a plot call through the cache - the drop in replacement for calling the plot function in a widget.
+        """
+        value = self.get(func, df, *args, **kwargs)
+        if self.kind == 'png':
+            ipydisplay.display(ipydisplay.Image(data=value, format='png'))
+        else:
+            ipydisplay.display(value)
+
+    def invalidate(self, version: str = None):
+        """
+        Drops the renders of one dataset version, or everything when no version is given.
+        Call after a dataframe was changed in place - a reload or sync builds a new frame and is picked up by itself.
+        """
+        with self._lock:
+            if version is None:
+                self._versions.clear()
+            for key in list(self._entries):
+                if version is None or key[2] == version:
+                    self.bytes -= self._size(self._entries.pop(key))
+
+    def stats(self) -> dict:
+        """
+        Hit/miss/eviction counters and current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def _render(self, func, df, *args, **kwargs):
+        """
+        Draws the plot call and keeps the figure or its PNG encoding.
+        """
+        fig = render_figure(func, df, *args, **kwargs)
+        if self.kind == 'figure':
+            return fig
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=self.dpi)
+        return buffer.getvalue()
+
+    def _size(self, value) -> int:
+        return len(value) if isinstance(value, bytes) else 0
+
+    def _evict(self):
+        # called with the lock held
+        while len(self._entries) > self.max_entries or (self.bytes > self.max_bytes and len(self._entries) > 1):
+            _, value = self._entries.popitem(last=False)
+            self.bytes -= self._size(value)
+            self.evictions += 1
+
+
+def render_figure(func, df, *args, **kwargs):
+    """
+    Runs a plot function with pyplot=False and takes the figure it returns - drawn on a canvas of its own, so
+    pyplot's current figure and plt.show are never touched and a render thread cannot race the main thread.
+    Args:
+        func: One of the plot_* functions or create_dashboard
+        df (pd.DataFrame or CrashDataset): The crash dataset passed to func
+        args, kwargs: The rest of func's arguments
+    Returns:
+        The matplotlib Figure, empty when func could not draw (e.g. missing columns)
+    """
+    fig = func(df, *args, pyplot=False, **kwargs)
+    return fig if isinstance(fig, mfigure.Figure) else mfigure.Figure()
+
+
+# shared by the widget helpers when they are asked to cache
+default_render_cache = RenderCache()
@@ -1,161 +1,221 @@
-import requests
 import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 # data access and manipulation libraries
 import pandas as pd
 import numpy as np
-from scipy.stats import gaussian_kde, norm, kurtosis
+
+# loading and etl - pandas and numpy only, importable on its own by headless jobs.
+# re-exported here for the notebook, which loads the data through `from modules.reusable import *`
+from .etl import const_default_storage_dir, const_src_url, const_default_storage_file  # noqa: F401
+from .etl import download_chicago_crashdata, get_chicago_crash_data, etl_crash_data  # noqa: F401
+
+# deferred imports - the plotting and widget libraries load when the first plot or widget is made
+from .lazy import lazy_import
 
 # visualization libraries
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.ticker as ticker
-import seaborn as sns
+plt = lazy_import('matplotlib.pyplot')
+mfigure = lazy_import('matplotlib.figure')
+backend_agg = lazy_import('matplotlib.backends.backend_agg')
+mdates = lazy_import('matplotlib.dates')
+ticker = lazy_import('matplotlib.ticker')
+colors = lazy_import('matplotlib.colors')
+sns = lazy_import('seaborn')
+stats = lazy_import('scipy.stats')
 
 # visualization libraries - ui interaction
-import panel as pn
-from ipywidgets import interact, interactive, fixed, interact_manual
-import ipywidgets as widgets
-from IPython.display import display, clear_output
+pn = lazy_import('panel')
+widgets = lazy_import('ipywidgets')
+ipydisplay = lazy_import('IPython.display')
 
-# capture any display output from functions
-out = widgets.Output()
+# crash counts grouped once - the widgets read their slices instead of scanning the frame
+from .cube import CrashCube
 
-const_default_storage_dir = 'assets/data'
-const_src_url = "https://data.cityofchicago.org/api/views/85ca-t3if/rows.csv?fourfour=85ca-t3if&cacheBust=1742398767&date=20250319&accessType=DOWNLOAD"
-const_default_storage_file = "assets/data/chicago_traffic_crashes.csv"
+# year partitioned wrapper - selections are slices of the frame instead of filtered copies
+from .dataset import CrashDataset
 
-# load the datat from the stored assets
-# reusable function to load a pandas dataframe from an existing csv file
+# area filters - a grid index over the crash coordinates and the neighbourhoods offered by the widgets
+from .spatial import resolve_area, area_mask
 
+# approximate previews - estimates with 95% error bounds from a stratified sample of the crashes
+from .sample import CrashSample
 
-# always ensure the asste/data directory is created
-if not os.path.exists(const_default_storage_dir):
-    os.makedirs(const_default_storage_dir)
+# binned kernel density over distinct values and counts
+from .density import counts_kde, count_moments, violin_stats
 
+# per year power sums and hour histogram, merged as data arrives
+from .summary import DistributionSummary
 
-def download_chicago_crashdata(storein: str = const_default_storage_file, src_url: str = const_src_url,
-                               force: bool = False):
-    """
-    Downloads the Chicago crash data from the public site and stores it in the provided filepath.
-    Args:
-        filepath (str): File where to store the downloaded data
-    Returns:
-        None
-    """
-    url = src_url
-
-    # only delete the file on force and it exists
-    if os.path.exists(storein) and force == True:
-        try:
-            os.remove(storein)
-            print(f"Existing file {storein} deleted via Force being set to True.")
-        except OSError as e:
-            print(f"Error deleting existing file: {e}. Please delete or replace manually if needed.")
-
-    if os.path.exists(storein) == False:
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-
-            with open(storein, 'wb') as f:
-                f.write(response.content)
-            print(f"CSV saved to {storein}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching or saving CSV: {e}")
-        except IOError as e:
-            print(f"Error writing to file: {e}")
-    else:
-        print(f"CSV present in {storein}.")
+# crosstabs from category codes - one bincount into a year x category x category array
+from .crosstab import code_crosstab
+
+# density image and capped sample modes of the jitter scatter
+from .scatter import const_point_budget, counts_density_image, stratified_points
+
+# opt in stage spans (download, parse, etl, filter, aggregate, render)
+from .profiling import profiler, profiled, span, enable_profiling
+
+# lru cache of rendered plots for the widget callbacks
+from .rendercache import RenderCache
+
+# debounced background rendering for the widgets - only the latest widget state is drawn and shown
+from .scheduler import RenderScheduler
 
+# persistent figures - widget changes update the drawn artists instead of building a new figure
+from .liveplot import LiveFigure, set_bar_heights, set_legend_labels
 
-def get_chicago_crash_data(filepath: str = const_default_storage_file) -> pd.DataFrame:
+
+# ****************************************************************
+# visualization functions 
+# ****************************************************************
+
+
+def _plot_figure(figsize: tuple, pyplot: bool = True):
     """
-    Gets a CSV dataset via the url
+    The figure a plot draws on - a pyplot figure for plt.show, or with pyplot=False a figure of its own on an Agg
+    canvas (as LiveFigure draws) that is returned instead, so a render thread never touches pyplot's state.
     Args:
-
-        filepath (str): The path to save the CSV file.
+        figsize (tuple): Width and height in inches
+        pyplot (bool): Create the figure through pyplot
     Returns:
-        A pandas DataFrame containing the CSV file content
+        The matplotlib Figure
     """
+    if pyplot == True:
+        return plt.figure(figsize=figsize)
+    fig = mfigure.Figure(figsize=figsize)
+    backend_agg.FigureCanvasAgg(fig)
+    return fig
 
-    # if the file does exist locally - we will go grab it
-    if os.path.exists(filepath):
-        try:
-            return etl_crash_data(pd.read_csv(filepath))
-        except Exception as e:
-            print(f"Error loading the CSV: {e}")
-            return None
 
-    # not force and the file is already there - voila
-    print(f"No file called::{filepath} found")
-    return None
+def _rotate_xticklabels(ax):
+    """
+    Tilts the x tick labels of an axis 45 degrees, right aligned.
+    """
+    for label in ax.get_xticklabels():
+        label.set(rotation=45, ha='right')
 
 
-def etl_crash_data(df: pd.DataFrame) -> pd.DataFrame:
+@profiled('filter')
+def _select_crashes(df, year: int = None, minimalinjury: int = None, area=None) -> pd.DataFrame:
     """
-    Does some transformation and extraction of additional data into our crash dataset that can be helpful calculating visualization
+    The crashes of a year with at least minimalinjury injuries, for the plot functions to read (never write).
+    A CrashDataset answers with a positional slice of its frame (an area from its spatial index), a plain dataframe
+    is filtered without copying it first.
     Args:
-
-        df (pandas dataframe): Dataframe to modify and pass back to the caller
+        df (pd.DataFrame or CrashDataset): The crash dataset
+        year (int): The year to select, None for every year
+        minimalinjury (int): Lowest INJURIES_TOTAL to keep, None keeps every crash
+        area: A name of const_chicago_areas, a (south, west, north, east) box or a (latitude, longitude, metres)
+              circle, None keeps every crash
     Returns:
-        A modified dataframe with some additional enriched data.
+        A pandas DataFrame
     """
+    if isinstance(df, CrashDataset):
+        return df.select(year, minimalinjury, area)
 
-    # call out why this is important - pass in the format - faster to load seconds over minutes.
-    df['CRASH_DATE'] = pd.to_datetime(df['CRASH_DATE'], format="%m/%d/%Y %I:%M:%S %p")
-    df['CRASH_YEAR'] = df['CRASH_DATE'].dt.year
-    df['CRASH_YEAR'] = df['CRASH_DATE'].dt.year
-    df['CRASH_DAY_NAME'] = df['CRASH_DATE'].dt.day_name()
-    df['CRASH_MONTH_NAME'] = df['CRASH_DATE'].dt.month_name()
+    if year is None and minimalinjury is None and area is None:
+        return df
 
-    # we want to insure our numeric data is properly set to 0 where NaN is encountered
-    df['INJURIES_TOTAL'] = df['INJURIES_TOTAL'].fillna(0)
-    df['INJURIES_FATAL'] = df['INJURIES_FATAL'].fillna(0)
-    df['INJURIES_INCAPACITATING'] = df['INJURIES_INCAPACITATING'].fillna(0)
-    df['INJURIES_NO_INDICATION'] = df['INJURIES_NO_INDICATION'].fillna(0)
-    df['INJURIES_NON_INCAPACITATING'] = df['INJURIES_NON_INCAPACITATING'].fillna(0)
-    df['INJURIES_UNKNOWN'] = df['INJURIES_UNKNOWN'].fillna(0)
-    df['INJURIES_REPORTED_NOT_EVIDENT'] = df['INJURIES_REPORTED_NOT_EVIDENT'].fillna(0)
+    mask = np.ones(len(df), dtype=bool)
+    if year is not None:
+        mask &= (df['CRASH_YEAR'] == year).to_numpy()
+    if minimalinjury is not None:
+        mask &= (df['INJURIES_TOTAL'] >= minimalinjury).to_numpy()
+    if area is not None:
+        mask &= area_mask(df['LATITUDE'].to_numpy(dtype='float64', na_value=np.nan),
+                          df['LONGITUDE'].to_numpy(dtype='float64', na_value=np.nan), area)
+    return df[mask]
+
+
+@profiled('aggregate')
+def _sample_counts(sample: CrashSample, by: list, year: int = None, minimalinjury: int = None,
+                   area=None) -> pd.Series:
+    """
+    Crash counts per group of the by columns estimated from a sample, rounded to whole crashes - the counts the plot
+    functions draw in a preview (see CrashSample.counts for their error bounds).
+    """
+    return sample.counts(by, year, minimalinjury, area)['count'].round().astype('int64')
 
-    return df
 
+def _preview_title(title: str, fraction: float, estimate: tuple = None) -> str:
+    """
+    A title marked as a preview from a sample, with the estimated crash count of the selection when given.
+    """
+    note = f'preview from a {fraction:.0%} sample, 95% error bars'
+    if estimate is not None:
+        note = f'≈{estimate[0]:,.0f} ± {estimate[1]:,.0f} crashes, {note}'
+    return f'{title}\n({note})'
 
-# ****************************************************************
-# visualization functions 
-# ****************************************************************
+
+@profiled('aggregate')
+def _year_counts(df, cube: CrashCube = None, area=None, sample: CrashSample = None) -> pd.Series:
+    """
+    Crash count per year over the whole dataset, or over the crashes of an area (zero for the years it has none).
+    A sample keeps every year's crash count, so only an area's counts are estimates.
+    """
+    if sample is not None:
+        years = sorted(sample.frame['CRASH_YEAR'].unique())
+        counts = _sample_counts(sample, ['CRASH_YEAR'], area=area)
+        return counts.reindex(years, fill_value=0).rename_axis('CRASH_YEAR')
+    if area is not None:
+        if cube is not None:
+            years = cube.years()
+        elif isinstance(df, CrashDataset):
+            years = df.years()
+        else:
+            years = sorted(df['CRASH_YEAR'].unique())
+        counts = _select_crashes(df, area=area)['CRASH_YEAR'].value_counts()
+        return counts.reindex(years, fill_value=0).rename_axis('CRASH_YEAR')
+    if cube is not None:
+        return cube.year_counts()
+    if isinstance(df, CrashDataset):
+        return df.year_counts()
+    return df['CRASH_YEAR'].value_counts().sort_index()
 
 
 # ****************************************************************
 # Plot the crash count by year in a bar graph
 # ****************************************************************
-def plot_crash_count_by_year(df: pd.DataFrame):
+@profiled('render')
+def plot_crash_count_by_year(df: pd.DataFrame, cube: CrashCube = None, area=None, sample: CrashSample = None,
+                             pyplot: bool = True):
     """
     Displays the crash count by year from the given dataset.
 
     Args:
         df (pd.DataFrame): The crash dataset as a Pandas DataFrame.
                            It should contain a 'CRASH_YEAR' column with datetime information.
+        cube (CrashCube): Precomputed counts of the dataset, read instead of df when given
+        area: Only count the crashes of this area (see _select_crashes), None counts every crash
+        sample (CrashSample): Draw a preview from this sample instead, with the error bars of its estimates
+        pyplot (bool): Draw on a pyplot figure and show it, False draws on a figure of its own (see _plot_figure)
+    Returns:
+        The matplotlib figure when pyplot is False
     """
     # Count the number of crashes for each year
-    crash_counts_by_year = df['CRASH_YEAR'].value_counts().sort_index()
-    years = sorted(df['CRASH_YEAR'].unique())
+    crash_counts_by_year = _year_counts(df, cube, area, sample)
+    years = sorted(crash_counts_by_year.index)
     year_counts = crash_counts_by_year.index.tolist()
     counts = crash_counts_by_year.values.tolist()
 
     # Create the bar plot
-    plt.figure(figsize=(10, 6))
+    fig = _plot_figure((10, 6), pyplot)
+    ax = fig.gca()
 
     # use the bars variable to later add annotation
-    bars = plt.bar(year_counts, counts, color='skyblue')
+    bars = ax.bar(year_counts, counts, color='skyblue')
 
     # Add labels and title
-    plt.xlabel("Year")
-    plt.ylabel("Crash Count")
-    plt.title("Crash Count by Year")
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Crash Count")
+    ax.set_title("Crash Count by Year" if sample is None else _preview_title("Crash Count by Year", sample.fraction))
+    if sample is not None:
+        _draw_count_errors(ax, crash_counts_by_year, sample.counts(['CRASH_YEAR'], area=area)['error'])
 
     # in this case, our x axis ticks are the same as the year label - 
-    plt.xticks(labels=years, ticks=years, rotation=45, ha='right')
+    ax.set_xticks(years, labels=years, rotation=45, ha='right')
 
     # Annotate the percentage of change between the bars
     for i in range(1, len(counts)):
@@ -167,22 +227,127 @@ def plot_crash_count_by_year(df: pd.DataFrame):
             percentage_change = ((new_count - old_count) / old_count) * 100
 
         height = bars[i].get_height()
-        plt.annotate(f'{percentage_change:.2f}%',
-                     xy=(bars[i].get_x() + bars[i].get_width() / 2, height),
-                     xytext=(0, 3),  # Offset in points
-                     textcoords='offset points',
-                     ha='center', va='bottom')
+        ax.annotate(f'{percentage_change:.2f}%',
+                    xy=(bars[i].get_x() + bars[i].get_width() / 2, height),
+                    xytext=(0, 3),  # Offset in points
+                    textcoords='offset points',
+                    ha='center', va='bottom')
 
     # plt.grid(axis='y', linestyle='--')
-    plt.tight_layout()
-    plt.show()
+    with span('render', 'tight_layout'):
+        fig.tight_layout()
+    if pyplot == False:
+        return fig
+    with span('render', 'show'):
+        plt.show()
+
+
+def _draw_count_errors(ax, counts: pd.Series, errors: pd.Series):
+    """
+    Error bars on the count bars of a preview - nothing to draw when every count is exact.
+    Args:
+        ax: The matplotlib axis holding the bars
+        counts (pd.Series): The drawn counts, indexed by the bars' x positions
+        errors (pd.Series): 95% error bound of each count, missing ones are exact
+    """
+    errors = errors.reindex(counts.index, fill_value=0.0)
+    if errors.max() > 0:
+        ax.errorbar(counts.index, counts.to_numpy(), yerr=errors.to_numpy(), fmt='none', ecolor='black', capsize=3)
 
 
 # ***************************************
 # let's understand via the violin plot
 # include or not include : tbd
 # ***************************************
-def plot_violinplot_injuries_by_lighting(df: pd.DataFrame, year: int = 2025, applylogtransform: bool = True):
+# the look of seaborn's default violinplot, for the violins drawn from counts
+const_violin_facecolor = '#3274a1'
+const_violin_linecolor = '#3f3f3f'
+const_violin_width = 0.8
+
+
+@profiled('aggregate')
+def _category_value_counts(df, column: str, value: str = 'INJURIES_TOTAL', year: int = None,
+                           cube: CrashCube = None, area=None, sample: CrashSample = None) -> pd.Series:
+    """
+    Crash counts per (category, value) of a year - read from the cube when it has a table of exactly these columns.
+    Args:
+        df (pd.DataFrame or CrashDataset): The crash dataset
+        column (str): The categorical column
+        value (str): The numeric column the violins show
+        year (int): The year to count, None for every year
+        cube (CrashCube): Precomputed counts of df, not read for an area (it has no coordinates)
+        area: Only count the crashes of this area, None counts every crash
+        sample (CrashSample): Estimate the counts from this sample instead
+    Returns:
+        A Series of crash counts indexed by (column, value)
+    """
+    if sample is not None:
+        return _sample_counts(sample, [column, value], year, area=area)
+    if cube is not None and area is None:
+        name = cube.find([column, value])
+        if name is not None:
+            return cube.select(name, year)
+    return _select_crashes(df, year, area=area).groupby([column, value], observed=True).size()
+
+
+@profiled('aggregate')
+def _category_violin_stats(counts: pd.Series, applylogtransform: bool = False) -> dict:
+    """
+    The violin of every category from its value counts - the cost follows the distinct (category, value) pairs,
+    not the crashes.
+    Args:
+        counts (pd.Series): Crash counts indexed by (category, value)
+        applylogtransform (bool): Describe log(value + 1) instead of the value
+    Returns:
+        A dictionary of category to violin_stats, in category order
+    """
+    violins = {}
+    for category, group in counts[counts > 0].groupby(level=0, observed=True):
+        values = group.index.get_level_values(1).to_numpy(dtype='float64')
+        order = np.argsort(values)
+        values, repeats = values[order], group.to_numpy()[order]
+        if applylogtransform == True:
+            # log(x + 1) keeps the order of the values, so the counts carry over unchanged
+            values = np.log(values + 1.0)
+        violins[category] = violin_stats(values, repeats)
+    return violins
+
+
+@profiled('render')
+def _draw_count_violins(ax, violins: dict):
+    """
+    Draws violins from their summaries (see _category_violin_stats) the way seaborn's violinplot does: kde bodies
+    scaled to a common peak (density_norm='area'), an inner box with whiskers and a white median mark.
+    """
+    peaks = [violin['density'].max() for violin in violins.values() if violin['density'] is not None]
+    peak = max(peaks) if peaks else 1.0
+    linewidth = 1.25 * plt.rcParams['patch.linewidth']
+    box_width = linewidth * 4.5
+
+    for position, violin in enumerate(violins.values()):
+        if violin['density'] is None:
+            # no spread - a flat line at the value, as seaborn draws singular data
+            ax.plot([position - const_violin_width / 2, position + const_violin_width / 2], [violin['mean']] * 2,
+                    color=const_violin_linecolor, linewidth=linewidth)
+            continue
+
+        half = violin['density'] / peak * const_violin_width / 2
+        ax.fill_betweenx(violin['support'], position - half, position + half, facecolor=const_violin_facecolor,
+                         edgecolor=const_violin_linecolor, linewidth=linewidth)
+        ax.plot([position, position], [violin['whislo'], violin['whishi']], color=const_violin_linecolor,
+                linewidth=box_width / 3)
+        ax.plot([position, position], [violin['q1'], violin['q3']], color=const_violin_linecolor, linewidth=box_width)
+        ax.plot([position], [violin['median']], marker='_', markersize=box_width / 1.2, markeredgewidth=box_width / 5,
+                markeredgecolor='w', markerfacecolor='w', color=const_violin_linecolor)
+
+    ax.set_xticks(range(len(violins)), [str(category) for category in violins])
+    ax.set_xlim(-0.5, len(violins) - 0.5)
+
+
+@profiled('render')
+def plot_violinplot_injuries_by_lighting(df: pd.DataFrame, year: int = 2025, applylogtransform: bool = True,
+                                         cube: CrashCube = None, mode: str = 'seaborn', area=None,
+                                         sample: CrashSample = None, pyplot: bool = True):
     """
     Generates a violin plot of 'INJURIES_TOTAL' for different
     'LIGHTING_CONDITION' categories from the input DataFrame.
@@ -192,45 +357,239 @@ def plot_violinplot_injuries_by_lighting(df: pd.DataFrame, year: int = 2025, app
             'INJURIES_TOTAL' and 'LIGHTING_CONDITION' columns.
         year (int): The year we want to filter on, we will default to 2025
         applylogtranform (bool): The year we want to filter on, we will default to 2025
+        cube (CrashCube): Precomputed counts of the dataset, read instead of df when given
+        mode (str): 'seaborn' hands every crash of the year to sns.violinplot,
+                    'summary' draws the same violins from per lighting condition injury counts
+        area: Only the crashes of this area (see _select_crashes), None for every crash
+        sample (CrashSample): Draw a preview of the 'summary' violins from the counts estimated from this sample,
+                              whatever the mode
+        pyplot (bool): Draw on a pyplot figure and show it, False draws on a figure of its own (see _plot_figure)
+    Returns:
+        The matplotlib figure when pyplot is False
     """
-    if 'INJURIES_TOTAL' not in df.columns or 'LIGHTING_CONDITION' not in df.columns:
+    if mode not in ('summary', 'seaborn'):
+        raise ValueError(f"Unknown violin mode {mode}, expected 'summary' or 'seaborn'")
+
+    if cube is not None:
+        if not cube.has('year_lighting_injuries'):
+            print("Error: DataFrame must contain 'INJURIES_TOTAL' and 'LIGHTING_CONDITION' columns.")
+            return
+    elif 'INJURIES_TOTAL' not in df.columns or 'LIGHTING_CONDITION' not in df.columns:
         print("Error: DataFrame must contain 'INJURIES_TOTAL' and 'LIGHTING_CONDITION' columns.")
         return
 
-    plt.figure(figsize=(12, 8))
-    df_copy = df.copy()
-    df_copy = df_copy[df_copy['CRASH_YEAR'] == year]
-
-    if applylogtransform == True:
-        # due to a large number of lower number of total injuries, the data is heavily skewed
-        # applying a log transform to stretch out the data
-        df_copy['LOG_INJURIES_TOTAL'] = np.log(df_copy['INJURIES_TOTAL'] + 1)
-        sns.violinplot(x='LIGHTING_CONDITION', y='LOG_INJURIES_TOTAL', data=df_copy)
-        plt.ylabel('Total Injuries - (LOG Transformed)')
+    fig = _plot_figure((12, 8), pyplot)
+    ax = fig.gca()
+    if mode == 'summary' or sample is not None:
+        # the same kde, quartiles and whiskers seaborn computes, from at most a few hundred (lighting, injuries) counts
+        counts = _category_value_counts(df, 'LIGHTING_CONDITION', 'INJURIES_TOTAL', year, cube, area, sample)
+        _draw_count_violins(ax, _category_violin_stats(counts, applylogtransform))
+        ax.set_ylabel('Total Injuries - (LOG Transformed)' if applylogtransform == True else 'Total Injuries')
     else:
-        sns.violinplot(x='LIGHTING_CONDITION', y='INJURIES_TOTAL', data=df_copy)
-        plt.ylabel('Total Injuries')
+        if cube is not None and area is None:
+            # the year's rows rebuilt from the (lighting, injuries) counts - no scan of the full frame
+            df_copy = pd.DataFrame(CrashCube.expand(cube.lighting_injury_counts(year)))
+        else:
+            df_copy = _select_crashes(df, year, area=area)
+
+        if applylogtransform == True:
+            # due to a large number of lower number of total injuries, the data is heavily skewed
+            # applying a log transform to stretch out the data - passed as vectors so the selection is never written to
+            with span('render', 'seaborn.violinplot'):
+                sns.violinplot(x=df_copy['LIGHTING_CONDITION'], y=np.log(df_copy['INJURIES_TOTAL'] + 1.0), ax=ax)
+            ax.set_ylabel('Total Injuries - (LOG Transformed)')
+        else:
+            with span('render', 'seaborn.violinplot'):
+                sns.violinplot(x='LIGHTING_CONDITION', y='INJURIES_TOTAL', data=df_copy, ax=ax)
+            ax.set_ylabel('Total Injuries')
+
+    ax.set_xlabel('Lighting Condition')
+    title = f'Violin Plot of Total Injuries by Lighting Condition -{year}'
+    ax.set_title(title if sample is None else _preview_title(title, sample.fraction))
+    _rotate_xticklabels(ax)  # Rotate x-axis labels for better readability
+    with span('render', 'tight_layout'):
+        fig.tight_layout()
+    if pyplot == False:
+        return fig
+    with span('render', 'show'):
+        plt.show()
+
+
+@profiled('render')
+def plot_violin_by_category(df: pd.DataFrame, column: str = 'LIGHTING_CONDITION', value: str = 'INJURIES_TOTAL',
+                            year: int = None, applylogtransform: bool = True, cube: CrashCube = None, area=None,
+                            sample: CrashSample = None, pyplot: bool = True):
+    """
+    Violins of a numeric column for every category of any categorical column (weather, road surface, ...),
+    drawn from per category value counts - the redraw cost follows the distinct values, not the crashes.
+
+    Args:
+        df (pd.DataFrame): The crash dataset
+        column (str): The categorical column, one violin per category
+        value (str): The numeric column the violins show, best a small whole number like INJURIES_TOTAL
+        year (int): The year to filter on, None for every year
+        applylogtransform (bool): Show log(value + 1), the injury counts are heavily skewed
+        cube (CrashCube): Precomputed counts of the dataset, used when it has a table of these columns
+        area: Only the crashes of this area (see _select_crashes), None for every crash
+        sample (CrashSample): Draw a preview from the counts estimated from this sample
+        pyplot (bool): Draw on a pyplot figure and show it, False draws on a figure of its own (see _plot_figure)
+    Returns:
+        The matplotlib figure when pyplot is False
+    """
+    if (cube is None or cube.find([column, value]) is None or area is not None) and \
+            (column not in df.columns or value not in df.columns):
+        print(f"Error: DataFrame must contain '{value}' and '{column}' columns.")
+        return
+
+    counts = _category_value_counts(df, column, value, year, cube, area, sample)
+    column_label = column.replace('_', ' ').title()
+    value_label = value.replace('_', ' ').title()
+
+    fig = _plot_figure((12, 8), pyplot)
+    ax = fig.gca()
+    _draw_count_violins(ax, _category_violin_stats(counts, applylogtransform))
+    ax.set_ylabel(f'{value_label} - (LOG Transformed)' if applylogtransform == True else value_label)
+    ax.set_xlabel(column_label)
+    title = f"Violin Plot of {value_label} by {column_label} -{year if year is not None else 'All Years'}"
+    ax.set_title(title if sample is None else _preview_title(title, sample.fraction))
+    _rotate_xticklabels(ax)
+    with span('render', 'tight_layout'):
+        fig.tight_layout()
+    if pyplot == False:
+        return fig
+    with span('render', 'show'):
+        plt.show()
+
 
-    plt.xlabel('Lighting Condition')
-    plt.title(f'Violin Plot of Total Injuries by Lighting Condition -{year}')
-    plt.xticks(rotation=45, ha='right')  # Rotate x-axis labels for better readability
-    plt.tight_layout()
-    plt.show()
+class WidgetOptions:
+    """
+    How a widget setup (the setup_* functions and create_interactive_dashboard) draws its plot and lays it out -
+    the caching, profiling, background drawing, area filter and previews every one of them offers. The setups take
+    these as keyword arguments.
+    """
+
+    def __init__(self, render_cache: RenderCache = None, profile: bool = False, background: bool = False,
+                 scheduler: RenderScheduler = None, persistent: bool = False, display: bool = True,
+                 areas: dict = None, sample: CrashSample = None):
+        """
+        Args:
+            render_cache (RenderCache): Serves widget changes already drawn from stored renders, None draws every time
+            profile (bool): Turns on stage profiling and prints where each redraw spent its time under the plot
+            background (bool): Draw widget changes on a background thread, debounced, dropping stale states
+            scheduler (RenderScheduler): Draws the changes and counts them (see its stats), made here when not given
+            persistent (bool): In the background, keep one figure and redraw only the artists a change moved
+            display (bool): Show the options row and the plot here, False returns them as (row, output) instead
+            areas (dict): Named areas for an area dropdown (e.g. const_chicago_areas), None shows no area filter
+            sample (CrashSample): In the background without persistent, show each change drawn from this sample
+                                  first (see load_crash_sample), then the exact plot - ignored with a warning otherwise
+        """
+        # previews are drawn by the background scheduler through the plot functions, so without background or with
+        # persistent figures there are none - a warning says so instead of dropping the sample quietly
+        if sample is not None and (background == False or persistent == True):
+            warnings.warn('sample previews need background=True and persistent=False - drawing the exact plots only',
+                          stacklevel=3)
+            sample = None
+
+        self.render_cache = render_cache
+        self.profile = profile
+        self.background = background
+        self.scheduler = scheduler
+        self.persistent = persistent
+        self.display = display
+        self.areas = areas
+        self.sample = sample
+
+        if profile == True:
+            enable_profiling()
+
+    def area_selector(self):
+        """
+        A dropdown of the named areas led by the whole city, None without areas.
+        Its value is the area given to the plot functions, None for every crash.
+        """
+        if self.areas is None:
+            return None
+        return widgets.Dropdown(
+            options=[('All of Chicago', None)] + [(name, resolve_area(area)) for name, area in self.areas.items()],
+            description='Area:',
+            disabled=False,
+        )
+
+    def show(self, row, controls: dict, df, cube: CrashCube, plot, live, callback):
+        """
+        Adds the area dropdown to the options row, binds the widgets to the plot and shows both - or returns them
+        without display.
+        Args:
+            row (pn.Row): The options row holding the controls
+            controls (dict): Parameter name of plot to the widget giving its value
+            df (pd.DataFrame or CrashDataset): The crash dataset
+            cube (CrashCube): Precomputed counts of df
+            plot: The plot function the background scheduler draws
+            live: The LiveFigure class drawn with persistent, made from df and cube
+            callback: Draws a widget state in the kernel, called with the values of the controls
+        Returns:
+            The (row, output) tuple without display, else None
+        """
+        areaselector = self.area_selector()
+        if areaselector is not None:
+            row.append(areaselector)
+            controls['area'] = areaselector
+
+        if self.background == True:
+            scheduler = self.scheduler
+            if scheduler is None:
+                scheduler = RenderScheduler(render_cache=self.render_cache, profile=self.profile, sample=self.sample)
+            if self.persistent == True:
+                scheduler.bind(controls, live(df, cube), df)
+            else:
+                scheduler.bind(controls, plot, df, cube=cube)
+            output = scheduler.output
+        else:
+            output = widgets.interactive_output(callback, controls)
+
+        if self.display == False:
+            return row, output
+        ipydisplay.display(row)
+        ipydisplay.display(output)
+
+    def draw(self, plot, df, *args, **kwargs):
+        """
+        Draws a widget state in the kernel through the render cache when there is one, with the stage summary
+        under it when profiling.
+        """
+        mark = profiler.mark()
+        if self.render_cache is not None:
+            self.render_cache.show(plot, df, *args, **kwargs)
+        else:
+            ipydisplay.display(plot(df, *args, **kwargs))
+        if self.profile == True:
+            print(profiler.summary(mark))
 
 
 # ****************************************************************
 # function for setting up a widget for the jitter to apply a filter on the year
 # ****************************************************************
-def setup_interactive_jitter(df: pd.DataFrame):
+def setup_interactive_jitter(df: pd.DataFrame, cube: CrashCube = None, **options):
     """
-    Setup for the 
+    Setup for the hour of day vs injuries jitter plot with a year and a minimal injury filter.
+    Args:
+        df (pd.DataFrame): The crash dataset
+        cube (CrashCube): Precomputed counts of df, built once here when not given
+        options: How the plot is drawn and shown, the keyword arguments of WidgetOptions
+    Returns:
+        The (row, output) tuple with display=False, else None
     """
 
     # we need to activate the widgets
     pn.extension('ipywidgets')
+    options = WidgetOptions(**options)
+
+    # every widget change is answered from the cube - build it once up front
+    if cube is None:
+        cube = CrashCube.from_frame(df)
 
     # unique set of years reverse sorted
-    years = sorted(df['CRASH_YEAR'].unique(), reverse=True)
+    years = sorted(cube.years(), reverse=True)
 
     # *********************************************
     # setup a dropdown widget bound to the unique
@@ -260,25 +619,111 @@ def setup_interactive_jitter(df: pd.DataFrame):
     )
 
     # our callback function as the widget set is being interacted with
-    def crash_year_plot(year, minimalinjury):
-        display(plot_crash_hour_of_day_vs_injuries_with_jitter(df, minimalinjury, year))
+    def crash_year_plot(year, minimalinjury, area=None):
+        options.draw(plot_crash_hour_of_day_vs_injuries_with_jitter, df, minimalinjury, year, cube=cube, area=area)
 
     # here we will create a panel row and apply Markdown # to create a title and our widgets
     row = pn.Row('# Options', yearselector, minimalinjuryselector, styles=dict(background='WhiteSmoke'))
 
     # create the initial iteractive plot
-    filteredplot = widgets.interactive_output(crash_year_plot,
-                                              {'year': yearselector, 'minimalinjury': minimalinjuryselector})
+    controls = {'year': yearselector, 'minimalinjury': minimalinjuryselector}
+    return options.show(row, controls, df, cube, plot_crash_hour_of_day_vs_injuries_with_jitter, LiveJitterPlot,
+                        crash_year_plot)
+
+
+@profiled('aggregate')
+def _injury_hour_counts(df, year: int = None, minimalinjury: int = None, cube: CrashCube = None,
+                        area=None, sample: CrashSample = None) -> pd.Series:
+    """
+    Crash counts per (total injuries, hour) of a selection.
+    Args:
+        df (pd.DataFrame or CrashDataset): The crash dataset
+        year (int): The year to count, None for every year
+        minimalinjury (int): Lowest INJURIES_TOTAL to keep
+        cube (CrashCube): Precomputed counts of df, read instead of the rows when given (except for an area)
+        area: Only count the crashes of this area, None counts every crash
+        sample (CrashSample): Estimate the counts from this sample instead
+    Returns:
+        A Series of counts indexed by (INJURIES_TOTAL, CRASH_HOUR)
+    """
+    if sample is not None:
+        return _sample_counts(sample, ['INJURIES_TOTAL', 'CRASH_HOUR'], year, minimalinjury, area)
+    if cube is not None and area is None:
+        return cube.injury_hour_counts(year, minimalinjury if minimalinjury is not None else 0)
+
+    selection = _select_crashes(df, year, minimalinjury, area)
+    return selection.groupby(['INJURIES_TOTAL', 'CRASH_HOUR'], observed=True).size()
+
+
+@profiled('aggregate')
+def _injury_hour_points(counts: pd.Series, jitter: float, mode: str = 'scatter',
+                        max_points: int = const_point_budget) -> dict:
+    """
+    Prepares (injuries, hour) counts for drawing as a jitter scatter, a stratified sample or a density image.
+    Args:
+        counts (pd.Series): Crash counts indexed by (INJURIES_TOTAL, CRASH_HOUR)
+        jitter (float): Standard deviation of the jitter
+        mode (str): 'scatter', 'sample', 'density' or 'auto' (scatter up to max_points crashes, density above)
+        max_points (int): Point budget of the 'sample' and 'auto' modes
+    Returns:
+        A dictionary with the resolved mode and either the image and its extent or the jittered x/y points
+    """
+    if mode not in ('auto', 'scatter', 'sample', 'density'):
+        raise ValueError(f"Unknown jitter mode {mode}, expected 'auto', 'scatter', 'sample' or 'density'")
+
+    total = int(counts.sum())
+    if mode == 'auto' or (mode == 'density' and total == 0):
+        # nothing selected has no density to draw - an empty scatter keeps the axes
+        mode = 'scatter' if total <= max_points else 'density'
+
+    if mode == 'density' and total > 0:
+        injuries = counts.index.get_level_values(0)
+        extent = (float(injuries.min()) - 1, float(injuries.max()) + 1, -1, 24)
+        return {'mode': mode, 'image': counts_density_image(counts, jitter, extent), 'extent': extent}
 
-    display(row)
+    if mode == 'sample':
+        points = stratified_points(counts, max_points)
+    else:
+        points = CrashCube.expand(counts)
 
-    display(filteredplot)
+    # Apply jitter to the 'LANE_CNT' and 'INJURIES_TOTAL' columns - we align the size of the filtered dataset
+    size = len(points['CRASH_HOUR'])
+    return {'mode': mode,
+            'x': points['INJURIES_TOTAL'] + np.random.normal(loc=0, scale=jitter, size=size),
+            'y': points['CRASH_HOUR'] + np.random.normal(loc=0, scale=jitter, size=size),
+            'label': f'Sample of {size:,} of {total:,} crashes' if mode == 'sample' else None}
+
+
+@profiled('render')
+def _draw_injury_hour_points(ax, points: dict):
+    """
+    Draws what _injury_hour_points prepared on an axis.
+    Args:
+        ax: The matplotlib axis to draw on
+        points (dict): The result of _injury_hour_points
+    """
+    if points['mode'] == 'density':
+        image = points['image']
+
+        # crash counts span orders of magnitude between the no injury rows and the rest - log colour scale
+        floor = max(image.max() * 1e-4, 1e-3)
+        mappable = ax.imshow(np.maximum(image, floor), extent=points['extent'], origin='lower', aspect='auto',
+                             cmap='viridis', norm=colors.LogNorm(vmin=floor, vmax=max(image.max(), floor * 10)))
+        ax.figure.colorbar(mappable, ax=ax, label='Crashes per pixel')
+        return
+
+    with span('render', 'seaborn.scatterplot'):
+        sns.scatterplot(x=points['x'], y=points['y'], alpha=0.6, ax=ax, label=points['label'])
 
 
 # ****************************************************************
 # Plot the crash hour in the day with injuries and jitter it up
 # ****************************************************************
-def plot_crash_hour_of_day_vs_injuries_with_jitter(df: pd.DataFrame, minimalinjury: int = 1, year: int = None):
+@profiled('render')
+def plot_crash_hour_of_day_vs_injuries_with_jitter(df: pd.DataFrame, minimalinjury: int = 1, year: int = None,
+                                                   cube: CrashCube = None, mode: str = 'scatter',
+                                                   max_points: int = const_point_budget, area=None,
+                                                   sample: CrashSample = None, pyplot: bool = True):
     """
     Generates a scatter plot of 'LANE_CNT' against 'INJURIES_TOTAL'
     from the input pandas DataFrame, with added jitter.
@@ -286,56 +731,99 @@ def plot_crash_hour_of_day_vs_injuries_with_jitter(df: pd.DataFrame, minimalinju
     Args:
         df: The pandas DataFrame containing crash data with
             'CRASH_HOUR' and 'INJURIES_TOTAL' columns.
+        cube (CrashCube): Precomputed counts of the dataset, read instead of df when given
+        mode (str): 'scatter' (the default) draws every crash, 'density' an image of the jittered point density,
+                    'sample' a stratified sample of at most max_points crashes, 'auto' scatters up to
+                    max_points crashes and switches to the density image above that
+        max_points (int): Point budget of the 'sample' and 'auto' modes
+        area: Only the crashes of this area (see _select_crashes), None for every crash
+        sample (CrashSample): Draw a preview of the crashes estimated from this sample, the title giving their
+                              estimated total with its error bound
+        pyplot (bool): Draw on a pyplot figure and show it, False draws on a figure of its own (see _plot_figure)
+    Returns:
+        The matplotlib figure when pyplot is False
     """
-    if 'CRASH_HOUR' not in df.columns or 'INJURIES_TOTAL' not in df.columns:
+    if cube is None and ('CRASH_HOUR' not in df.columns or 'INJURIES_TOTAL' not in df.columns):
         print("Error: DataFrame must contain 'CRASH_HOUR' and 'INJURIES_TOTAL' columns.")
         return
 
     # Define the amount of jitter
     jitter = 0.2
 
-    df_copy = df.copy()
-    df_copy = df_copy[df_copy['INJURIES_TOTAL'] >= minimalinjury]
-
-    # filter further by year
-    if year is not None:
-        df_copy = df_copy[df_copy['CRASH_YEAR'] == year]
-
-    # Apply jitter to the 'LANE_CNT' and 'INJURIES_TOTAL' columns - we align the size of the filtered dataset
-    jittered_x = df_copy['INJURIES_TOTAL'] + np.random.normal(loc=0, scale=jitter, size=len(df_copy))
-    jittered_y = df_copy['CRASH_HOUR'] + np.random.normal(loc=0, scale=jitter, size=len(df_copy))
+    # the selected crashes as (injuries, hour) counts - every mode below draws from these
+    counts = _injury_hour_counts(df, year, minimalinjury, cube, area, sample)
+    all_hours = cube.hours() if cube is not None else sorted(df['CRASH_HOUR'].unique())
+    title = _jitter_title(year, minimalinjury)
+    if sample is not None:
+        title = _preview_title(title, sample.fraction, sample.total(year, minimalinjury, area))
 
     # Adjust this value to control the amount of jitter
-    plt.figure(figsize=(16, 6))
-    sns.scatterplot(x=jittered_x, y=jittered_y, data=df_copy, alpha=0.6)
-
-    # use the original so we get all hours
-    plt.yticks(np.arange(0, 24), sorted(df['CRASH_HOUR'].unique()))  # Label y-axis with day names
+    fig = _plot_figure((16, 6), pyplot)
+    _draw_jitter_panel(fig.gca(), _injury_hour_points(counts, jitter, mode, max_points), all_hours, title,
+                       'Total Injuries', grid=True)
+    if pyplot == False:
+        return fig
+    with span('render', 'show'):
+        plt.show()
 
-    plt.ylabel('Hour of the Day')
-    plt.xlabel('Total Injuries')
 
+def _jitter_title(year: int, minimalinjury: int) -> str:
+    """
+    Title of the standalone jitter plot.
+    """
     title = f'Jitter Scatter Plot of Hour of the Day vs. Minimal Injury ({minimalinjury})'
     if year is not None:
         title = f'Jitter Scatter Plot of Hour of the Day vs. Minimal Injury ({minimalinjury}) - {year}'
-    plt.title(title)
-    plt.grid(True, which="major", axis="y", linestyle='--', alpha=0.7)  # Add a horizontal grid for days
-    plt.show()
+    return title
+
+
+def _draw_jitter_panel(ax, points: dict, all_hours: list, title: str, xlabel: str, grid: bool = False):
+    """
+    The jitter scatter (or density image) with its hour axis and labels, as the plot and the dashboard show it.
+    Args:
+        ax: The matplotlib axis to draw on
+        points (dict): The result of _injury_hour_points
+        all_hours (list): Every crash hour, labels of the y axis
+        title (str): The axis title
+        xlabel (str): The x axis label
+        grid (bool): Draw the dashed horizontal grid of the standalone plot
+    """
+    _draw_injury_hour_points(ax, points)
+
+    # use the original so we get all hours
+    ax.set_yticks(np.arange(0, 24), all_hours)  # Label y-axis with day names
+
+    ax.set_ylabel('Hour of the Day')
+    ax.set_xlabel(xlabel)
+    ax.set_title(title)
+    if grid == True:
+        ax.grid(True, which="major", axis="y", linestyle='--', alpha=0.7)  # Add a horizontal grid for days
 
 
 # ****************************************************************
 # function for setting up a widget for the jitter to apply a filter on the year
 # ****************************************************************
-def setup_histogram_crashes_by_year(df: pd.DataFrame):
+def setup_histogram_crashes_by_year(df: pd.DataFrame, cube: CrashCube = None, **options):
     """
-    Setup for the 
+    Setup for the crash hour of day histogram with a year filter.
+    Args:
+        df (pd.DataFrame): The crash dataset
+        cube (CrashCube): Precomputed counts of df, built once here when not given
+        options: How the plot is drawn and shown, the keyword arguments of WidgetOptions
+    Returns:
+        The (row, output) tuple with display=False, else None
     """
 
     # we need to activate the widgets
     pn.extension('ipywidgets')
+    options = WidgetOptions(**options)
+
+    # every widget change is answered from the cube - build it once up front
+    if cube is None:
+        cube = CrashCube.from_frame(df)
 
     # unique set of years reverse sorted
-    years = sorted(df['CRASH_YEAR'].unique(), reverse=True)
+    years = sorted(cube.years(), reverse=True)
 
     # *********************************************
     # setup a dropdown widget bound to the unique
@@ -349,81 +837,179 @@ def setup_histogram_crashes_by_year(df: pd.DataFrame):
     )
 
     # our callback function as the widget set is being interacted with
-    def crash_year_plot(year):
-        display(plot_histogram_crashes_by_year(df, year))
+    def crash_year_plot(year, area=None):
+        options.draw(plot_histogram_crashes_by_year, df, year, cube=cube, area=area)
 
     # here we will create a panel row and apply Markdown # to create a title and our widgets
     row = pn.Row('# Options', yearselector, styles=dict(background='WhiteSmoke'))
 
     # create the initial iteractive plot
-    filteredplot = widgets.interactive_output(crash_year_plot, {'year': yearselector})
-
-    # display the row
-    display(row)
-    # display the filtered interactive
-    display(filteredplot)
+    controls = {'year': yearselector}
+    return options.show(row, controls, df, cube, plot_histogram_crashes_by_year, LiveHourHistogram, crash_year_plot)
 
 
 # ****************************************************************
 #
 # ****************************************************************
-def plot_histogram_crashes_by_year(df: pd.DataFrame, year: int):
-    df_copy = df.copy()
-    df_copy = df_copy[df_copy['CRASH_YEAR'] == year]
-    plt.figure(figsize=(10, 5))
-    crash_hours = df_copy['CRASH_HOUR']
-    plt.hist(crash_hours, bins=range(25), density=True, alpha=0.4, color='green', edgecolor='black', label='Histogram')
-
-    # like week 2
-    kde = gaussian_kde(crash_hours)
-    x_kde = np.linspace(min(crash_hours), max(crash_hours), 100)
-    density_kde = kde(x_kde)
-    plt.plot(x_kde, density_kde, color='red', linewidth=2, label='KDE')
-
-    # like week 2 -calculate the mean and standard deviation of the data
-    mean = np.mean(crash_hours)
-    std = np.std(crash_hours)
+@profiled('aggregate')
+def _hour_summary(df, year: int = None, cube: CrashCube = None, area=None, sample: CrashSample = None) -> tuple:
+    """
+    The crash hours of a year as distinct hours with crash counts - at most 24 pairs however many crashes there are -
+    and their moments, both read from the per year summary of the cube.
+    Args:
+        df (pd.DataFrame or CrashDataset): The crash dataset
+        year (int): The year to count, None for every year
+        cube (CrashCube): Precomputed counts of df, read instead of the rows when given (except for an area)
+        area: Only count the crashes of this area, None counts every crash
+        sample (CrashSample): Estimate the hour counts from this sample instead, the moments from the estimates
+    Returns:
+        A tuple of (hours, counts) numpy arrays and the moments dictionary (see DistributionSummary.moments)
+    """
+    if sample is not None:
+        estimates = sample.counts(['CRASH_HOUR'], year, area=area)['count']
+        hours, counts = estimates.index.to_numpy(), estimates.to_numpy()
+        return hours, counts, count_moments(hours, counts)
+    if cube is not None and cube.summary is not None and area is None:
+        summary = cube.summary
+    else:
+        # no cube - one pass over the year's rows gives the same summary
+        summary = DistributionSummary.from_frame(_select_crashes(df, year, area=area))
+    hours, counts = summary.bin_counts(year)
+    return hours, counts, summary.moments(year)
+
+
+@profiled('render')
+def plot_histogram_crashes_by_year(df: pd.DataFrame, year: int, cube: CrashCube = None, area=None,
+                                   sample: CrashSample = None, pyplot: bool = True):
+    # the year's hours as 24 counts and its moments - the histogram, kde and normal curve never touch the crashes
+    hours, counts, moments = _hour_summary(df, year, cube, area, sample)
+    title = 'Distribution of Crash Hours with Normal Distribution'
+    fig = _plot_figure((10, 5), pyplot)
+    _draw_hour_distribution(fig.gca(), hours, counts, moments,
+                            title if sample is None else _preview_title(title, sample.fraction), grid=True)
+    if sample is not None:
+        # a preview - the 95% bounds of every hour's density
+        _draw_share_errors(fig.gca(), sample.shares(['CRASH_HOUR'], year, area=area))
+    with span('render', 'tight_layout'):
+        fig.tight_layout()
+    if pyplot == False:
+        return fig
+    with span('render', 'show'):
+        plt.show()
+
+
+def _hour_kde(hours: np.ndarray, counts: np.ndarray) -> tuple:
+    """
+    The kde curve of the hour counts over their range - no curve for fewer than two distinct hours (a small area
+    may have no crashes in a year at all).
+    """
+    if len(hours) < 2:
+        return np.array([]), np.array([])
+    x_kde = np.linspace(hours.min(), hours.max(), 100)
+    with span('aggregate', 'kde'):
+        return x_kde, counts_kde(hours, counts, x_kde)
+
+
+def _draw_share_errors(ax, shares: pd.DataFrame):
+    """
+    Error bars on the hour histogram of a preview, at the middle of every bar.
+    Args:
+        ax: The matplotlib axis holding the histogram
+        shares (pd.DataFrame): Estimated share of every hour with its 95% error bound, see CrashSample.shares
+    """
+    if len(shares) > 0:
+        ax.errorbar(shares.index.to_numpy() + 0.5, shares['share'].to_numpy(), yerr=shares['error'].to_numpy(),
+                    fmt='none', ecolor='black', capsize=2)
+
+
+def _normal_label(moments: dict) -> str:
+    """
+    Legend entry of the normal curve.
+    """
+    return f"Normal Distribution\n(μ={moments['mean']:.2f}, σ={moments['std']:.2f})"
+
+
+def _kurtosis_label(moments: dict) -> str:
+    """
+    Legend entry holding the kurtosis value.
+    """
+    return f"Kurtosis Value\n{moments['kurtosis']:.2f}"
+
+
+def _draw_hour_distribution(ax, hours: np.ndarray, counts: np.ndarray, moments: dict, title: str, x_kde=None,
+                            density_kde=None, grid: bool = False) -> dict:
+    """
+    The crash hour histogram of a year with its kde and normal curve, as the plot and the dashboard show it.
+    Args:
+        ax: The matplotlib axis to draw on
+        hours, counts (np.ndarray): Distinct hours and their crash counts
+        moments (dict): Mean, std and kurtosis of the hours
+        title (str): The axis title
+        x_kde, density_kde (np.ndarray): The kde curve when already computed
+        grid (bool): Draw the dashed grid of the standalone plot
+    Returns:
+        A dictionary of the drawn artists (bars, kde, normal, kurtosis)
+    """
+    _, _, bars = ax.hist(hours, bins=range(25), weights=counts, density=True, alpha=0.4, color='green',
+                         edgecolor='black', label='Histogram')
+
+    # like week 2 - same curve as gaussian_kde over every crash, evaluated over the distinct hours
+    if x_kde is None:
+        x_kde, density_kde = _hour_kde(hours, counts)
+    kde, = ax.plot(x_kde, density_kde, color='red', linewidth=2, label='KDE')
+
+    # like week 2 - the mean and standard deviation of the data, from the power sums of the summary
+    mean = moments['mean']
+    std = moments['std']
 
     # norm dist
-    xmin, xmax = plt.xlim()
+    xmin, xmax = ax.get_xlim()
     x_norm = np.linspace(xmin, xmax, 100)
-    p = norm.pdf(x_norm, mean, std)
-
-    # calculate the kurtosis value
-    kurtosisval = kurtosis(crash_hours)
+    p = stats.norm.pdf(x_norm, mean, std)
 
-    plt.plot(x_norm, p, 'k--', linewidth=2, label=f'Normal Distribution\n(μ={mean:.2f}, σ={std:.2f})')
+    normal, = ax.plot(x_norm, p, 'k--', linewidth=2, label=_normal_label(moments))
 
     # empty to add value purely to the legend - easier than a textbox!!
-    plt.plot([], [], ' ', label=f'Kurtosis Value\n{kurtosisval:.2f}')
+    kurtosis, = ax.plot([], [], ' ', label=_kurtosis_label(moments))
 
     # Customize the plot
-    plt.title('Distribution of Crash Hours with Normal Distribution')
-    plt.xlabel('Hour of the day (0-23) from midnight to 11pm')
-    plt.ylabel('Probability Density')
+    ax.set_title(title)
+    ax.set_xlabel('Hour of the day (0-23) from midnight to 11pm')
+    ax.set_ylabel('Probability Density')
 
     # we want ours 0 (midnight to 11 pm) in that order
-    plt.xticks(range(24))
-    plt.legend(loc='best')
+    ax.set_xticks(range(24))
+    ax.legend(loc='best')
     # digging the grid -- 
-    plt.grid(True, linestyle='--', alpha=0.4)
-    plt.tight_layout()
-    plt.show()
+    if grid == True:
+        ax.grid(True, linestyle='--', alpha=0.4)
+    return {'bars': bars, 'kde': kde, 'normal': normal, 'kurtosis': kurtosis}
 
 
 # ****************************************************************
 # function for setting up a widget for the heat map year filter
 # ****************************************************************
-def setup_heatmap_weather_road_condition_by_year(df: pd.DataFrame):
+def setup_heatmap_weather_road_condition_by_year(df: pd.DataFrame, cube: CrashCube = None, **options):
     """
-    Setup for the 
+    Setup for the weather vs road surface condition heat map with a year filter.
+    Args:
+        df (pd.DataFrame): The crash dataset
+        cube (CrashCube): Precomputed counts of df, built once here when not given
+        options: How the plot is drawn and shown, the keyword arguments of WidgetOptions
+    Returns:
+        The (row, output) tuple with display=False, else None
     """
 
     # we need to activate the widgets
     pn.extension('ipywidgets')
+    options = WidgetOptions(**options)
+
+    # every widget change is answered from the cube - build it once up front
+    if cube is None:
+        cube = CrashCube.from_frame(df)
 
     # unique set of years reverse sorted
-    years = sorted(df['CRASH_YEAR'].unique(), reverse=True)
+    years = sorted(cube.years(), reverse=True)
 
     # *********************************************
     # setup a dropdown widget bound to the unique
@@ -437,22 +1023,60 @@ def setup_heatmap_weather_road_condition_by_year(df: pd.DataFrame):
     )
 
     # our callback function as the widget set is being interacted with
-    def crash_year_plot(year):
-        display(plot_frequency_heatmap_weather_road_condition(df, year))
+    def crash_year_plot(year, area=None):
+        options.draw(plot_frequency_heatmap_weather_road_condition, df, year, cube=cube, area=area)
 
     # here we will create a panel row and apply Markdown # to create a title and our widgets
     row = pn.Row('# Options', yearselector, styles=dict(background='WhiteSmoke'))
 
     # create the initial iteractive plot
-    filteredplot = widgets.interactive_output(crash_year_plot, {'year': yearselector})
+    controls = {'year': yearselector}
+    return options.show(row, controls, df, cube, plot_frequency_heatmap_weather_road_condition, LiveConditionHeatmap,
+                        crash_year_plot)
 
-    # display the row
-    display(row)
-    # display the filtered interactive
-    display(filteredplot)
+
+def _condition_crosstab(df, year: int = None, cube: CrashCube = None, row: str = 'WEATHER_CONDITION',
+                        column: str = 'ROADWAY_SURFACE_COND', area=None, sample: CrashSample = None) -> pd.DataFrame:
+    """
+    Crash counts of two categorical columns for a year, the frame pd.crosstab gives on the year's crashes.
+    The cube's year x row x column array is sliced when it counts the pair, otherwise the selected crashes are
+    counted from their category codes with one bincount instead of hashing every string.
+    Args:
+        df (pd.DataFrame or CrashDataset): The crash dataset
+        year (int): The year to count, None for every year
+        cube (CrashCube): Precomputed counts of the dataset, for an area only its row and column labels
+        row (str): The column giving the rows
+        column (str): The column giving the columns
+        area: Only count the crashes of this area, None counts every crash
+        sample (CrashSample): Estimate the counts from this sample instead
+    Returns:
+        A pandas DataFrame of int64 counts
+    """
+    if cube is not None and area is None and sample is None:
+        if (row, column) == ('WEATHER_CONDITION', 'ROADWAY_SURFACE_COND'):
+            return cube.condition_crosstab(year)
+        cross_tab = cube.crosstab(row, column, year)
+        if cross_tab is not None:
+            return cross_tab
+
+    if sample is not None:
+        cross_tab = _sample_counts(sample, [row, column], year, area=area).unstack(fill_value=0)
+        if cube is None:
+            # every condition of the sample, so a selection without sampled crashes still gets a grid
+            labels = code_crosstab(sample.frame, row, column)
+            cross_tab = cross_tab.reindex(index=labels.index, columns=labels.columns, fill_value=0)
+    else:
+        cross_tab = code_crosstab(_select_crashes(df, year, area=area), row, column)
+    if (area is not None or sample is not None) and cube is not None:
+        # the conditions of the whole city that year, so every area (even one without crashes) gets the same grid
+        city = _condition_crosstab(df, year, cube, row, column)
+        cross_tab = cross_tab.reindex(index=city.index, columns=city.columns, fill_value=0)
+    return cross_tab
 
 
-def plot_frequency_heatmap_weather_road_condition(df: pd.DataFrame, year: int = None):
+@profiled('render')
+def plot_frequency_heatmap_weather_road_condition(df: pd.DataFrame, year: int = None, cube: CrashCube = None,
+                                                  area=None, sample: CrashSample = None, pyplot: bool = True):
     """
     Generates a frequency heatmap of 'WEATHER_CONDITION' vs.
     'ROADWAY_SURFACE_COND' from the input DataFrame.
@@ -460,50 +1084,232 @@ def plot_frequency_heatmap_weather_road_condition(df: pd.DataFrame, year: int =
     Args:
         df: The pandas DataFrame containing crash data with
             'WEATHER_CONDITION' and 'ROADWAY_SURFACE_COND' columns.
+        cube (CrashCube): Precomputed counts of the dataset, read instead of df when given
+        area: Only the crashes of this area (see _select_crashes), None for every crash
+        sample (CrashSample): Draw a preview from this sample instead, every cell annotated with its error bound
+        pyplot (bool): Draw on a pyplot figure and show it, False draws on a figure of its own (see _plot_figure)
+    Returns:
+        The matplotlib figure when pyplot is False
     """
-    if 'WEATHER_CONDITION' not in df.columns or 'ROADWAY_SURFACE_COND' not in df.columns:
+    if cube is not None:
+        if not cube.has('year_weather_road'):
+            print("Error: DataFrame must contain 'WEATHER_CONDITION' and 'ROADWAY_SURFACE_COND' columns.")
+            return
+    elif 'WEATHER_CONDITION' not in df.columns or 'ROADWAY_SURFACE_COND' not in df.columns:
         print("Error: DataFrame must contain 'WEATHER_CONDITION' and 'ROADWAY_SURFACE_COND' columns.")
         return
 
-    df_copy = df.copy();
-    default_title = 'Heatmap: Weather vs. Road Condition'
+    # Create a contingency table (frequency count) of the two columns
+    with span('aggregate', 'condition_crosstab'):
+        cross_tab = _condition_crosstab(df, year, cube, area=area, sample=sample)
 
+    fig = _plot_figure((10, 8), pyplot)
+    if sample is not None:
+        _draw_condition_heatmap(fig.gca(), cross_tab, _preview_title(_heatmap_title(year), sample.fraction),
+                                errors=_condition_errors(sample, year, area))
+    else:
+        _draw_condition_heatmap(fig.gca(), cross_tab, _heatmap_title(year))
+    with span('render', 'tight_layout'):
+        fig.tight_layout()
+    if pyplot == False:
+        return fig
+    with span('render', 'show'):
+        plt.show()
+
+
+def _heatmap_title(year: int = None) -> str:
+    """
+    Title of the weather x road surface heatmap.
+    """
+    default_title = 'Heatmap: Weather vs. Road Condition'
     if year is not None:
-        df_copy = df_copy[df_copy['CRASH_YEAR'] == year]
         default_title = default_title + f' {year}'
+    return default_title
+
 
+@profiled('aggregate')
+def _condition_errors(sample: CrashSample, year: int = None, area=None, row: str = 'WEATHER_CONDITION',
+                      column: str = 'ROADWAY_SURFACE_COND') -> pd.DataFrame:
+    """
+    The 95% error bounds of the counts of a preview crosstab - cells without a sampled crash are missing.
+    """
+    return sample.counts([row, column], year, area=area)['error'].unstack(fill_value=0.0)
+
+
+def _draw_condition_heatmap(ax, cross_tab: pd.DataFrame, title: str, fontsize: float = None,
+                            errors: pd.DataFrame = None):
+    """
+    The annotated weather x road surface heatmap with its colorbar, as the plot and the dashboard show it.
+    Args:
+        ax: The matplotlib axis to draw on
+        cross_tab (pd.DataFrame): The crash counts, see _condition_crosstab
+        title (str): The axis title
+        fontsize (float): Small tick labels (both axes rotated) for the dashboard, None for the standalone plot
+        errors (pd.DataFrame): The error bounds of a preview's counts, annotated under each count (see
+                               _condition_errors)
+    """
+    annot, fmt = True, "d"
+    if errors is not None:
+        errors = errors.reindex(index=cross_tab.index, columns=cross_tab.columns, fill_value=0.0)
+        annot = np.array([[f'{value:d}\n±{error:,.0f}' if error > 0 else f'{value:d}' for value, error in zip(*cells)]
+                          for cells in zip(cross_tab.to_numpy(), errors.to_numpy())])
+        fmt = ''
+    with span('render', 'seaborn.heatmap'):
+        ax = sns.heatmap(cross_tab, annot=annot, fmt=fmt, cmap="viridis", cbar_kws={'label': 'Frequency'}, ax=ax)
+    if fontsize is None:
+        ax.set_xticklabels(ax.get_xticklabels(), rotation=45, ha='right')
+        ax.set_xlabel('Road Condition')
+        ax.set_ylabel('Weather Condition')
+    else:
+        ax.set_xticklabels(ax.get_xticklabels(), fontsize=fontsize, rotation=45, ha='right')
+        ax.set_yticklabels(ax.get_yticklabels(), fontsize=fontsize, rotation=45, ha='right')
+        ax.set_xlabel('Road Condition', fontsize=fontsize + 0.5)
+        ax.set_ylabel('Weather Condition', fontsize=fontsize + 0.5)
+    ax.set_title(title)
+
+
+@profiled('aggregate')
+def _dashboard_year_counts(df, cube: CrashCube = None, area=None, sample: CrashSample = None) -> pd.Series:
+    """
+    Dashboard panel 1 data - crash count per year over the whole dataset (or the whole history of an area).
+    """
+    return _year_counts(df, cube, area, sample)
+
+
+@profiled('aggregate')
+def _dashboard_injury_hours(df, year: int, minimalinjury: int, cube: CrashCube = None, jitter: float = 0.2,
+                            jitter_mode: str = 'scatter', max_points: int = const_point_budget, area=None,
+                            sample: CrashSample = None) -> dict:
+    """
+    Dashboard panel 2 data - the jitter points (or density image) of the selected crashes and the hour labels.
+    """
+    # the selected crashes as (injuries, hour) counts, drawn as points or as a density image
+    counts = _injury_hour_counts(df, year, minimalinjury, cube, area, sample)
+    points = _injury_hour_points(counts, jitter, jitter_mode, max_points)
+    points['all_hours'] = cube.hours() if cube is not None else sorted(df['CRASH_HOUR'].unique())
+    return points
+
+
+@profiled('aggregate')
+def _dashboard_hour_distribution(df, year: int, cube: CrashCube = None, area=None, sample: CrashSample = None) -> dict:
+    """
+    Dashboard panel 3 data - hour counts of the year with their kde curve and moments.
+    """
+    hours, counts, moments = _hour_summary(df, year, cube, area, sample)
+
+    # like week 2 - same curve as gaussian_kde over every crash, evaluated over the distinct hours
+    x_kde, density_kde = _hour_kde(hours, counts)
+    return {'hours': hours, 'counts': counts, 'x_kde': x_kde, 'density_kde': density_kde, 'moments': moments}
+
+
+@profiled('aggregate')
+def _dashboard_condition_crosstab(df, year: int, cube: CrashCube = None, area=None,
+                                  sample: CrashSample = None) -> pd.DataFrame:
+    """
+    Dashboard panel 4 data - weather x road surface crash counts of the year.
+    """
     # Create a contingency table (frequency count) of the two columns
-    cross_tab = pd.crosstab(df_copy['WEATHER_CONDITION'], df_copy['ROADWAY_SURFACE_COND'])
+    return _condition_crosstab(df, year, cube, area=area, sample=sample)
 
-    plt.figure(figsize=(10, 8))
-    ax = sns.heatmap(cross_tab, annot=True, fmt="d", cmap="viridis", cbar_kws={'label': 'Frequency'})
-    ax.set_xticklabels(ax.get_xticklabels(), rotation=45, ha='right')
 
-    plt.xlabel('Road Condition')
-    plt.ylabel('Weather Condition')
-    plt.title(default_title)
-    plt.tight_layout()
-    plt.show()
+@profiled('aggregate')
+def _dashboard_preview(sample: CrashSample, year: int, minimalinjury: int, area=None) -> dict:
+    """
+    The error bounds of a preview dashboard's panels - the year counts, the estimated total of the jitter selection,
+    the hour densities and the crosstab counts (laid out by _draw_dashboard).
+    """
+    return {'fraction': sample.fraction,
+            'year_errors': sample.counts(['CRASH_YEAR'], area=area)['error'],
+            'selected': sample.total(year, minimalinjury, area),
+            'hour_shares': sample.shares(['CRASH_HOUR'], year, area=area),
+            'crosstab_errors': _condition_errors(sample, year, area)}
 
 
-def create_dashboard(df: pd.DataFrame, year: int = 2024, minimalinjury: int = 1):
-    df_copy = df.copy();
+def _timed(func, *args, **kwargs) -> tuple:
+    """
+    Runs func and returns its result with the seconds it took.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def prepare_dashboard(df: pd.DataFrame, year: int = 2024, minimalinjury: int = 1, cube: CrashCube = None,
+                      jitter_mode: str = 'scatter', max_points: int = const_point_budget, workers: int = None,
+                      timings: dict = None, area=None, sample: CrashSample = None) -> dict:
+    """
+    Computes the data behind the four dashboard panels, concurrently in a thread pool - the scans, groupbys and
+    crosstabs spend most of their time in pandas/numpy code that releases the GIL, so the wall clock is close to
+    the slowest panel rather than the sum of all four.
+    Args:
+        df (pd.DataFrame or CrashDataset): The crash dataset
+        year (int): The year of panels 2 to 4
+        minimalinjury (int): Lowest INJURIES_TOTAL of the jitter panel
+        cube (CrashCube): Precomputed counts of df, read instead of the rows when given
+        jitter_mode (str): Drawing mode of the jitter panel, see plot_crash_hour_of_day_vs_injuries_with_jitter
+        max_points (int): Point budget of the jitter panel
+        workers (int): Threads computing the panels, one per core (at most one per panel) when not given,
+                       1 computes them one after another
+        timings (dict): Receives the seconds spent on each panel and on the whole preparation when given
+        area: Only the crashes of this area in every panel (see _select_crashes), None for every crash - the cube
+              has no coordinates, so the area's rows are counted instead
+        sample (CrashSample): Estimate every panel from this sample instead, for a preview - the error bounds are
+                              added as a fifth 'preview' entry
+    Returns:
+        A dictionary of panel name to its data, ready for create_dashboard
+    """
+    tasks = {
+        'year_counts': (_dashboard_year_counts, (df, cube, area, sample)),
+        'injury_hours': (_dashboard_injury_hours,
+                         (df, year, minimalinjury, cube, 0.2, jitter_mode, max_points, area, sample)),
+        'hour_distribution': (_dashboard_hour_distribution, (df, year, cube, area, sample)),
+        'condition_crosstab': (_dashboard_condition_crosstab, (df, year, cube, area, sample)),
+    }
+    if sample is not None:
+        tasks['preview'] = (_dashboard_preview, (sample, year, minimalinjury, area))
+
+    if workers is None:
+        workers = min(len(tasks), os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(_timed, func, *args) for name, (func, args) in tasks.items()}
+            results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {name: _timed(func, *args) for name, (func, args) in tasks.items()}
+
+    if timings is not None:
+        timings.update({name: seconds for name, (_, seconds) in results.items()})
+        timings['prepare'] = time.perf_counter() - start
+
+    return {name: data for name, (data, _) in results.items()}
 
-    if year is not None:
-        df_copy = df_copy[df_copy['CRASH_YEAR'] == year]
 
-    fig = plt.figure(figsize=(18, 16))
+def _draw_dashboard(fig, panels: dict, year: int, minimalinjury: int) -> dict:
+    """
+    Draws the four dashboard panels from prepare_dashboard's data onto a figure.
+    Args:
+        fig: The matplotlib figure, 18 x 16 inches
+        panels (dict): The result of prepare_dashboard
+        year (int): The year of panels 2 to 4
+        minimalinjury (int): Lowest INJURIES_TOTAL of the jitter panel
+    Returns:
+        A dictionary with the axes of the jitter, distribution and heatmap panels and the distribution artists
+    """
     gs = fig.add_gridspec(2, 2)
+    # a preview from a sample - its titles say so and its estimates get their error bounds
+    preview = panels.get('preview')
 
     # ****************************************************
     # Summarized bar by year - Not filtered - intentional
     # ****************************************************
     ax1 = fig.add_subplot(gs[0, 0])
-    crash_counts_by_year = df['CRASH_YEAR'].value_counts().sort_index()
-    years = sorted(df['CRASH_YEAR'].unique())
+    crash_counts_by_year = panels['year_counts']
+    years = sorted(crash_counts_by_year.index)
     year_counts = crash_counts_by_year.index.tolist()
     counts = crash_counts_by_year.values.tolist()
-    bars = plt.bar(year_counts, counts, color='skyblue')
+    bars = ax1.bar(year_counts, counts, color='skyblue')
     ax1.set_xticks(labels=years, ticks=years, rotation=45, ha='right')
 
     # Annotate the percentage of change between the bars
@@ -516,7 +1322,7 @@ def create_dashboard(df: pd.DataFrame, year: int = 2024, minimalinjury: int = 1)
             percentage_change = ((new_count - old_count) / old_count) * 100
 
         height = bars[i].get_height()
-        plt.annotate(f'{percentage_change:.2f}%',
+        ax1.annotate(f'{percentage_change:.2f}%',
                      xy=(bars[i].get_x() + bars[i].get_width() / 2, height),
                      xytext=(0, 3),  # Offset in points
                      textcoords='offset points',
@@ -524,92 +1330,391 @@ def create_dashboard(df: pd.DataFrame, year: int = 2024, minimalinjury: int = 1)
                      ha='center', va='bottom')
 
     ax1.set_title(f'Crash Count by Year')
+    if preview is not None:
+        _draw_count_errors(ax1, crash_counts_by_year, preview['year_errors'])
+        ax1.set_title(_preview_title('Crash Count by Year', preview['fraction']))
     # ****************************************************
 
     # ****************************************************
     # Jitter Scatter plot
     # ****************************************************
     ax2 = fig.add_subplot(gs[0, 1])
-    # Define the amount of jitter
-    jitter = 0.2
+    title = _dashboard_jitter_title(year, minimalinjury)
+    if preview is not None:
+        title = _preview_title(title, preview['fraction'], preview['selected'])
+    _draw_jitter_panel(ax2, panels['injury_hours'], panels['injury_hours']['all_hours'], title, 'Total # of Injuries')
+    # ****************************************************
 
-    df_copy2 = df_copy[df_copy['INJURIES_TOTAL'] >= minimalinjury]
+    # Box plot
+    ax3 = fig.add_subplot(gs[1, 0])
+    distribution = panels['hour_distribution']
+    title = _dashboard_distribution_title(year)
+    if preview is not None:
+        title = _preview_title(title, preview['fraction'])
+    artists = _draw_hour_distribution(ax3, distribution['hours'], distribution['counts'], distribution['moments'],
+                                      title, distribution['x_kde'], distribution['density_kde'])
+    if preview is not None:
+        _draw_share_errors(ax3, preview['hour_shares'])
+    # ****************************************************
 
-    # Apply jitter to the 'LANE_CNT' and 'INJURIES_TOTAL' columns - we align the size of the filtered dataset (df_copy2) 
-    jittered_x = df_copy2['INJURIES_TOTAL'] + np.random.normal(loc=0, scale=jitter, size=len(df_copy2))
-    jittered_y = df_copy2['CRASH_HOUR'] + np.random.normal(loc=0, scale=jitter, size=len(df_copy2))
+    # ****************************************************
+    # heatmap of the 2 category (Weather and Road)
+    # ****************************************************
+    ax4 = fig.add_subplot(gs[1, 1])
+    if preview is not None:
+        _draw_condition_heatmap(ax4, panels['condition_crosstab'], _preview_title(_heatmap_title(year),
+                                preview['fraction']), fontsize=6, errors=preview['crosstab_errors'])
+    else:
+        _draw_condition_heatmap(ax4, panels['condition_crosstab'], _heatmap_title(year), fontsize=6)
 
-    # Adjust this value to control the amount of jitter
-    sns.scatterplot(x=jittered_x, y=jittered_y, data=df_copy2, alpha=0.6)
+    return {'jitter': ax2, 'distribution': ax3, 'distribution_artists': artists, 'heatmap': ax4}
 
-    # use the original so we get all hours
-    ax2.set_yticks(np.arange(0, 24), sorted(df['CRASH_HOUR'].unique()))  # Label y-axis with day names
 
-    ax2.set_ylabel('Hour of the Day')
-    ax2.set_xlabel('Total # of Injuries')
-    ax2.set_title(f'Jitter Scatter - {year} for injury count {minimalinjury}')
-    # ****************************************************
+def _dashboard_jitter_title(year: int, minimalinjury: int) -> str:
+    return f'Jitter Scatter - {year} for injury count {minimalinjury}'
 
-    # Box plot
-    ax3 = fig.add_subplot(gs[1, 0])
-    crash_hours = df_copy['CRASH_HOUR']
-    ax3.hist(crash_hours, bins=range(25), density=True, alpha=0.4, color='green', edgecolor='black', label='Histogram')
 
-    # like week 2
-    kde = gaussian_kde(crash_hours)
-    x_kde = np.linspace(min(crash_hours), max(crash_hours), 100)
-    density_kde = kde(x_kde)
-    ax3.plot(x_kde, density_kde, color='red', linewidth=2, label='KDE')
+def _dashboard_distribution_title(year: int) -> str:
+    return f'Distribution of Crash Hours with Normal Distribution {year}'
 
-    # like week 2 -calculate the mean and standard deviation of the data
-    mean = np.mean(crash_hours)
-    std = np.std(crash_hours)
 
-    # norm dist
-    xmin, xmax = plt.xlim()
-    x_norm = np.linspace(xmin, xmax, 100)
-    p = norm.pdf(x_norm, mean, std)
+@profiled('render')
+def create_dashboard(df: pd.DataFrame, year: int = 2024, minimalinjury: int = 1, cube: CrashCube = None,
+                     jitter_mode: str = 'scatter', max_points: int = const_point_budget, workers: int = None,
+                     timings: dict = None, area=None, sample: CrashSample = None, pyplot: bool = True):
+    """
+    Draws the four panel dashboard. The panel data is computed first by prepare_dashboard (concurrently), the
+    drawing then happens here on the calling thread as matplotlib requires.
+    Args:
+        df (pd.DataFrame or CrashDataset): The crash dataset
+        year (int): The year of panels 2 to 4
+        minimalinjury (int): Lowest INJURIES_TOTAL of the jitter panel
+        cube (CrashCube): Precomputed counts of df, read instead of the rows when given
+        jitter_mode (str): Drawing mode of the jitter panel, see plot_crash_hour_of_day_vs_injuries_with_jitter
+        max_points (int): Point budget of the jitter panel
+        workers (int): Threads computing the panels, one per core (at most one per panel) when not given,
+                       1 computes them one after another
+        timings (dict): Receives the seconds spent on each panel, the preparation and the drawing when given
+        area: Only the crashes of this area in every panel (see _select_crashes), None for every crash
+        sample (CrashSample): Draw a preview from this sample instead - estimates with their 95% error bounds,
+                              drawn in a fraction of the time a full scan takes (see modules/sample.py)
+        pyplot (bool): Draw on a pyplot figure, False draws on a figure of its own (see _plot_figure)
+    Returns:
+        The matplotlib figure
+    """
+    panels = prepare_dashboard(df, year, minimalinjury, cube, jitter_mode, max_points, workers, timings, area,
+                               sample)
+    draw_start = time.perf_counter()
 
-    # calculate the kurtosis value
-    kurtosisval = kurtosis(crash_hours)
+    fig = _plot_figure((18, 16), pyplot)
+    _draw_dashboard(fig, panels, year, minimalinjury)
 
-    ax3.plot(x_norm, p, 'k--', linewidth=2, label=f'Normal Distribution\n(μ={mean:.2f}, σ={std:.2f})')
+    if timings is not None:
+        timings['draw'] = time.perf_counter() - draw_start
 
-    # empty to add value purely to the legend - easier than a textbox!!
-    ax3.plot([], [], ' ', label=f'Kurtosis Value\n{kurtosisval:.2f}')
+    return fig
 
-    # Customize the plot
-    ax3.set_title(f'Distribution of Crash Hours with Normal Distribution {year}')
-    ax3.set_xlabel('Hour of the day (0-23) from midnight to 11pm')
-    ax3.set_ylabel('Probability Density')
-    ax3.set_xticks(range(24))
-    ax3.legend(loc='best')
-    # ****************************************************
 
-    # ****************************************************
-    # heatmap of the 2 category (Weather and Road)
-    # ****************************************************
-    heatmap_default_title = 'Heatmap: Weather vs. Road Condition'
-    if year is not None:
-        heatmap_default_title = heatmap_default_title + f' {year}'
+# ****************************************************************
+# persistent figures for the widgets - built on the first render, later widget changes
+# move the data of the drawn artists and only the panels they touch are drawn again
+# ****************************************************************
+def _live_jitter(live: LiveFigure, ax, points: dict) -> dict:
+    """
+    Registers the jitter panel drawn by _draw_jitter_panel: its points (or image), legend and title change.
+    """
+    state = {'panel': live.add_panel(ax), 'mode': points['mode'], 'label': points.get('label'), 'colorbar': None}
+    if points['mode'] == 'density':
+        state['data'] = ax.images[-1]
+        state['colorbar'] = live.add_panel(state['data'].colorbar.ax)
+    else:
+        # seaborn draws no collection at all for an empty selection
+        state['data'] = ax.collections[-1] if len(points['x']) > 0 else None
+    state['panel'].animate(ax.title, state['data'], ax.get_legend())
+    return state
 
-    # Create a contingency table (frequency count) of the two columns
-    cross_tab = pd.crosstab(df_copy['WEATHER_CONDITION'], df_copy['ROADWAY_SURFACE_COND'])
-    ax4 = fig.add_subplot(gs[1, 1])
-    ax = sns.heatmap(cross_tab, annot=True, fmt="d", cmap="viridis", cbar_kws={'label': 'Frequency'})
-    ax.set_xticklabels(ax.get_xticklabels(), fontsize=6, rotation=45, ha='right')
-    ax.set_yticklabels(ax.get_yticklabels(), fontsize=6, rotation=45, ha='right')
-    ax4.set_xlabel('Road Condition', fontsize=6.5)
-    ax4.set_ylabel('Weather Condition', fontsize=6.5)
-    ax4.set_title(heatmap_default_title)
 
-    return fig
+def _update_jitter(state: dict, points: dict, title: str) -> bool:
+    """
+    Moves the jitter panel to new points - offsets of the scatter or the pixels of the density image.
+    Returns:
+        False when the drawing mode or the legend changed and the figure has to be built again
+    """
+    if points['mode'] != state['mode'] or (points.get('label') is None) != (state['label'] is None):
+        return False
+    # to or from an empty selection - the scatter is created (or left out) by seaborn
+    if points['mode'] != 'density' and (state['data'] is None or len(points['x']) == 0):
+        return False
+
+    ax = state['panel'].ax
+    ax.title.set_text(title)
+    if points['mode'] == 'density':
+        image = points['image']
+        floor = max(image.max() * 1e-4, 1e-3)
+        state['data'].set_data(np.maximum(image, floor))
+        state['data'].set_extent(points['extent'])
+        state['data'].set_clim(floor, max(image.max(), floor * 10))
+        state['colorbar'].dirty = True
+    else:
+        offsets = np.column_stack([points['x'], points['y']])
+        state['data'].set_offsets(offsets)
+        # limits from the new points alone, as a new scatter would get them
+        ax.ignore_existing_data_limits = True
+        if len(offsets):
+            ax.update_datalim(offsets)
+        ax.autoscale_view()
+        # the hour ticks widen the limits, as set_yticks did when the panel was drawn
+        ax.yaxis.set_view_interval(0, 23)
+        if points['label'] is not None:
+            set_legend_labels(ax.get_legend(), {state['label']: points['label']})
+            state['data'].set_label(points['label'])
+        state['label'] = points.get('label')
+    state['panel'].dirty = True
+    return True
+
+
+def _live_distribution(live: LiveFigure, ax, artists: dict) -> dict:
+    """
+    Registers the hour distribution panel drawn by _draw_hour_distribution: bars, curves, legend and title change.
+    """
+    panel = live.add_panel(ax)
+    panel.animate(ax.title, *artists['bars'], artists['kde'], artists['normal'], ax.get_legend())
+    return {'panel': panel, **artists}
+
 
+def _update_distribution(state: dict, hours: np.ndarray, counts: np.ndarray, moments: dict, title: str,
+                         x_kde=None, density_kde=None):
+    """
+    Moves the hour distribution panel to another year - bar heights, kde and normal curve, legend values.
+    """
+    ax = state['panel'].ax
+    ax.title.set_text(title)
+    heights, _ = np.histogram(hours, bins=range(25), weights=counts, density=True)
+    set_bar_heights(state['bars'], heights)
 
-def create_interactive_dashboard(df: pd.DataFrame):
-    """Creates an interactive dashboard with widgets for controlling the display."""
+    if x_kde is None:
+        x_kde, density_kde = _hour_kde(hours, counts)
+    state['kde'].set_data(x_kde, density_kde)
+    state['normal'].set_ydata(stats.norm.pdf(state['normal'].get_xdata(), moments['mean'], moments['std']))
+
+    labels = {state['normal'].get_label(): _normal_label(moments),
+              state['kurtosis'].get_label(): _kurtosis_label(moments)}
+    set_legend_labels(ax.get_legend(), labels)
+    state['normal'].set_label(_normal_label(moments))
+    state['kurtosis'].set_label(_kurtosis_label(moments))
+
+    ax.relim()
+    ax.autoscale_view()
+    state['panel'].dirty = True
+
+
+def _live_heatmap(live: LiveFigure, ax, cross_tab: pd.DataFrame) -> dict:
+    """
+    Registers the heatmap panel drawn by _draw_condition_heatmap: the cell colours, annotations and title change,
+    its colorbar is a panel of its own.
+    """
+    mesh = ax.collections[0]
+    panel = live.add_panel(ax)
+    panel.animate(ax.title, mesh, *ax.texts)
+    panel.set_labels(cross_tab.index, cross_tab.columns)
+    return {'panel': panel, 'mesh': mesh, 'texts': list(ax.texts), 'colorbar': live.add_panel(mesh.colorbar.ax)}
+
+
+def _update_heatmap(state: dict, cross_tab: pd.DataFrame, title: str) -> bool:
+    """
+    Moves the heatmap to other counts - cell values, colour limits and annotations, coloured like seaborn does.
+    Returns:
+        False when the weather or road conditions shown changed and the figure has to be built again
+    """
+    panel = state['panel']
+    labels = panel.labels
+    panel.set_labels(cross_tab.index, cross_tab.columns)
+    if panel.labels != labels:
+        return False
+
+    panel.ax.title.set_text(title)
+    values = cross_tab.to_numpy()
+    mesh = state['mesh']
+    mesh.set_array(values)
+    mesh.set_clim(values.min(), values.max())
+    mesh.update_scalarmappable()
+    for text, value, color in zip(state['texts'], values.flat, mesh.get_facecolors()):
+        text.set_text(f'{value:d}')
+        text.set_color('.15' if sns.utils.relative_luminance(color) > .408 else 'w')
+
+    panel.dirty = True
+    state['colorbar'].dirty = True
+    return True
+
+
+class LiveDashboard(LiveFigure):
+    """
+    The four panel dashboard as a persistent figure: drawn once by create_dashboard's code, then a new year or
+    minimal injury only moves the data of the jitter, distribution and heatmap panels (the year bars never change).
+    A new area changes the year bars too and builds the figure again.
+    """
+
+    def __init__(self, df, cube: CrashCube = None, jitter_mode: str = 'scatter', max_points: int = const_point_budget,
+                 workers: int = None, dpi: int = 100):
+        """
+        Args:
+            df (pd.DataFrame or CrashDataset): The crash dataset
+            cube (CrashCube): Precomputed counts of df, read instead of the rows when given
+            jitter_mode (str): Drawing mode of the jitter panel, see plot_crash_hour_of_day_vs_injuries_with_jitter
+            max_points (int): Point budget of the jitter panel
+            workers (int): Threads computing the panels, see prepare_dashboard
+            dpi (int): Resolution of the image
+        """
+        super().__init__((18, 16), dpi)
+        self.df = df
+        self.cube = cube
+        self.jitter_mode = jitter_mode
+        self.max_points = max_points
+        self.workers = workers
+        self._prepared = None
+
+    def _prepare(self, year: int, minimalinjury: int, area=None) -> dict:
+        return prepare_dashboard(self.df, year, minimalinjury, self.cube, self.jitter_mode, self.max_points,
+                                 self.workers, area=area)
+
+    def _build(self, year: int = 2024, minimalinjury: int = 1, area=None):
+        # a rebuild reuses the panels its failed update computed
+        panels = self._prepared if self._prepared is not None else self._prepare(year, minimalinjury, area)
+        self._prepared = None
+        drawn = _draw_dashboard(self.figure, panels, year, minimalinjury)
+        self.jitter = _live_jitter(self, drawn['jitter'], panels['injury_hours'])
+        self.distribution = _live_distribution(self, drawn['distribution'], drawn['distribution_artists'])
+        self.heatmap = _live_heatmap(self, drawn['heatmap'], panels['condition_crosstab'])
+
+    def _update(self, year: int = 2024, minimalinjury: int = 1, area=None) -> bool:
+        panels = self._prepare(year, minimalinjury, area)
+        self._prepared = panels
+        if area != self.params.get('area'):
+            return False
+        if not _update_jitter(self.jitter, panels['injury_hours'], _dashboard_jitter_title(year, minimalinjury)):
+            return False
+        if year != self.params.get('year'):
+            distribution = panels['hour_distribution']
+            _update_distribution(self.distribution, distribution['hours'], distribution['counts'],
+                                 distribution['moments'], _dashboard_distribution_title(year), distribution['x_kde'],
+                                 distribution['density_kde'])
+            if not _update_heatmap(self.heatmap, panels['condition_crosstab'], _heatmap_title(year)):
+                return False
+        self._prepared = None
+        return True
+
+
+class LiveJitterPlot(LiveFigure):
+    """
+    plot_crash_hour_of_day_vs_injuries_with_jitter as a persistent figure for the year and minimal injury widgets.
+    """
+
+    def __init__(self, df, cube: CrashCube = None, mode: str = 'scatter', max_points: int = const_point_budget,
+                 dpi: int = 100):
+        """
+        Args:
+            df (pd.DataFrame or CrashDataset): The crash dataset
+            cube (CrashCube): Precomputed counts of df, read instead of the rows when given
+            mode (str): Drawing mode, see plot_crash_hour_of_day_vs_injuries_with_jitter
+            max_points (int): Point budget of the 'sample' and 'auto' modes
+            dpi (int): Resolution of the image
+        """
+        super().__init__((16, 6), dpi)
+        self.df = df
+        self.cube = cube
+        self.mode = mode
+        self.max_points = max_points
+        self._prepared = None
+
+    def _points(self, year: int, minimalinjury: int, area=None) -> dict:
+        counts = _injury_hour_counts(self.df, year, minimalinjury, self.cube, area)
+        return _injury_hour_points(counts, 0.2, self.mode, self.max_points)
+
+    def _build(self, year: int = None, minimalinjury: int = 1, area=None):
+        all_hours = self.cube.hours() if self.cube is not None else sorted(self.df['CRASH_HOUR'].unique())
+        # a rebuild reuses the points its failed update computed
+        points = self._prepared if self._prepared is not None else self._points(year, minimalinjury, area)
+        self._prepared = None
+        ax = self.figure.add_subplot()
+        _draw_jitter_panel(ax, points, all_hours, _jitter_title(year, minimalinjury), 'Total Injuries', grid=True)
+        self.jitter = _live_jitter(self, ax, points)
+
+    def _update(self, year: int = None, minimalinjury: int = 1, area=None) -> bool:
+        self._prepared = self._points(year, minimalinjury, area)
+        if not _update_jitter(self.jitter, self._prepared, _jitter_title(year, minimalinjury)):
+            return False
+        self._prepared = None
+        return True
+
+
+class LiveHourHistogram(LiveFigure):
+    """
+    plot_histogram_crashes_by_year as a persistent figure for the year widget.
+    """
+
+    def __init__(self, df, cube: CrashCube = None, dpi: int = 100):
+        """
+        Args:
+            df (pd.DataFrame or CrashDataset): The crash dataset
+            cube (CrashCube): Precomputed counts of df, read instead of the rows when given
+            dpi (int): Resolution of the image
+        """
+        super().__init__((10, 5), dpi, tight=True)
+        self.df = df
+        self.cube = cube
+
+    def _build(self, year: int = None, area=None):
+        hours, counts, moments = _hour_summary(self.df, year, self.cube, area)
+        ax = self.figure.add_subplot()
+        artists = _draw_hour_distribution(ax, hours, counts, moments,
+                                          'Distribution of Crash Hours with Normal Distribution', grid=True)
+        self.distribution = _live_distribution(self, ax, artists)
+
+    def _update(self, year: int = None, area=None) -> bool:
+        hours, counts, moments = _hour_summary(self.df, year, self.cube, area)
+        _update_distribution(self.distribution, hours, counts, moments,
+                             'Distribution of Crash Hours with Normal Distribution')
+        return True
+
+
+class LiveConditionHeatmap(LiveFigure):
+    """
+    plot_frequency_heatmap_weather_road_condition as a persistent figure for the year widget.
+    """
+
+    def __init__(self, df, cube: CrashCube = None, dpi: int = 100):
+        """
+        Args:
+            df (pd.DataFrame or CrashDataset): The crash dataset
+            cube (CrashCube): Precomputed counts of df, read instead of the rows when given
+            dpi (int): Resolution of the image
+        """
+        super().__init__((10, 8), dpi, tight=True)
+        self.df = df
+        self.cube = cube
+
+    def _build(self, year: int = None, area=None):
+        cross_tab = _condition_crosstab(self.df, year, self.cube, area=area)
+        ax = self.figure.add_subplot()
+        _draw_condition_heatmap(ax, cross_tab, _heatmap_title(year))
+        self.heatmap = _live_heatmap(self, ax, cross_tab)
+
+    def _update(self, year: int = None, area=None) -> bool:
+        return _update_heatmap(self.heatmap, _condition_crosstab(self.df, year, self.cube, area=area),
+                               _heatmap_title(year))
+
+
+def create_interactive_dashboard(df: pd.DataFrame, cube: CrashCube = None, **options):
+    """Creates an interactive dashboard with widgets for controlling the display.
+    The counts behind every panel are grouped once into a CrashCube (or the one given is used) so a widget change
+    only slices small tables. The keyword arguments of WidgetOptions choose how the dashboard is drawn and shown -
+    with persistent in the background a change only redraws the panels it moved, and with areas every panel is
+    narrowed to the crashes of a neighbourhood."""
     pn.extension('ipywidgets')
-    years = sorted(df['CRASH_YEAR'].unique(), reverse=True)
+    options = WidgetOptions(**options)
+    if cube is None:
+        cube = CrashCube.from_frame(df)
+    years = sorted(cube.years(), reverse=True)
     yearselector = widgets.Dropdown(
         options=years,
         value=years[0],
@@ -630,23 +1735,25 @@ def create_interactive_dashboard(df: pd.DataFrame):
         readout_format='d'
     )
 
-    def update(year, minimumjury):
+    def update(year, minimalinjury, area=None):
         # Clear previous output to avoid memory issues
-        clear_output(wait=True)
+        ipydisplay.clear_output(wait=True)
 
         # Create and display the dashboard with current widget values
-        fig = create_dashboard(df=df, year=year, minimalinjury=minimumjury)
-        plt.show()
+        mark = profiler.mark()
+        if options.render_cache is not None:
+            options.render_cache.show(create_dashboard, df=df, year=year, minimalinjury=minimalinjury, cube=cube,
+                                      area=area)
+        else:
+            create_dashboard(df=df, year=year, minimalinjury=minimalinjury, cube=cube, area=area)
+            with span('render', 'show'):
+                plt.show()
+        if options.profile == True:
+            print(profiler.summary(mark))
 
     # here we will create a panel row and apply Markdown # to create a title and our widgets
     row = pn.Row('# Filter Options', yearselector, minimalinjuryselector, styles=dict(background='WhiteSmoke'))
 
     # create the initial iteractive plot
-    filteredplot = widgets.interactive_output(update, {'year': yearselector, 'minimumjury': minimalinjuryselector})
-
-    # display the row
-    display(row)
-    # display the filtered interactive
-    display(filteredplot)
-
-    #return (row, filteredplot)
+    controls = {'year': yearselector, 'minimalinjury': minimalinjuryselector}
+    return options.show(row, controls, df, cube, create_dashboard, LiveDashboard, update)
@@ -0,0 +1,288 @@
+import os
+import json
+import shutil
+
+# data access and manipulation libraries
+import pandas as pd
+import numpy as np
+
+from .datacache import const_default_cache_dir, source_fingerprint, write_frame_part, read_frame_parts
+from .dataset import CrashDataset
+from .profiling import profiled
+from .spatial import area_mask
+
+# ****************************************************************
+# stratified sample - a small share of the crashes drawn once per (year, injury bucket)
+# so a preview can be drawn from it right away, every count and share estimated
+# with a 95% error bound, while the exact figure is still being drawn
+# ****************************************************************
+
+# bump whenever the stratification or the stored layout changes so stale samples on disk are rebuilt
+const_sample_version = 1
+
+# share of every stratum's crashes kept
+const_sample_fraction = 0.02
+
+# fewest crashes kept per stratum (all of them when it has fewer) - the rare, badly injured strata stay usable
+const_sample_min_rows = 50
+
+# lower edges of the injury buckets: 0, 1, 2, 3-4 and 5 or more injuries
+const_sample_injury_edges = (0, 1, 2, 3, 5)
+
+# normal quantile of the two sided 95% error bounds
+const_sample_z = 1.96
+
+
+class CrashSample:
+    """
+    A stratified random sample of the crash frame: every CRASH_YEAR x injury bucket stratum keeps fraction of its
+    crashes (at least const_sample_min_rows), drawn without replacement. Counts of any selection are estimated by
+    weighting each kept crash by its stratum's population over its sample size, with the variance of stratified
+    sampling - strata kept whole add no error. The estimates cost the sample's rows, not the frame's.
+    """
+
+    def __init__(self, frame: pd.DataFrame, strata: np.ndarray, population: np.ndarray, sampled: np.ndarray,
+                 fraction: float = const_sample_fraction, seed: int = 0):
+        """
+        Args:
+            frame (pd.DataFrame): The kept crashes, columns as in the crash frame
+            strata (np.ndarray): Stratum number of every kept crash
+            population (np.ndarray): Crashes of each stratum in the full frame, by stratum number
+            sampled (np.ndarray): Crashes kept of each stratum, by stratum number
+            fraction (float): Share of every stratum kept
+            seed (int): Seed the sample was drawn with
+        """
+        self.frame = frame
+        self.strata = strata
+        self.population = population
+        self.sampled = sampled
+        self.fraction = fraction
+        self.seed = seed
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @classmethod
+    @profiled('aggregate', 'CrashSample.from_frame')
+    def from_frame(cls, df: pd.DataFrame, fraction: float = const_sample_fraction, seed: int = 0,
+                   min_rows: int = const_sample_min_rows) -> 'CrashSample':
+        """
+        Draws the sample in one pass: every crash gets a random key, and each stratum keeps its smallest keys.
+        Args:
+            df (pd.DataFrame or CrashDataset): The transformed crash dataframe
+            fraction (float): Share of every stratum to keep, 0 < fraction <= 1
+            seed (int): Random seed, the same frame and seed give the same sample
+            min_rows (int): Fewest crashes kept per stratum
+        Returns:
+            A CrashSample
+        """
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Unknown sample fraction {fraction}, expected a share above 0 and at most 1")
+        if isinstance(df, CrashDataset):
+            df = df.frame
+
+        codes = stratum_codes(df['CRASH_YEAR'].to_numpy(), df['INJURIES_TOTAL'].to_numpy())
+        population = np.bincount(codes)
+        sampled = np.minimum(population, np.maximum(np.ceil(population * fraction), min_rows)).astype('int64')
+
+        # by stratum, then by random key - the first sampled[stratum] crashes of each run are kept
+        keys = np.random.default_rng(seed).random(len(codes))
+        order = np.lexsort((keys, codes))
+        starts = np.concatenate([[0], np.cumsum(population)[:-1]])
+        rank = np.arange(len(order)) - starts[codes[order]]
+        kept = np.sort(order[rank < sampled[codes[order]]])
+
+        return cls(df.take(kept).reset_index(drop=True), codes[kept], population, sampled, fraction, seed)
+
+    def _mask(self, year: int = None, minimalinjury: int = None, area=None) -> np.ndarray:
+        """
+        The kept crashes inside a selection - a scan of the sample, which is small.
+        """
+        mask = np.ones(len(self.frame), dtype=bool)
+        if year is not None:
+            mask &= (self.frame['CRASH_YEAR'] == year).to_numpy()
+        if minimalinjury is not None:
+            mask &= (self.frame['INJURIES_TOTAL'] >= minimalinjury).to_numpy()
+        if area is not None:
+            mask &= area_mask(self.frame['LATITUDE'].to_numpy(dtype='float64', na_value=np.nan),
+                              self.frame['LONGITUDE'].to_numpy(dtype='float64', na_value=np.nan), area)
+        return mask
+
+    def _stratum_counts(self, by: list, mask: np.ndarray) -> pd.Series:
+        """
+        Kept crashes of the selection per group of the by columns and stratum.
+        """
+        columns = {name: self.frame[name].to_numpy()[mask] for name in by}
+        frame = pd.DataFrame({**columns, 'stratum': self.strata[mask]})
+        return frame.groupby(by + ['stratum'], observed=True).size()
+
+    @profiled('aggregate', 'CrashSample.counts')
+    def counts(self, by: list, year: int = None, minimalinjury: int = None, area=None) -> pd.DataFrame:
+        """
+        Estimated crash counts of a selection per group of the by columns.
+        Args:
+            by (list): Columns to group by, e.g. ['CRASH_HOUR']
+            year (int): The year to count, None for every year
+            minimalinjury (int): Lowest INJURIES_TOTAL to count, None counts every crash
+            area: Only count the crashes of this area (see resolve_area), None counts every crash
+        Returns:
+            A pandas DataFrame indexed by the groups, with the estimated count and its 95% error bound (the half
+            width of the interval) - groups without a kept crash are missing
+        """
+        kept = self._stratum_counts(by, self._mask(year, minimalinjury, area))
+        stratum = kept.index.get_level_values('stratum').to_numpy()
+        population = self.population[stratum].astype('float64')
+        sampled = self.sampled[stratum].astype('float64')
+
+        share = kept.to_numpy() / sampled
+        # without replacement - a stratum kept whole has no error
+        variance = population ** 2 * (1 - sampled / population) * share * (1 - share) / np.maximum(sampled - 1, 1)
+        table = pd.DataFrame({'count': population * share, 'variance': variance}, index=kept.index)
+        table = table.groupby(level=list(range(len(by))), observed=True).sum()
+        table['error'] = const_sample_z * np.sqrt(table.pop('variance'))
+        return table
+
+    @profiled('aggregate', 'CrashSample.total')
+    def total(self, year: int = None, minimalinjury: int = None, area=None) -> tuple:
+        """
+        Estimated crash count of a selection.
+        Returns:
+            A tuple of the count and its 95% error bound
+        """
+        mask = self._mask(year, minimalinjury, area)
+        kept = np.bincount(self.strata[mask], minlength=len(self.population)).astype('float64')
+        share = kept / np.maximum(self.sampled, 1)
+        variance = self.population ** 2 * (1 - self.sampled / np.maximum(self.population, 1)) * share * \
+            (1 - share) / np.maximum(self.sampled - 1, 1)
+        return float(np.dot(self.population, share)), float(const_sample_z * np.sqrt(variance.sum()))
+
+    @profiled('aggregate', 'CrashSample.shares')
+    def shares(self, by: list, year: int = None, minimalinjury: int = None, area=None) -> pd.DataFrame:
+        """
+        Estimated share of each group of the by columns in a selection (a histogram density for one column),
+        as a ratio of two estimated counts with its linearized stratified variance.
+        Args:
+            by (list): Columns to group by, e.g. ['CRASH_HOUR']
+            year (int): The year to count, None for every year
+            minimalinjury (int): Lowest INJURIES_TOTAL to count, None counts every crash
+            area: Only count the crashes of this area (see resolve_area), None counts every crash
+        Returns:
+            A pandas DataFrame indexed by the groups, with the estimated share and its 95% error bound
+        """
+        kept = self._stratum_counts(by, self._mask(year, minimalinjury, area))
+        if len(kept) == 0:
+            return pd.DataFrame({'share': [], 'error': []})
+
+        # groups x strata of kept crashes, and the selection's kept crashes per stratum
+        matrix = kept.unstack('stratum', fill_value=0)
+        strata = matrix.columns.to_numpy()
+        groups = matrix.to_numpy().astype('float64')
+        selected = groups.sum(axis=0)
+        population = self.population[strata].astype('float64')
+        sampled = self.sampled[strata].astype('float64')
+
+        weight = population / sampled
+        total = np.dot(selected, weight)
+        share = groups @ weight / total
+
+        # residuals of share per kept crash: 1 - share in the group, -share elsewhere in the selection, 0 outside
+        residual_sum = groups - share[:, None] * selected[None, :]
+        residual_squares = groups * (1 - share[:, None]) ** 2 + (selected[None, :] - groups) * share[:, None] ** 2
+        spread = (residual_squares - residual_sum ** 2 / sampled) / np.maximum(sampled - 1, 1)
+        variance = (population ** 2 * (1 - sampled / population) * spread / sampled).sum(axis=1) / total ** 2
+        # exact shares (strata kept whole or wholly in one group) can round a hair below zero
+        variance = np.maximum(variance, 0)
+        return pd.DataFrame({'share': share, 'error': const_sample_z * np.sqrt(variance)}, index=matrix.index)
+
+    def save(self, path: str):
+        """
+        Writes the kept crashes and the stratum sizes as directories of .npy columns under path.
+        Args:
+            path (str): Directory receiving the sample
+        """
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+
+        write_frame_part(self.frame.assign(SAMPLE_STRATUM=self.strata), os.path.join(path, 'crashes'), 0)
+        write_frame_part(pd.DataFrame({'population': self.population, 'sampled': self.sampled}),
+                         os.path.join(path, 'strata'), 0)
+        with open(os.path.join(path, 'sample.json'), 'w') as f:
+            json.dump({'fraction': self.fraction, 'seed': self.seed}, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'CrashSample':
+        """
+        Reads a sample written by save.
+        Args:
+            path (str): Directory holding the sample
+        Returns:
+            A CrashSample
+        """
+        frame = read_frame_parts(os.path.join(path, 'crashes'))
+        strata = read_frame_parts(os.path.join(path, 'strata'))
+        with open(os.path.join(path, 'sample.json'), 'r') as f:
+            meta = json.load(f)
+        codes = frame.pop('SAMPLE_STRATUM').to_numpy()
+        return cls(frame, codes, strata['population'].to_numpy(), strata['sampled'].to_numpy(), meta['fraction'],
+                   meta['seed'])
+
+
+def stratum_codes(years: np.ndarray, injuries: np.ndarray) -> np.ndarray:
+    """
+    The stratum number of every crash: its year (counted from the first one) times the injury buckets plus its
+    injury bucket.
+    Args:
+        years (np.ndarray): CRASH_YEAR of every crash
+        injuries (np.ndarray): INJURIES_TOTAL of every crash
+    Returns:
+        A numpy array of stratum numbers
+    """
+    first = years.min() if len(years) else 0
+    buckets = np.searchsorted(np.asarray(const_sample_injury_edges), injuries, side='right') - 1
+    return (years.astype('int64') - first) * len(const_sample_injury_edges) + np.maximum(buckets, 0)
+
+
+def load_crash_sample(filepath: str, df: pd.DataFrame = None, cache_dir: str = const_default_cache_dir,
+                      fraction: float = const_sample_fraction, seed: int = 0,
+                      fingerprint: dict = None) -> CrashSample:
+    """
+    Gets the stratified sample of a crash CSV from the cache next to the columnar data cache, drawing and storing
+    it from the transformed frame when the cache is missing, the source changed or another fraction is asked for.
+    Args:
+        filepath (str): The source CSV file
+        df (pd.DataFrame): The transformed crash dataframe, only needed when the sample has to be drawn
+        cache_dir (str): Directory holding the caches
+        fraction (float): Share of every stratum to keep
+        seed (int): Random seed of the sample
+        fingerprint (dict): Key of the source from source_fingerprint, computed when not given
+    Returns:
+        A CrashSample, or None when it has to be drawn and no dataframe was given
+    """
+    samplepath = os.path.join(cache_dir, os.path.basename(filepath) + f'.sample-{fraction:g}')
+    manifestpath = samplepath + '.manifest.json'
+
+    if fingerprint is None:
+        fingerprint = source_fingerprint(filepath, cache_dir)
+    manifest = {'source': fingerprint, 'sample_version': const_sample_version, 'fraction': fraction, 'seed': seed}
+
+    if os.path.exists(manifestpath) and os.path.isdir(samplepath):
+        try:
+            with open(manifestpath, 'r') as f:
+                if json.load(f) == manifest:
+                    return CrashSample.load(samplepath)
+        except (IOError, ValueError):
+            pass
+
+    if df is None:
+        return None
+
+    sample = CrashSample.from_frame(df, fraction, seed)
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.exists(manifestpath):
+        os.remove(manifestpath)
+    sample.save(samplepath)
+    with open(manifestpath, 'w') as f:
+        json.dump(manifest, f)
+
+    return sample
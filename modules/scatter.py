@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# scipy is only imported once a density image is drawn
+from .lazy import lazy_import
+special = lazy_import('scipy.special')
+
+# ****************************************************************
+# large scatter plots - the points are drawn from (x, y) counts instead of one
+# marker per crash, either as a density image or as a capped stratified sample
+# ****************************************************************
+
+# most markers drawn by the sample mode (and by 'auto' before it switches to the density image)
+const_point_budget = 20_000
+
+# pixels (width, height) of the density image
+const_density_resolution = (640, 240)
+
+
+def _pixel_shares(values: np.ndarray, jitter: float, low: float, high: float, pixels: int) -> np.ndarray:
+    """
+    The share of a jittered value landing in each pixel along one axis - normal cdf differences over the pixel edges.
+    Returns:
+        A (values, pixels) numpy array
+    """
+    edges = np.linspace(low, high, pixels + 1)
+    return np.diff(special.ndtr((edges[None, :] - values[:, None]) / jitter), axis=1)
+
+
+def counts_density_image(counts: pd.Series, jitter: float, extent: tuple,
+                         resolution: tuple = const_density_resolution) -> np.ndarray:
+    """
+    The expected number of jittered points per pixel when every (x, y) pair of counts is spread with normal noise
+    of scale jitter on both axes - what the jitter scatter shows once it turns into a solid blob, computed exactly.
+    The image is the product of small matrices (distinct x, distinct y, pixels), the number of crashes only enters
+    through the counts.
+    Args:
+        counts (pd.Series): Point counts indexed by (x, y)
+        jitter (float): Standard deviation of the jitter
+        extent (tuple): (left, right, bottom, top) of the image in data units
+        resolution (tuple): (width, height) in pixels
+    Returns:
+        A (height, width) numpy array, row 0 at the bottom
+    """
+    width, height = resolution
+    left, right, bottom, top = extent
+
+    table = counts.unstack(fill_value=0)
+    xs = table.index.to_numpy(dtype='float64')
+    ys = table.columns.to_numpy(dtype='float64')
+
+    share_x = _pixel_shares(xs, jitter, left, right, width)
+    share_y = _pixel_shares(ys, jitter, bottom, top, height)
+    return share_y.T @ table.to_numpy(dtype='float64').T @ share_x
+
+
+def stratified_points(counts: pd.Series, max_points: int = const_point_budget, seed: int = None) -> dict:
+    """
+    At most max_points points drawn from (x, y) counts: every pair present keeps at least one point (so rare
+    combinations stay visible) and the rest of the budget is shared out in proportion to the counts.
+    Args:
+        counts (pd.Series): Point counts indexed by (x, y)
+        max_points (int): Budget of points
+        seed (int): Seed of the random generator used to break ties in the allocation
+    Returns:
+        A dictionary of column name to numpy array like CrashCube.expand, plus 'weight' - how many
+        crashes each drawn point stands for
+    """
+    values = counts.to_numpy().astype('int64')
+    total = int(values.sum())
+
+    if total <= max_points:
+        allocation = values
+    elif len(values) >= max_points:
+        # not even one point per pair - keep the largest pairs
+        allocation = np.zeros_like(values)
+        allocation[np.argsort(values, kind='stable')[::-1][:max_points]] = 1
+    else:
+        # one point each, the remaining budget split by largest remainder
+        share = (values - 1) * (max_points - len(values)) / (total - len(values))
+        allocation = 1 + np.floor(share).astype('int64')
+        remainder = max_points - int(allocation.sum())
+        if remainder > 0:
+            rng = np.random.default_rng(seed)
+            order = np.lexsort((rng.random(len(values)), -(share - np.floor(share))))
+            allocation[order[:remainder]] += 1
+
+    index = counts.index
+    points = {name: np.repeat(index.get_level_values(i).to_numpy(), allocation) for i, name in enumerate(index.names)}
+    kept = allocation > 0
+    points['weight'] = np.repeat(values[kept] / allocation[kept], allocation[kept])
+    return points
@@ -0,0 +1,348 @@
+import io
+import time
+import base64
+import inspect
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .profiling import profiler
+from .rendercache import render_figure
+from .liveplot import LiveFigure
+
+# ui interaction - imported with the first widget
+from .lazy import lazy_import
+widgets = lazy_import('ipywidgets')
+
+# ****************************************************************
+# background render scheduler - widget changes are debounced and drawn on a worker
+# thread, a newer change drops the older ones, and the output only ever shows the
+# latest requested state instead of replaying every step of a slider - optionally
+# shown first as a preview from a sample, then refined to the exact plot
+# ****************************************************************
+
+# quiet time after a widget change before it is drawn, in seconds
+const_render_debounce = 0.25
+
+# what can happen to a requested render
+const_render_outcomes = ('completed', 'debounced', 'superseded', 'stale', 'failed')
+
+
+class RenderScheduler:
+    """
+    Draws plot calls for a widget on a background thread, one at a time, and shows the result in its own Output
+    widget.
+    A request only starts once no newer one came in for the debounce time (debounced otherwise). While a render is
+    drawing, one request waits behind it and a newer one takes its place (superseded). A render that finishes after
+    a newer request came in is never shown (stale) - a running plot cannot be interrupted, but nothing it draws
+    reaches the output, and with a render cache its image is still kept for when that state is asked for again.
+    With a sample, a plot call taking one is first drawn from it and shown as a preview, then drawn exactly - the
+    exact render replaces the preview unless a newer request came in. States in the render cache skip the preview.
+    Every request ends in exactly one of const_render_outcomes, counted in stats.
+    """
+
+    def __init__(self, debounce: float = const_render_debounce, render_cache=None, dpi: int = 100,
+                 profile: bool = False, output=None, executor: ThreadPoolExecutor = None, dispatch=None,
+                 sample=None):
+        """
+        Args:
+            debounce (float): Seconds a request must stay the latest before it is drawn, 0 draws right away
+            render_cache (RenderCache): Serves states already drawn from stored renders, None draws every time
+            dpi (int): Resolution of the shown PNG when there is no render cache
+            profile (bool): Show where each render spent its time under the plot
+            output (ipywidgets.Output): Where the renders are shown, a new Output widget when not given
+            executor (ThreadPoolExecutor): An executor shared with other schedulers (the sessions of a server), which
+                                           then render in parallel - a new single thread one when not given
+            dispatch: Called with a function showing a render, to run it where the output lives (a server
+                      session's event loop) - the render thread shows it itself when not given
+            sample (CrashSample): Show a preview drawn from this sample before each exact render of a plot call with
+                                  a sample parameter (the plot_* functions and create_dashboard, not a LiveFigure)
+        """
+        self.debounce = debounce
+        self.render_cache = render_cache
+        self.dpi = dpi
+        self.profile = profile
+        self._output = output
+        self.dispatch = dispatch
+        self.sample = sample
+
+        # the number of the latest request - anything older is dropped wherever it is
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._pending = None
+        self._running = False
+        self._closed = False
+        # generation -> its debounce timer not fired yet, cancelled by close
+        self._timers = {}
+        # the scheduler runs one render at a time itself (see _running), a thread of its own is enough
+        self._own_executor = executor is None
+        self._executor = executor if executor is not None else ThreadPoolExecutor(max_workers=1,
+                                                                                  thread_name_prefix='render')
+
+        self.requested = 0
+        self.previews = 0
+        self.counts = dict.fromkeys(const_render_outcomes, 0)
+        self.render_seconds = 0.0
+        self.last_error = None
+        self._idle = threading.Event()
+        self._idle.set()
+
+    @property
+    def output(self):
+        """
+        The Output widget showing the latest render - display it where the plot should go.
+        """
+        if self._output is None:
+            self._output = widgets.Output()
+        return self._output
+
+    def request(self, func, df, *args, **kwargs) -> int:
+        """
+        Asks for a plot call to be drawn and shown, dropping every older request not shown yet.
+        Args:
+            func: One of the plot_* functions, create_dashboard or a LiveFigure (rendered in place with kwargs)
+            df (pd.DataFrame or CrashDataset): The crash dataset passed to func, a LiveFigure holds its own
+            args, kwargs: The rest of func's arguments
+        Returns:
+            The request's generation number
+        """
+        with self._lock:
+            self.generation += 1
+            self.requested += 1
+            generation = self.generation
+            if self._closed:
+                # nothing is drawn once closed
+                self.counts['superseded'] += 1
+                return generation
+            self._idle.clear()
+
+            call = (func, df, args, kwargs)
+            if self.debounce > 0:
+                timer = threading.Timer(self.debounce, self._debounced, (generation, call))
+                timer.daemon = True
+                self._timers[generation] = timer
+                timer.start()
+                return generation
+        self._submit(generation, call)
+        return generation
+
+    def bind(self, controls: dict, func, df, **fixed):
+        """
+        Requests func with the current widget values now and again whenever one of them changes.
+        Args:
+            controls (dict): Parameter name of func to the widget giving its value
+            func: One of the plot_* functions, create_dashboard or a LiveFigure
+            df (pd.DataFrame or CrashDataset): The crash dataset passed to func, a LiveFigure holds its own
+            fixed: Further keyword arguments passed on every call, e.g. cube
+        """
+        def changed(change=None):
+            values = {name: control.value for name, control in controls.items()}
+            self.request(func, df, **values, **fixed)
+
+        for control in controls.values():
+            control.observe(changed, names='value')
+        changed()
+
+    def _debounced(self, generation: int, call: tuple):
+        # a request's debounce timer firing
+        with self._lock:
+            self._timers.pop(generation, None)
+        self._submit(generation, call)
+
+    def _submit(self, generation: int, call: tuple):
+        """
+        Runs when a request's debounce time is over: starts it, queues it behind the running render or drops it.
+        """
+        with self._lock:
+            if self._closed:
+                # close already counted the request
+                return
+            if generation != self.generation:
+                self._finish('debounced')
+                return
+            if self._running:
+                if self._pending is not None:
+                    self._finish('superseded')
+                self._pending = (generation, call)
+                return
+            self._running = True
+        try:
+            self._executor.submit(self._run, generation, call)
+        except RuntimeError:
+            # the executor was shut down by close meanwhile, which counted the request
+            with self._lock:
+                self._running = False
+
+    def _run(self, generation: int, call: tuple):
+        """
+        Worker loop: draws the request, shows it when it is still the latest, then takes the one queued behind it.
+        """
+        while True:
+            self._render(generation, call)
+            with self._lock:
+                if self._pending is None:
+                    self._running = False
+                    self._settle()
+                    return
+                (generation, call), self._pending = self._pending, None
+                # the queued request may itself have been overtaken while waiting
+                if generation != self.generation:
+                    self._finish('superseded')
+                    self._running = False
+                    self._settle()
+                    return
+
+    def _render(self, generation: int, call: tuple):
+        """
+        Draws one plot call to PNG bytes and publishes it unless a newer request came in meanwhile.
+        """
+        func, df, args, kwargs = call
+        start = time.perf_counter()
+        mark = profiler.mark()
+        try:
+            self._preview(generation, func, df, args, kwargs)
+            png = self._draw(generation, func, df, args, kwargs)
+        except Exception as e:
+            with self._lock:
+                self.render_seconds += time.perf_counter() - start
+                self.last_error = e
+                self._finish('failed')
+            name = getattr(func, '__name__', type(func).__name__)
+            self._publish(generation, None, f'Error rendering {name}: {e}\n')
+            return
+
+        text = profiler.summary(mark) + '\n' if self.profile == True else None
+        with self._lock:
+            self.render_seconds += time.perf_counter() - start
+            if generation != self.generation:
+                self._finish('stale')
+                return
+            self._finish('completed')
+        self._publish(generation, png, text)
+
+    def _draw(self, generation: int, func, df, args: tuple, kwargs: dict) -> bytes:
+        """
+        PNG bytes of one plot call, None when it is out of date before it gets encoded.
+        """
+        if isinstance(func, LiveFigure):
+            # the persistent figure redraws only what changed - cheaper than a cached image of a new figure
+            func.render(**kwargs)
+            return func.encode() if generation == self.generation else None
+
+        if self.render_cache is not None:
+            value = self.render_cache.get(func, df, *args, **kwargs)
+        else:
+            value = render_figure(func, df, *args, **kwargs)
+        # not encoded (and not shown) when it is already out of date
+        if self.render_cache is None and generation != self.generation:
+            return None
+        return self._png(value)
+
+    def _preview(self, generation: int, func, df, args: tuple, kwargs: dict):
+        """
+        Draws and shows a plot call from the sample before its exact render, when it takes a sample and its exact
+        render is not cached - the preview itself is never cached.
+        """
+        if self.sample is None or isinstance(func, LiveFigure) or kwargs.get('sample') is not None:
+            return
+        if 'sample' not in inspect.signature(func).parameters:
+            return
+        if self.render_cache is not None and self.render_cache.cached(func, df, *args, **kwargs):
+            return
+
+        value = render_figure(func, df, *args, **kwargs, sample=self.sample)
+        if generation != self.generation:
+            return
+        with self._lock:
+            self.previews += 1
+        self._publish(generation, self._png(value), f'Preview from a {self.sample.fraction:.0%} sample - drawing '
+                                                    f'the exact plot\n')
+
+    def _png(self, value) -> bytes:
+        """
+        PNG bytes of a render - cached renders may already be encoded, figures are encoded here.
+        """
+        if isinstance(value, bytes):
+            return value
+        buffer = io.BytesIO()
+        value.savefig(buffer, format='png', dpi=self.dpi)
+        return buffer.getvalue()
+
+    def _publish(self, generation: int, png: bytes, text: str = None):
+        """
+        Shows a render, through dispatch when the output belongs to another thread.
+        """
+        if self.dispatch is not None:
+            self.dispatch(functools.partial(self._show, generation, png, text))
+        else:
+            self._show(generation, png, text)
+
+    def _show(self, generation: int, png: bytes, text: str = None):
+        """
+        Replaces the output with the render in one assignment, so it never shows two states or a blank in between.
+        """
+        if generation != self.generation:
+            return
+        outputs = []
+        if png is not None:
+            outputs.append({'output_type': 'display_data', 'metadata': {},
+                            'data': {'image/png': base64.b64encode(png).decode('ascii'),
+                                     'text/plain': f'<render {generation}>'}})
+        if text:
+            outputs.append({'output_type': 'stream', 'name': 'stdout', 'text': text})
+        self.output.outputs = tuple(outputs)
+
+    def _finish(self, outcome: str):
+        # called with the lock held - once closed, close has counted every request
+        if self._closed:
+            return
+        self.counts[outcome] += 1
+        self._settle()
+
+    def _settle(self):
+        # called with the lock held - idle once every request has its outcome
+        if self._closed:
+            return
+        if sum(self.counts.values()) == self.requested and not self._running:
+            self._idle.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Blocks until every request so far was shown or dropped, e.g. before reading stats in a script.
+        Returns:
+            False when the timeout ran out first
+        """
+        return self._idle.wait(timeout)
+
+    def stats(self) -> dict:
+        """
+        Requested renders and what became of them: completed (shown) against dropped (debounced, superseded
+        before drawing, or stale once drawn) and failed, with the previews shown and the time spent drawing.
+        """
+        with self._lock:
+            dropped = self.counts['debounced'] + self.counts['superseded'] + self.counts['stale']
+            return {'requested': self.requested, **self.counts, 'dropped': dropped, 'previews': self.previews,
+                    'in_flight': self.requested - sum(self.counts.values()), 'render_seconds': self.render_seconds,
+                    'drop_rate': dropped / self.requested if self.requested else 0.0}
+
+    def close(self):
+        """
+        Drops every request not shown yet and stops drawing: the debounce timers are cancelled and the requests
+        still in flight count as superseded, so wait returns right away. A running render cannot be interrupted -
+        it finishes on its thread, but is never shown. An owned render thread is stopped, a shared executor is left
+        to its owner.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.generation += 1
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+            self._pending = None
+            self.counts['superseded'] += self.requested - sum(self.counts.values())
+            self._running = False
+            self._idle.set()
+        if self._own_executor == True:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,264 @@
+import os
+import sys
+import time
+import warnings
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .etl import get_chicago_crash_data, download_chicago_crashdata, const_default_storage_file
+from .datacache import const_default_cache_dir, source_fingerprint
+from .dataset import CrashDataset
+from .cube import CrashCube, load_crash_cube
+from .rendercache import RenderCache
+from .spatial import const_chicago_areas
+from .sample import CrashSample, load_crash_sample
+from .scheduler import RenderScheduler
+from .reusable import create_interactive_dashboard, setup_interactive_jitter, setup_histogram_crashes_by_year, \
+    setup_heatmap_weather_road_condition_by_year
+
+# web app framework and ui interaction - imported with the first session
+from .lazy import lazy_import
+pn = lazy_import('panel')
+widgets = lazy_import('ipywidgets')
+
+# ****************************************************************
+# multi session server - one process loads the crash dataset, its cube and a render
+# cache once and every browser session reads them; a session keeps only its widgets,
+# a render scheduler and the image it shows
+# python -m modules.server --csv assets/data/chicago_traffic_crashes.csv --port 5006
+# ****************************************************************
+
+# the url path of each view and the widget setup serving it
+const_server_views = {
+    'dashboard': create_interactive_dashboard,
+    'jitter': setup_interactive_jitter,
+    'histogram': setup_histogram_crashes_by_year,
+    'heatmap': setup_heatmap_weather_road_condition_by_year,
+}
+
+const_server_port = 5006
+
+# renders kept for every session together - the states analysts share are drawn once per process
+const_server_render_entries = 512
+
+# renders drawn at once for every session together - a session itself draws one at a time
+const_server_render_workers = os.cpu_count() or 1
+
+
+class ServerSession:
+    """
+    One browser session: its layout, the scheduler drawing it and its widgets. Everything else it reads is shared.
+    """
+
+    def __init__(self, view: str, layout, scheduler: RenderScheduler, controls: list):
+        """
+        Args:
+            view (str): One of const_server_views
+            layout (pn.Column): The options row above the output
+            scheduler (RenderScheduler): Draws the session's widget changes
+            controls (list): The session's widgets in the order of the options row
+        """
+        self.view = view
+        self.layout = layout
+        self.scheduler = scheduler
+        self.controls = controls
+        self.opened = time.time()
+
+
+class CrashServer:
+    """
+    What a server process shares between its sessions: the crash dataset (a CrashDataset), its CrashCube, a render
+    cache and the pool of render threads. They are loaded once and only read afterwards, so a new session costs
+    widgets and one image instead of a copy of the crash frame. The plots draw on figures of their own (see
+    render_figure), so the sessions render in parallel, one render at a time each.
+    """
+
+    def __init__(self, df, cube: CrashCube = None, render_cache: RenderCache = None, persistent: bool = False,
+                 areas: dict = None, sample: CrashSample = None, workers: int = const_server_render_workers):
+        """
+        Args:
+            df (pd.DataFrame or CrashDataset): The transformed crash dataset
+            cube (CrashCube): Precomputed counts of df, built here when not given
+            render_cache (RenderCache): Renders shared by every session, a new one when not given
+            persistent (bool): Give each session its own persistent figure instead of drawing through the shared
+                               render cache - faster redraws, but every session then holds a canvas
+            areas (dict): Named areas for an area dropdown in every view (e.g. const_chicago_areas), None for none
+            sample (CrashSample): Show every change not in the render cache as a preview from this sample first,
+                                  then the exact render - only without persistent (persistent figures redraw exactly)
+            workers (int): Render threads shared by the sessions
+        """
+        self.df = df if isinstance(df, CrashDataset) else CrashDataset(df)
+        self.cube = cube if cube is not None else CrashCube.from_frame(self.df)
+        self.render_cache = render_cache if render_cache is not None else RenderCache(
+            max_entries=const_server_render_entries)
+        self.persistent = persistent
+        self.areas = areas
+        if sample is not None and persistent == True:
+            warnings.warn('sample previews are not drawn on persistent figures - serving the exact plots only')
+            sample = None
+        self.sample = sample
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='render')
+
+        self._lock = threading.Lock()
+        self.sessions = {}
+        self.opened = 0
+        self.closed = 0
+
+    @classmethod
+    def load(cls, filepath: str = const_default_storage_file, cache_dir: str = const_default_cache_dir,
+             sample_fraction: float = None, **kwargs) -> 'CrashServer':
+        """
+        Loads the dataset and its cube from the columnar caches (building them on a cold start).
+        A missing CSV is downloaded first.
+        Args:
+            filepath (str): The crash CSV
+            cache_dir (str): Directory holding the caches
+            sample_fraction (float): Load (or draw and store) a stratified sample of this fraction for previews,
+                                     None shows no previews
+            kwargs: The rest of CrashServer's arguments
+        Returns:
+            A CrashServer
+        """
+        if os.path.exists(filepath) == False:
+            # nothing to serve yet - fetch the export, a failed download leaves no file to load
+            download = download_chicago_crashdata(filepath)
+            if download['status'] == 'error':
+                raise FileNotFoundError(f"Crash CSV {filepath} is missing and could not be downloaded")
+        df = get_chicago_crash_data(filepath, cache_dir=cache_dir)
+        # the data cache just took the source's fingerprint - the cube and the sample are keyed by the same one
+        fingerprint = source_fingerprint(filepath, cache_dir)
+        cube = load_crash_cube(filepath, df, cache_dir, fingerprint)
+        if sample_fraction is not None:
+            kwargs['sample'] = load_crash_sample(filepath, df, cache_dir, sample_fraction, fingerprint=fingerprint)
+        # the dataset keeps its own reordered copy - the loaded frame is dropped so one copy stays in memory
+        dataset = CrashDataset(df)
+        del df
+        return cls(dataset, cube, **kwargs)
+
+    def session(self, view: str = 'dashboard') -> ServerSession:
+        """
+        Opens a session of a view: new widgets and a scheduler bound to the shared dataset, cube and render cache.
+        Inside a served document the renders are shown through the document's event loop, and the session is
+        closed with the document.
+        Args:
+            view (str): One of const_server_views
+        Returns:
+            A ServerSession
+        """
+        if view not in const_server_views:
+            raise ValueError(f"Unknown view {view}, expected one of {', '.join(const_server_views)}")
+
+        scheduler = RenderScheduler(render_cache=None if self.persistent == True else self.render_cache,
+                                    executor=self.executor, dispatch=_document_dispatch(), sample=self.sample)
+        row, output = const_server_views[view](self.df, self.cube, scheduler=scheduler, background=True,
+                                               persistent=self.persistent, display=False, areas=self.areas)
+        controls = [pane.object for pane in row.objects if isinstance(getattr(pane, 'object', None), widgets.Widget)]
+        session = ServerSession(view, pn.Column(row, output), scheduler, controls)
+
+        with self._lock:
+            self.sessions[id(session)] = session
+            self.opened += 1
+
+        doc = pn.state.curdoc
+        if doc is not None and doc.session_context is not None:
+            doc.on_session_destroyed(lambda context: self.close_session(session))
+        return session
+
+    def close_session(self, session: ServerSession):
+        """
+        Forgets a session and drops its renders not shown yet.
+        """
+        with self._lock:
+            if self.sessions.pop(id(session), None) is None:
+                return
+            self.closed += 1
+        session.scheduler.close()
+
+    def stats(self) -> dict:
+        """
+        Sessions open and ever opened, their renders, the shared render cache and the memory of the process.
+        """
+        with self._lock:
+            sessions = list(self.sessions.values())
+            counts = {'sessions': len(sessions), 'opened': self.opened, 'closed': self.closed}
+
+        renders = {'requested': 0, 'completed': 0, 'dropped': 0, 'failed': 0, 'previews': 0, 'render_seconds': 0.0}
+        for session in sessions:
+            scheduler_stats = session.scheduler.stats()
+            for name in renders:
+                renders[name] += scheduler_stats[name]
+        return {**counts, **renders, 'render_cache': self.render_cache.stats(), 'rss_bytes': process_memory()}
+
+    def apps(self, views: list = None) -> dict:
+        """
+        The url path to app function mapping for pn.serve - each call opens a session and returns its layout.
+        """
+        views = list(const_server_views) if views is None else views
+        return {view: _session_app(self, view) for view in views}
+
+    def serve(self, port: int = const_server_port, views: list = None, show: bool = False, **kwargs):
+        """
+        Serves the views, one url path each, until the process is stopped.
+        Args:
+            port (int): Port to listen on
+            views (list): Names from const_server_views, all of them when not given
+            show (bool): Open a browser
+            kwargs: Passed on to pn.serve (e.g. address, websocket_origin)
+        """
+        pn.extension('ipywidgets')
+        return pn.serve(self.apps(views), port=port, show=show, title='Chicago Traffic Crashes', **kwargs)
+
+
+def _session_app(server: CrashServer, view: str):
+    # a plain function - pn.serve shows a functools.partial as an object instead of calling it
+    def app():
+        return server.session(view).layout
+    return app
+
+
+def _document_dispatch():
+    """
+    Shows a render on the event loop of the document being served, None outside a server.
+    """
+    doc = pn.state.curdoc
+    if doc is None or doc.session_context is None:
+        return None
+    # the one document method bokeh allows from another thread
+    return doc.add_next_tick_callback
+
+
+def process_memory() -> int:
+    """
+    Resident memory of this process in bytes, the peak where the current value is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on linux, bytes on macos
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the crash dashboard and widget views to many sessions')
+    parser.add_argument('--csv', default=const_default_storage_file, help='crash csv, downloaded when missing')
+    parser.add_argument('--cache-dir', default=const_default_cache_dir)
+    parser.add_argument('--port', type=int, default=const_server_port)
+    parser.add_argument('--views', nargs='+', choices=list(const_server_views), default=None)
+    parser.add_argument('--persistent', action='store_true', help='a persistent figure per session')
+    parser.add_argument('--areas', action='store_true', help='an area dropdown of the chicago neighbourhoods')
+    parser.add_argument('--preview', type=float, default=None, metavar='FRACTION',
+                        help='show changes from a stratified sample of this fraction first (without --persistent)')
+    parser.add_argument('--show', action='store_true', help='open a browser')
+    args = parser.parse_args()
+
+    server = CrashServer.load(args.csv, args.cache_dir, persistent=args.persistent,
+                              areas=const_chicago_areas if args.areas == True else None, sample_fraction=args.preview)
+    server.serve(args.port, args.views, args.show)
+
+
+if __name__ == '__main__':
+    main()
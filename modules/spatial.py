@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+# ****************************************************************
+# spatial grid index - the crashes' row positions bucketed by a uniform grid over
+# the Chicago extent, so a bounding box or radius query reads only the cells it
+# touches and checks coordinates only in the cells its edge runs through
+# ****************************************************************
+
+# (south, west, north, east) in degrees - the city limits with a little margin
+const_chicago_extent = (41.64, -87.95, 42.03, -87.52)
+
+# grid cell size in degrees, about 550 m north-south and 415 m east-west in Chicago
+const_spatial_cell_degrees = 0.005
+
+# metres per degree of latitude, and of longitude at the equator
+const_meters_per_degree = 111_320.0
+
+# neighbourhoods for the area widgets - a (south, west, north, east) box or a (latitude, longitude, metres) circle
+const_chicago_areas = {
+    'The Loop': (41.873, -87.643, 41.889, -87.617),
+    'Near North Side': (41.888, -87.648, 41.911, -87.611),
+    'Near West Side': (41.866, -87.686, 41.889, -87.637),
+    'Lincoln Park': (41.910, -87.668, 41.941, -87.630),
+    'Wrigleyville (1 km)': (41.9484, -87.6553, 1000.0),
+    'Hyde Park': (41.787, -87.606, 41.806, -87.577),
+    "O'Hare": (41.955, -87.940, 42.002, -87.870),
+}
+
+
+def resolve_area(area) -> tuple:
+    """
+    An area filter as a tuple of floats.
+    Args:
+        area: A name of const_chicago_areas, a (south, west, north, east) box or a (latitude, longitude, metres) circle
+    Returns:
+        A tuple of 4 (box) or 3 (circle) floats, None when area is None
+    """
+    if area is None:
+        return None
+    if isinstance(area, str):
+        if area not in const_chicago_areas:
+            raise ValueError(f"Unknown area {area}, expected one of {', '.join(const_chicago_areas)}")
+        area = const_chicago_areas[area]
+    if len(area) not in (3, 4):
+        raise ValueError(f"Unknown area {area}, expected (south, west, north, east) or (latitude, longitude, metres)")
+    return tuple(float(value) for value in area)
+
+
+def area_box(area) -> tuple:
+    """
+    The (south, west, north, east) box of an area - a circle's box in degrees at its latitude.
+    """
+    area = resolve_area(area)
+    if len(area) == 4:
+        return area
+    latitude, longitude, meters = area
+    dlat = meters / const_meters_per_degree
+    dlon = meters / (const_meters_per_degree * np.cos(np.radians(latitude)))
+    return latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon
+
+
+def _in_box(latitude: np.ndarray, longitude: np.ndarray, box: tuple) -> np.ndarray:
+    south, west, north, east = box
+    return (latitude >= south) & (latitude <= north) & (longitude >= west) & (longitude <= east)
+
+
+def _in_circle(latitude: np.ndarray, longitude: np.ndarray, circle: tuple) -> np.ndarray:
+    # equirectangular distance at the circle's latitude - well under a metre off at city scale
+    center_latitude, center_longitude, meters = circle
+    dy = (latitude - center_latitude) * const_meters_per_degree
+    dx = (longitude - center_longitude) * const_meters_per_degree * np.cos(np.radians(center_latitude))
+    return dx * dx + dy * dy <= meters * meters
+
+
+def area_mask(latitude: np.ndarray, longitude: np.ndarray, area) -> np.ndarray:
+    """
+    Which coordinates lie in an area, by checking every one - what SpatialIndex.query answers without the scan.
+    Missing coordinates are in no area.
+    Args:
+        latitude (np.ndarray): Crash latitudes
+        longitude (np.ndarray): Crash longitudes
+        area: See resolve_area
+    Returns:
+        A boolean numpy array
+    """
+    area = resolve_area(area)
+    mask = _in_box(latitude, longitude, area_box(area))
+    if len(area) == 3:
+        mask &= _in_circle(latitude, longitude, area)
+    return mask
+
+
+class SpatialIndex:
+    """
+    Row positions of a frame bucketed by a uniform grid over an extent. The positions are sorted by cell, so the
+    cells of one grid row that a box spans are a single slice; crashes outside the extent (or without coordinates)
+    share one overflow bucket that is only read when a box reaches beyond the extent. Cells wholly inside a box are
+    taken without looking at a coordinate, so a query costs the matching rows plus those of the cells along its edge.
+    """
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, extent: tuple = const_chicago_extent,
+                 cell: float = const_spatial_cell_degrees):
+        """
+        Args:
+            latitude (np.ndarray): Latitude of every row, NaN when missing
+            longitude (np.ndarray): Longitude of every row, NaN when missing
+            extent (tuple): (south, west, north, east) covered by the grid
+            cell (float): Cell size in degrees
+        """
+        latitude = np.asarray(latitude, dtype='float64')
+        longitude = np.asarray(longitude, dtype='float64')
+        self.extent = extent
+        self.cell = cell
+        south, west, north, east = extent
+        self.shape = (int(np.ceil((north - south) / cell)), int(np.ceil((east - west) / cell)))
+        nrows, ncols = self.shape
+
+        # the same floor as in _cell_range, so a cell past a box edge is wholly inside it
+        row = np.floor((latitude - south) / cell)
+        col = np.floor((longitude - west) / cell)
+        inside = (row >= 0) & (row < nrows) & (col >= 0) & (col < ncols)
+        codes = np.full(len(latitude), nrows * ncols, dtype='int64')
+        codes[inside] = row[inside].astype('int64') * ncols + col[inside].astype('int64')
+
+        # positions by cell (by position within a cell), the overflow bucket last
+        dtype = 'int32' if len(latitude) < 2 ** 31 else 'int64'
+        order = np.argsort(codes, kind='stable')
+        self.positions = order.astype(dtype)
+        self.latitude = latitude[order]
+        self.longitude = longitude[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=nrows * ncols + 1))])
+        self.outside = int(len(latitude) - inside.sum())
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **kwargs) -> 'SpatialIndex':
+        """
+        Indexes the LATITUDE and LONGITUDE columns of a frame - query results are positions into that frame.
+        """
+        return cls(df['LATITUDE'].to_numpy(dtype='float64', na_value=np.nan),
+                   df['LONGITUDE'].to_numpy(dtype='float64', na_value=np.nan), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _cell_range(self, low: float, high: float, origin: float, cells: int) -> tuple:
+        """
+        The first and last cell a [low, high] interval touches along one axis, clipped to the grid.
+        """
+        first = int(np.clip(np.floor((low - origin) / self.cell), 0, cells - 1))
+        last = int(np.clip(np.floor((high - origin) / self.cell), 0, cells - 1))
+        return first, last
+
+    def _slices(self, box: tuple) -> list:
+        """
+        The [start, end) runs of the sorted positions a box reads, each with whether its coordinates need checking.
+        """
+        south, west, north, east = box
+        s0, w0, n0, e0 = self.extent
+        nrows, ncols = self.shape
+        slices = []
+
+        # a box off the grid clips to its border cells, whose rows then all fail the check
+        if south <= north and west <= east:
+            i0, i1 = self._cell_range(south, north, s0, nrows)
+            j0, j1 = self._cell_range(west, east, w0, ncols)
+            for i in range(i0, i1 + 1):
+                base = i * ncols
+                if i == i0 or i == i1:
+                    # a grid row the box's north or south edge runs through - every cell is checked
+                    slices.append((self.offsets[base + j0], self.offsets[base + j1 + 1], True))
+                    continue
+                slices.append((self.offsets[base + j0], self.offsets[base + j0 + 1], True))
+                if j1 > j0:
+                    # cells between the west and east edge cells lie wholly inside the box
+                    slices.append((self.offsets[base + j0 + 1], self.offsets[base + j1], False))
+                    slices.append((self.offsets[base + j1], self.offsets[base + j1 + 1], True))
+
+        # within a cell of the extent's border, rounding may have put a crash in the box into the overflow
+        if self.outside > 0 and (south < s0 + self.cell or north > n0 - self.cell or west < w0 + self.cell or
+                                 east > e0 - self.cell):
+            slices.append((self.offsets[nrows * ncols], self.offsets[nrows * ncols + 1], True))
+        return [(int(start), int(end), edge) for start, end, edge in slices if end > start]
+
+    def _select(self, box: tuple, circle: tuple = None) -> np.ndarray:
+        """
+        The rows in a box (and in a circle within it), sorted by position.
+        """
+        parts = []
+        for start, end, edge in self._slices(box):
+            latitude, longitude = self.latitude[start:end], self.longitude[start:end]
+            keep = _in_box(latitude, longitude, box) if edge == True else None
+            if circle is not None:
+                inside = _in_circle(latitude, longitude, circle)
+                keep = inside if keep is None else keep & inside
+            positions = self.positions[start:end]
+            parts.append(positions if keep is None else positions[keep])
+
+        if not parts:
+            return np.arange(0, dtype=self.positions.dtype)
+        return np.sort(np.concatenate(parts))
+
+    def bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """
+        The rows with south <= latitude <= north and west <= longitude <= east.
+        Returns:
+            Sorted numpy array of row positions
+        """
+        return self._select((south, west, north, east))
+
+    def radius(self, latitude: float, longitude: float, meters: float) -> np.ndarray:
+        """
+        The rows within meters of a point - only the rows of the box around the circle are measured.
+        Returns:
+            Sorted numpy array of row positions
+        """
+        circle = (latitude, longitude, meters)
+        return self._select(area_box(circle), circle)
+
+    def query(self, area) -> np.ndarray:
+        """
+        The rows of an area, see resolve_area.
+        Returns:
+            Sorted numpy array of row positions
+        """
+        area = resolve_area(area)
+        if len(area) == 4:
+            return self.bbox(*area)
+        return self.radius(*area)
@@ -0,0 +1,194 @@
+import os
+
+# data access and manipulation libraries
+import pandas as pd
+import numpy as np
+
+from .datacache import write_frame_part, read_frame_parts
+from .dataset import CrashDataset
+from .profiling import profiled
+
+# ****************************************************************
+# mergeable distribution summaries - per year count, power sums up to the 4th and a
+# fixed bin histogram of a column, enough for the mean, std, skew, kurtosis and histogram
+# of any year without going back to the rows, and added together exactly as data arrives
+# ****************************************************************
+
+# the value is raised to 1..const_summary_order in the power sums
+const_summary_order = 4
+
+# one bin per hour of the day, the last edge closes the 23 bin like np.histogram
+const_hour_edges = np.arange(25)
+
+
+class DistributionSummary:
+    """
+    Sufficient statistics of one numeric column per group (a year by default): the count, the power sums
+    S1..S4 and the counts of a fixed bin histogram. Summaries over disjoint rows add up to the summary of their
+    union, so one built from a sync delta or an etl chunk merges into the running one without rescanning.
+    Whole number columns (CRASH_HOUR) keep the sums exact, the moments are derived from them on request.
+    """
+
+    def __init__(self, sums: pd.DataFrame, histogram: pd.DataFrame, column: str = 'CRASH_HOUR',
+                 by: str = 'CRASH_YEAR', edges=const_hour_edges):
+        """
+        Args:
+            sums (pd.DataFrame): Per group n and s1..s4, indexed by the group
+            histogram (pd.DataFrame): Per group count of each bin, indexed by the group, one column per bin
+            column (str): The summarized column
+            by (str): The grouping column
+            edges (np.ndarray): The histogram bin edges
+        """
+        self.sums = sums
+        self.histogram = histogram
+        self.column = column
+        self.by = by
+        self.edges = np.asarray(edges)
+
+    @classmethod
+    @profiled('aggregate', 'DistributionSummary.from_frame')
+    def from_frame(cls, df: pd.DataFrame, column: str = 'CRASH_HOUR', by: str = 'CRASH_YEAR',
+                   edges=const_hour_edges) -> 'DistributionSummary':
+        """
+        Builds the summary in one grouped pass - the rows are coded by group once and every sum and bin is a
+        bincount over those codes.
+        Args:
+            df (pd.DataFrame or CrashDataset): The transformed crash dataframe
+            column (str): The numeric column to summarize
+            by (str): The column to group by
+            edges (np.ndarray): Histogram bin edges, values outside them are counted in the sums only
+        Returns:
+            A DistributionSummary
+        """
+        if isinstance(df, CrashDataset):
+            df = df.frame
+
+        edges = np.asarray(edges)
+        codes, groups = pd.factorize(df[by], sort=True)
+        values = df[column].to_numpy(dtype='float64')
+        size = len(groups)
+
+        # rows without a group (a crash date that did not parse) are not summarized
+        if (codes < 0).any():
+            values, codes = values[codes >= 0], codes[codes >= 0]
+
+        sums = {'n': np.bincount(codes, minlength=size).astype('float64')}
+        power = np.ones_like(values)
+        for order in range(1, const_summary_order + 1):
+            power *= values
+            sums[f's{order}'] = np.bincount(codes, weights=power, minlength=size)
+
+        # np.histogram bins - half open except the last, which also takes the right edge
+        bins = len(edges) - 1
+        binned = np.searchsorted(edges, values, side='right') - 1
+        binned[values == edges[-1]] = bins - 1
+        inside = (binned >= 0) & (binned < bins)
+        histogram = np.bincount(codes[inside] * bins + binned[inside], minlength=size * bins).reshape(size, bins)
+
+        index = pd.Index(np.asarray(groups), name=by)
+        return cls(pd.DataFrame(sums, index=index), pd.DataFrame(histogram, index=index, columns=edges[:-1]),
+                   column, by, edges)
+
+    def groups(self) -> list:
+        """
+        The groups (years) present, ascending.
+        """
+        return sorted(self.sums.index[self.sums['n'] > 0].tolist())
+
+    def merge(self, other: 'DistributionSummary', sign: int = 1) -> 'DistributionSummary':
+        """
+        Adds (or with sign=-1 removes) the summary of other rows, e.g. a sync delta or the next etl chunk.
+        Args:
+            other (DistributionSummary): Summary over the rows to add or remove, with the same column and edges
+            sign (int): 1 to add, -1 to subtract
+        Returns:
+            A new DistributionSummary, groups left with nothing in them are dropped
+        """
+        if other.column != self.column or other.by != self.by or not np.array_equal(other.edges, self.edges):
+            raise ValueError(f"Cannot merge a summary of {other.column} by {other.by} into one of "
+                             f"{self.column} by {self.by} with other bins")
+
+        sums = self.sums.add(sign * other.sums, fill_value=0)
+        histogram = self.histogram.add(sign * other.histogram, fill_value=0).astype('int64')
+        # a change summary (sync delta minus the rows it replaced) can net to no rows and still move the sums
+        keep = (sums != 0).any(axis=1) | (histogram != 0).any(axis=1)
+        return DistributionSummary(sums[keep].sort_index(), histogram[keep].sort_index(), self.column, self.by,
+                                   self.edges)
+
+    def _totals(self, group=None) -> tuple:
+        """
+        The n, s1..s4 of one group, or of every group together.
+        """
+        if group is None:
+            return tuple(self.sums.sum().to_numpy())
+        if group not in self.sums.index:
+            return (0.0,) * (const_summary_order + 1)
+        return tuple(self.sums.loc[group].to_numpy())
+
+    def moments(self, group=None) -> dict:
+        """
+        Mean, population std, variance, skewness and Fisher kurtosis of a group from its power sums - the same
+        numbers np.mean, np.std, scipy.stats.skew and scipy.stats.kurtosis give on the rows.
+        Args:
+            group: The group (year), None for every group together
+        Returns:
+            A dictionary with n, mean, std, variance, skewness and kurtosis (NaN without rows)
+        """
+        n, s1, s2, s3, s4 = self._totals(group)
+        if n <= 0:
+            return {'n': 0, 'mean': np.nan, 'std': np.nan, 'variance': np.nan, 'skewness': np.nan,
+                    'kurtosis': np.nan}
+
+        # raw moments to central moments about the mean
+        mean = s1 / n
+        r2, r3, r4 = s2 / n, s3 / n, s4 / n
+        m2 = r2 - mean ** 2
+        m3 = r3 - 3 * mean * r2 + 2 * mean ** 3
+        m4 = r4 - 4 * mean * r3 + 6 * mean ** 2 * r2 - 3 * mean ** 4
+        return {'n': int(n), 'mean': float(mean), 'std': float(np.sqrt(m2)), 'variance': float(m2),
+                'skewness': float(m3 / m2 ** 1.5), 'kurtosis': float(m4 / m2 ** 2 - 3.0)}
+
+    def bin_counts(self, group=None) -> tuple:
+        """
+        The histogram of a group as the left edges and counts of its non empty bins.
+        Args:
+            group: The group (year), None for every group together
+        Returns:
+            A tuple of (left edges, counts) numpy arrays
+        """
+        if group is None:
+            counts = self.histogram.sum().to_numpy()
+        elif group in self.histogram.index:
+            counts = self.histogram.loc[group].to_numpy()
+        else:
+            counts = np.zeros(len(self.edges) - 1, dtype='int64')
+        filled = counts > 0
+        return self.edges[:-1][filled], counts[filled].astype('int64')
+
+    def save(self, path: str):
+        """
+        Writes the sums and the histogram as .npy columns under path.
+        Args:
+            path (str): Directory receiving the summary
+        """
+        for name, table in (('sums', self.sums), ('histogram', self.histogram)):
+            tabledir = os.path.join(path, name)
+            os.makedirs(tabledir, exist_ok=True)
+            table = table.copy()
+            table.columns = [str(column) for column in table.columns]
+            write_frame_part(table.reset_index(), tabledir, 0)
+
+    @classmethod
+    def load(cls, path: str, column: str = 'CRASH_HOUR', by: str = 'CRASH_YEAR',
+             edges=const_hour_edges) -> 'DistributionSummary':
+        """
+        Reads a summary written by save.
+        Args:
+            path (str): Directory holding the summary
+        Returns:
+            A DistributionSummary
+        """
+        sums = read_frame_parts(os.path.join(path, 'sums')).set_index(by)
+        histogram = read_frame_parts(os.path.join(path, 'histogram')).set_index(by)
+        histogram.columns = np.asarray(edges)[:-1]
+        return cls(sums, histogram, column, by, edges)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# run from the repo root or from tests/ - either way modules/ and benchmarks/ should be importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
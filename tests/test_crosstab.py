@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules.crosstab import CrosstabCube, code_crosstab
+from modules.etl import get_chicago_crash_data
+
+
+# ****************************************************************
+# the code based tables are the frames pd.crosstab gives over the same crashes
+# ****************************************************************
+
+@pytest.fixture(scope='module')
+def df(tmp_path_factory):
+    return get_chicago_crash_data(write_crash_csv(3_000, str(tmp_path_factory.mktemp('data') / 'crashes.csv')),
+                                  use_cache=False)
+
+
+def _expected(df, row: str, column: str) -> pd.DataFrame:
+    return pd.crosstab(df[row], df[column]).astype('int64')
+
+
+@pytest.mark.parametrize('row, column', [('WEATHER_CONDITION', 'ROADWAY_SURFACE_COND'),
+                                         ('LIGHTING_CONDITION', 'CRASH_HOUR')])
+def test_code_crosstab_matches_pandas(df, row, column):
+    pd.testing.assert_frame_equal(code_crosstab(df, row, column), _expected(df, row, column))
+
+
+def test_code_crosstab_of_a_selection(df):
+    # a selection missing some categories, and text columns with missing values
+    selection = df[df['INJURIES_TOTAL'] >= 2].astype({'WEATHER_CONDITION': 'object', 'ROADWAY_SURFACE_COND': 'object'})
+    selection.loc[selection.index[::5], 'WEATHER_CONDITION'] = np.nan
+
+    # the labels are the same, newer pandas only stores text ones as its string dtype
+    pd.testing.assert_frame_equal(code_crosstab(selection, 'WEATHER_CONDITION', 'ROADWAY_SURFACE_COND'),
+                                  _expected(selection, 'WEATHER_CONDITION', 'ROADWAY_SURFACE_COND'),
+                                  check_index_type=False, check_column_type=False)
+
+
+def test_cube_year_matches_pandas(df):
+    cube = CrosstabCube.from_frame(df)
+
+    for year, crashes in df.groupby('CRASH_YEAR'):
+        pd.testing.assert_frame_equal(cube.crosstab(year),
+                                      _expected(crashes, 'WEATHER_CONDITION', 'ROADWAY_SURFACE_COND'))
+    pd.testing.assert_frame_equal(cube.crosstab(None), _expected(df, 'WEATHER_CONDITION', 'ROADWAY_SURFACE_COND'))
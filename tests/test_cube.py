@@ -0,0 +1,56 @@
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules.etl import get_chicago_crash_data
+from modules.datacache import cache_variant
+from modules.cube import CrashCube, load_crash_cube
+
+
+# ****************************************************************
+# the cube cache keyed by the projection of its frame, and the tables a projected cube lacks
+# ****************************************************************
+
+const_projection = ['CRASH_DATE', 'INJURIES_TOTAL', 'LIGHTING_CONDITION']
+
+
+@pytest.fixture
+def csvpath(tmp_path):
+    return write_crash_csv(1_000, str(tmp_path / 'crashes.csv'))
+
+
+def test_projected_cube_is_kept_apart(csvpath, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    variant = cache_variant(const_projection)
+    projected = get_chicago_crash_data(csvpath, cache_dir=cache_dir, columns=const_projection)
+    full = get_chicago_crash_data(csvpath, cache_dir=cache_dir)
+
+    assert load_crash_cube(csvpath, projected, cache_dir, variant=variant).has('year_weather_road') == False
+    # the full frame's cube is not served the projected one, and each is found again under its own variant
+    assert load_crash_cube(csvpath, full, cache_dir).has('year_weather_road') == True
+    assert load_crash_cube(csvpath, None, cache_dir, variant=variant).has('year_weather_road') == False
+    assert load_crash_cube(csvpath, None, cache_dir).has('year_weather_road') == True
+
+
+def test_missing_tables(csvpath):
+    df = get_chicago_crash_data(csvpath, use_cache=False)
+    full = CrashCube.from_frame(df)
+    cube = CrashCube.from_frame(df.drop(columns=['CRASH_HOUR']))
+
+    # the years come from another table, every one of them counts by year first
+    assert cube.years() == full.years()
+    assert cube.year_counts().to_dict() == full.year_counts().to_dict()
+    with pytest.raises(ValueError, match='no year_hour table .* CRASH_YEAR or CRASH_HOUR'):
+        cube.hour_counts(2020)
+    with pytest.raises(ValueError, match='no year_hour table'):
+        cube.hours()
+    with pytest.raises(ValueError, match='no crash hour summary'):
+        cube.hour_moments(2020)
+
+
+def test_hours_without_year_hour(csvpath):
+    df = get_chicago_crash_data(csvpath, use_cache=False)
+    full = CrashCube.from_frame(df)
+    cube = CrashCube(dict(full.counts), full.summary)
+    del cube.counts['year_hour']
+
+    assert cube.hours() == full.hours()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules.cube import CrashCube
+from modules.etl import get_chicago_crash_data
+from modules.reusable import prepare_dashboard
+
+
+# ****************************************************************
+# the dashboard panels computed on threads are the ones computed one after another
+# ****************************************************************
+
+const_panels = ['year_counts', 'injury_hours', 'hour_distribution', 'condition_crosstab']
+
+
+@pytest.fixture(scope='module')
+def df(tmp_path_factory):
+    return get_chicago_crash_data(write_crash_csv(5_000, str(tmp_path_factory.mktemp('data') / 'crashes.csv')),
+                                  use_cache=False)
+
+
+def _assert_same(ours, theirs, name: str):
+    if isinstance(ours, dict):
+        assert ours.keys() == theirs.keys(), name
+        for key in ours:
+            _assert_same(ours[key], theirs[key], f'{name}.{key}')
+    elif isinstance(ours, pd.Series):
+        pd.testing.assert_series_equal(ours, theirs, obj=name)
+    elif isinstance(ours, pd.DataFrame):
+        pd.testing.assert_frame_equal(ours, theirs, obj=name)
+    elif isinstance(ours, (np.ndarray, list, tuple)):
+        assert np.array_equal(np.asarray(ours), np.asarray(theirs), equal_nan=True), name
+    elif isinstance(ours, float):
+        assert ours == theirs or (np.isnan(ours) and np.isnan(theirs)), name
+    else:
+        assert ours == theirs, name
+
+
+def _prepare(df, workers: int, **kwargs) -> tuple:
+    # the jitter of the scatter points is random, both runs draw the same one
+    np.random.seed(521)
+    timings = {}
+    return prepare_dashboard(df, 2021, 2, workers=workers, timings=timings, **kwargs), timings
+
+
+@pytest.mark.parametrize('cube, area', [(False, None), (True, None), (True, (41.80, -87.75, 41.95, -87.60))],
+                         ids=['rows', 'cube', 'area'])
+def test_threaded_panels_match_serial(df, cube, area):
+    kwargs = {'cube': CrashCube.from_frame(df) if cube == True else None, 'area': area}
+
+    threaded, _ = _prepare(df, 4, **kwargs)
+    serial, _ = _prepare(df, 1, **kwargs)
+
+    assert sorted(threaded) == sorted(const_panels)
+    for name in const_panels:
+        _assert_same(threaded[name], serial[name], name)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_timings_cover_every_panel(df, workers):
+    _, timings = _prepare(df, workers)
+
+    assert sorted(timings) == sorted(const_panels + ['prepare'])
+    assert all(seconds >= 0 for seconds in timings.values())
+    # the panels run inside the preparation, at most all of it each
+    assert max(timings[name] for name in const_panels) <= timings['prepare']
@@ -0,0 +1,86 @@
+import os
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules import datacache
+from modules.datacache import source_fingerprint
+from modules.dataset import CrashDataset, dataset_version
+from modules.etl import get_chicago_crash_data
+
+
+# ****************************************************************
+# source_fingerprint - the content hash is only taken again when the size or the
+# modification time of the source changed
+# ****************************************************************
+
+def _count_hashes(monkeypatch) -> list:
+    calls = []
+    blake2b = datacache.hashlib.blake2b
+
+    def counted(*args, **kwargs):
+        calls.append(1)
+        return blake2b(*args, **kwargs)
+    monkeypatch.setattr(datacache.hashlib, 'blake2b', counted)
+    return calls
+
+
+def test_fingerprint_hashes_once(tmp_path, monkeypatch):
+    source = tmp_path / 'crashes.csv'
+    source.write_bytes(b'CRASH_RECORD_ID\n1\n2\n')
+    calls = _count_hashes(monkeypatch)
+
+    first = source_fingerprint(str(source), str(tmp_path / 'cache'))
+    assert source_fingerprint(str(source), str(tmp_path / 'cache')) == first
+    # a new process only has the fingerprint remembered next to the caches
+    datacache._fingerprints.clear()
+    assert source_fingerprint(str(source), str(tmp_path / 'cache')) == first
+    assert len(calls) == 1
+
+
+def test_fingerprint_follows_changes(tmp_path, monkeypatch):
+    source = tmp_path / 'crashes.csv'
+    source.write_bytes(b'CRASH_RECORD_ID\n1\n2\n')
+    first = source_fingerprint(str(source), str(tmp_path / 'cache'))
+    calls = _count_hashes(monkeypatch)
+
+    source.write_bytes(b'CRASH_RECORD_ID\n1\n3\n')
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, first['mtime_ns'] + 1_000_000))
+    second = source_fingerprint(str(source), str(tmp_path / 'cache'))
+
+    assert len(calls) == 1
+    assert second['hash'] != first['hash']
+
+
+# ****************************************************************
+# the version of a loaded frame is its source fingerprint - the rows are only hashed without one
+# ****************************************************************
+
+def test_loaded_frame_version_skips_hashing(tmp_path, monkeypatch):
+    csvpath = write_crash_csv(500, str(tmp_path / 'crashes.csv'))
+    cache_dir = str(tmp_path / 'cache')
+    cold = get_chicago_crash_data(csvpath, cache_dir=cache_dir)
+    warm = get_chicago_crash_data(csvpath, cache_dir=cache_dir)
+
+    hashed = pd.util.hash_pandas_object
+    monkeypatch.setattr(pd.util, 'hash_pandas_object', lambda *args, **kwargs: pytest.fail('hashed the rows'))
+    assert dataset_version(cold) == dataset_version(warm) == dataset_version(warm.copy())
+    assert CrashDataset(warm).version == dataset_version(warm)
+    # a projection is other content
+    assert dataset_version(warm[['CRASH_YEAR', 'INJURIES_TOTAL']]) != dataset_version(warm)
+
+    # a filtered frame inherits the attrs but not the version
+    monkeypatch.setattr(pd.util, 'hash_pandas_object', hashed)
+    filtered = warm[warm['CRASH_YEAR'] == 2020]
+    assert dataset_version(filtered) != dataset_version(warm)
+
+
+def test_reloaded_source_has_new_version(tmp_path):
+    csvpath = write_crash_csv(500, str(tmp_path / 'crashes.csv'))
+    cache_dir = str(tmp_path / 'cache')
+    before = dataset_version(get_chicago_crash_data(csvpath, cache_dir=cache_dir))
+
+    write_crash_csv(600, csvpath, force=True)
+    assert dataset_version(get_chicago_crash_data(csvpath, cache_dir=cache_dir)) != before
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules.dataset import CrashDataset
+from modules.etl import get_chicago_crash_data
+
+
+# ****************************************************************
+# a selection sliced from the dataset holds the rows of the plain pandas filter, without a copy
+# ****************************************************************
+
+@pytest.fixture(scope='module')
+def df(tmp_path_factory):
+    return get_chicago_crash_data(write_crash_csv(5_000, str(tmp_path_factory.mktemp('data') / 'crashes.csv')),
+                                  use_cache=False)
+
+
+# a year without crashes, and injury levels below, inside and above the data
+@pytest.mark.parametrize('year', [2016, 2021, 2025, 1999])
+@pytest.mark.parametrize('minimalinjury', [None, 0, 1, 3, 100])
+def test_select_matches_pandas_filter(df, year, minimalinjury):
+    dataset = CrashDataset(df)
+    mask = df['CRASH_YEAR'] == year
+    if minimalinjury is not None:
+        mask &= df['INJURIES_TOTAL'] >= minimalinjury
+    expected = df[mask]
+
+    selected = dataset.select(year=year, minimalinjury=minimalinjury)
+    start, end = dataset.bounds(year, minimalinjury)
+
+    assert len(selected) == end - start == len(expected)
+    # the dataset reorders the rows by injuries within a year - the original positions are the same rows
+    assert np.array_equal(np.sort(dataset.order[start:end]), np.flatnonzero(mask.to_numpy()))
+    pd.testing.assert_frame_equal(selected.reset_index(drop=True),
+                                  df.take(dataset.order[start:end]).reset_index(drop=True))
+
+
+def test_select_is_a_view(df):
+    dataset = CrashDataset(df)
+
+    selected = dataset.select(year=2021, minimalinjury=1)
+
+    assert len(selected) > 0
+    assert np.shares_memory(selected['INJURIES_TOTAL'].to_numpy(), dataset.frame['INJURIES_TOTAL'].to_numpy())
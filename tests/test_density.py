@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from matplotlib import cbook
+from scipy.stats import gaussian_kde
+from seaborn._statistics import KDE
+
+from modules.density import counts_kde, distinct_counts, fft_kde, violin_stats
+
+
+# ****************************************************************
+# the violins drawn from counts describe the same data seaborn and matplotlib see when every crash is handed over
+# ****************************************************************
+
+def _injuries() -> np.ndarray:
+    # heavily skewed small whole numbers, like INJURIES_TOTAL
+    return np.random.default_rng(0).geometric(0.6, 5_000) - 1
+
+
+def test_violin_box_matches_boxplot_stats():
+    values = _injuries()
+    box = cbook.boxplot_stats(values.astype('float64'))[0]
+
+    violin = violin_stats(*distinct_counts(values))
+
+    for ours, theirs in [('q1', 'q1'), ('median', 'med'), ('q3', 'q3'), ('whislo', 'whislo'), ('whishi', 'whishi')]:
+        assert np.isclose(violin[ours], box[theirs]), ours
+    assert violin['n'] == len(values)
+
+
+def test_violin_curve_matches_seaborn_kde():
+    values = np.log(_injuries() + 1.0)
+    density, support = KDE(cut=2, gridsize=100)(values)
+
+    distinct, counts = distinct_counts(values)
+    violin = violin_stats(distinct, counts, cut=2, gridsize=100)
+
+    assert np.allclose(violin['support'], support)
+    assert np.allclose(violin['density'], density)
+
+
+def test_violin_without_spread_has_no_curve():
+    violin = violin_stats(*distinct_counts(np.full(10, 3)))
+
+    assert violin['density'] is None
+    assert violin['median'] == violin['whislo'] == violin['whishi'] == 3.0
+
+
+# ****************************************************************
+# the kernel densities match scipy's gaussian_kde over the expanded data
+# ****************************************************************
+
+@pytest.mark.parametrize('bw_method', ['scott', 'silverman', 0.3])
+def test_counts_kde_matches_gaussian_kde(bw_method):
+    values = _injuries()
+    points = np.linspace(-2, 12, 200)
+
+    distinct, counts = distinct_counts(values)
+
+    assert np.allclose(counts_kde(distinct, counts, points, bw_method),
+                       gaussian_kde(values.astype('float64'), bw_method)(points))
+
+
+@pytest.mark.parametrize('bw_method', ['scott', 'silverman', 0.3])
+def test_fft_kde_matches_gaussian_kde(bw_method):
+    # a continuous column, like the crash latitudes
+    values = np.random.default_rng(1).normal(41.85, 0.08, 20_000)
+    points = np.linspace(41.4, 42.3, 300)
+
+    expected = gaussian_kde(values, bw_method)(points)
+
+    assert np.allclose(fft_kde(values, points, bw_method=bw_method), expected, rtol=0, atol=1e-3 * expected.max())
+
+
+def test_weighted_fft_kde_matches_expanded_data():
+    values = _injuries()
+    points = np.linspace(-2, 12, 200)
+
+    distinct, counts = distinct_counts(values)
+    expected = gaussian_kde(values.astype('float64'))(points)
+
+    assert np.allclose(fft_kde(distinct, points, weights=counts), expected, rtol=0, atol=1e-3 * expected.max())
@@ -0,0 +1,181 @@
+import os
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules.etl import download_chicago_crashdata
+from modules.profiling import enable_profiling, disable_profiling
+
+
+# ****************************************************************
+# download_chicago_crashdata against a local stand-in of the export server - full
+# transfers, resumed ranges, conditional requests and a range past the end
+# ****************************************************************
+
+const_body = b''.join(f'{i},CRASH {i}\n'.encode() for i in range(5000))
+const_etag = '"crashes-v1"'
+const_last_modified = 'Wed, 19 Mar 2025 12:00:00 GMT'
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """
+    Serves const_body with an ETag and Last-Modified, honouring Range, If-Range and If-None-Match like the city's
+    export does. Every request's headers are kept on the server for the tests to look at.
+    """
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        body = self.server.body
+
+        if self.server.refuse == True:
+            self._reply(416, extra={'Content-Range': f'bytes */{len(body)}'})
+            return
+        if self.headers.get('If-None-Match') == self.server.etag:
+            self._reply(304)
+            return
+
+        start = 0
+        ranged = self.headers.get('Range')
+        if ranged is not None and self.headers.get('If-Range', self.server.etag) in (self.server.etag,
+                                                                                     const_last_modified):
+            start = int(ranged.split('=')[1].split('-')[0])
+            if start >= len(body):
+                self._reply(416, extra={'Content-Range': f'bytes */{len(body)}'})
+                return
+            self._reply(206, body[start:], {'Content-Range': f'bytes {start}-{len(body) - 1}/{len(body)}'})
+            return
+        self._reply(200, body)
+
+    def _reply(self, status: int, body: bytes = b'', extra: dict = None):
+        self.send_response(status)
+        self.send_header('ETag', self.server.etag)
+        self.send_header('Last-Modified', const_last_modified)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def export_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ExportHandler)
+    server.body = const_body
+    server.etag = const_etag
+    server.requests = []
+    server.refuse = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/rows.csv'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _interrupt(storein: str, server, keep: int):
+    # a first download cut off after keep bytes - its .part file and the metadata marking it incomplete
+    download_chicago_crashdata(storein, server.url)
+    os.rename(storein, storein + '.part')
+    with open(storein + '.part', 'r+b') as f:
+        f.truncate(keep)
+    meta = _read(storein + '.meta.json').replace(b'"complete": true', b'"complete": false')
+    with open(storein + '.meta.json', 'wb') as f:
+        f.write(meta)
+    server.requests.clear()
+
+
+def test_full_download(tmp_path, export_server):
+    storein = str(tmp_path / 'crashes.csv')
+    stats = download_chicago_crashdata(storein, export_server.url, chunk_size=1024)
+
+    assert stats['status'] == 'downloaded'
+    assert stats['bytes'] == len(const_body)
+    assert _read(storein) == const_body
+    assert not os.path.exists(storein + '.part')
+    assert 'Range' not in export_server.requests[0]
+
+
+def test_memory_measured_only_while_profiling(tmp_path, export_server, monkeypatch):
+    monkeypatch.setattr(tracemalloc, 'start', lambda *args: pytest.fail('tracemalloc started without profiling'))
+    stats = download_chicago_crashdata(str(tmp_path / 'plain.csv'), export_server.url, chunk_size=1024)
+    assert stats['peak_memory_bytes'] == 0
+    monkeypatch.undo()
+
+    enable_profiling()
+    try:
+        stats = download_chicago_crashdata(str(tmp_path / 'profiled.csv'), export_server.url, chunk_size=1024)
+    finally:
+        disable_profiling()
+    assert stats['peak_memory_bytes'] > 0
+
+
+def test_resume_from_partial_file(tmp_path, export_server):
+    storein = str(tmp_path / 'crashes.csv')
+    _interrupt(storein, export_server, 1000)
+
+    stats = download_chicago_crashdata(storein, export_server.url)
+
+    assert stats['status'] == 'resumed'
+    assert stats['bytes'] == len(const_body) - 1000
+    assert _read(storein) == const_body
+    assert export_server.requests[0]['Range'] == 'bytes=1000-'
+    assert export_server.requests[0]['If-Range'] == const_etag
+
+
+def test_resume_after_change_starts_over(tmp_path, export_server):
+    storein = str(tmp_path / 'crashes.csv')
+    _interrupt(storein, export_server, 1000)
+    # the export changed since the partial file was written - If-Range gets the whole new body
+    export_server.etag = '"crashes-v2"'
+
+    stats = download_chicago_crashdata(storein, export_server.url)
+
+    assert stats['status'] == 'downloaded'
+    assert _read(storein) == const_body
+
+
+def test_not_modified(tmp_path, export_server):
+    storein = str(tmp_path / 'crashes.csv')
+    download_chicago_crashdata(storein, export_server.url)
+    export_server.requests.clear()
+
+    stats = download_chicago_crashdata(storein, export_server.url)
+
+    assert stats['status'] == 'not_modified'
+    assert stats['bytes'] == 0
+    assert export_server.requests[0]['If-None-Match'] == const_etag
+    assert export_server.requests[0]['If-Modified-Since'] == const_last_modified
+    assert _read(storein) == const_body
+
+
+def test_range_past_end_restarts_once(tmp_path, export_server):
+    storein = str(tmp_path / 'crashes.csv')
+    _interrupt(storein, export_server, len(const_body))
+
+    stats = download_chicago_crashdata(storein, export_server.url)
+
+    assert stats['status'] == 'downloaded'
+    assert _read(storein) == const_body
+    assert [request.get('Range') for request in export_server.requests] == [f'bytes={len(const_body)}-', None]
+
+
+def test_range_past_end_twice_gives_up(tmp_path, export_server):
+    storein = str(tmp_path / 'crashes.csv')
+    _interrupt(storein, export_server, len(const_body))
+    # a server answering 416 to everything - one restart, then an error instead of asking forever
+    export_server.refuse = True
+
+    stats = download_chicago_crashdata(storein, export_server.url)
+
+    assert stats['status'] == 'error'
+    assert len(export_server.requests) == 2
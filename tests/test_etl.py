@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal, assert_series_equal
+
+from benchmarks.synthetic import write_crash_csv, make_crash_frame
+from modules import etl
+from modules.etl import etl_crash_data_chunked, get_chicago_crash_data, const_plot_columns, \
+    const_default_chunk_aggregates, csv_record_ranges, read_crash_csv, const_crash_date_format, etl_crash_data, \
+    parse_crash_dates, const_category_columns, const_injury_columns
+from modules.datacache import read_frame_parts
+
+
+# ****************************************************************
+# the chunked etl against the in memory load of the same synthetic export
+# ****************************************************************
+
+def test_chunked_matches_in_memory(tmp_path):
+    csvpath = write_crash_csv(5_000, str(tmp_path / 'crashes.csv'))
+    outdir = str(tmp_path / 'parts')
+
+    result = etl_crash_data_chunked(csvpath, chunksize=700, outdir=outdir)
+
+    assert result['chunks'] == 8
+    assert result['rows'] == 5_000
+    assert_frame_equal(read_frame_parts(outdir), get_chicago_crash_data(csvpath, use_cache=False))
+
+
+def test_chunked_projection_matches_in_memory(tmp_path):
+    csvpath = write_crash_csv(2_000, str(tmp_path / 'crashes.csv'))
+    outdir = str(tmp_path / 'parts')
+
+    etl_crash_data_chunked(csvpath, chunksize=500, outdir=outdir, columns=const_plot_columns)
+
+    assert_frame_equal(read_frame_parts(outdir),
+                       get_chicago_crash_data(csvpath, use_cache=False, columns=const_plot_columns))
+
+
+def test_chunked_aggregates_match_in_memory(tmp_path):
+    csvpath = write_crash_csv(3_000, str(tmp_path / 'crashes.csv'))
+    df = get_chicago_crash_data(csvpath, use_cache=False)
+
+    result = etl_crash_data_chunked(csvpath, chunksize=400)
+
+    aggregates = result['aggregates']
+    expected = {name: aggregate(df) for name, aggregate in const_default_chunk_aggregates.items()}
+    assert result['rows'] == len(df)
+    assert_series_equal(aggregates['crashes_by_year'], expected['crashes_by_year'], check_dtype=False)
+    assert_series_equal(aggregates['crashes_by_year_hour'], expected['crashes_by_year_hour'], check_dtype=False)
+    for year in expected['hour_summary'].groups():
+        hours, counts = aggregates['hour_summary'].bin_counts(year)
+        expected_hours, expected_counts = expected['hour_summary'].bin_counts(year)
+        assert np.array_equal(hours, expected_hours) and np.array_equal(counts, expected_counts)
+        moments = aggregates['hour_summary'].moments(year)
+        for name, value in expected['hour_summary'].moments(year).items():
+            assert np.isclose(moments[name], value), (year, name)
+
+
+# ****************************************************************
+# the parallel byte range parse against a single read of a file with quoted multi line fields
+# ****************************************************************
+
+def test_parallel_parse_matches_single_process(tmp_path, monkeypatch):
+    df = make_crash_frame(1_000)
+    # narratives spanning several lines, with escaped quotes - most newlines of the file sit inside a field
+    df['STREET_NAME'] = df['STREET_NAME'] + ' "NEAR"\n' + 'UNIT BACKING FROM PARKING SPACE\n' * 8 + df['CRASH_RECORD_ID']
+    csvpath = str(tmp_path / 'narratives.csv')
+    df.to_csv(csvpath, index=False)
+
+    # the naive split, the first newline past the middle, would cut a narrative in two
+    header, ranges = csv_record_ranges(csvpath, 2)
+    with open(csvpath, 'rb') as f:
+        data = f.read()
+    middle = len(header) + (len(data) - len(header)) // 2
+    assert len(ranges) == 2 and ranges[0][1] != data.find(b'\n', middle) + 1
+
+    monkeypatch.setattr(etl, 'const_parallel_min_bytes', 1)
+    assert_frame_equal(read_crash_csv(csvpath, workers=2), read_crash_csv(csvpath, workers=1))
+
+
+# ****************************************************************
+# the fixed layout date parsing and calendar names against pd.to_datetime, day_name and month_name
+# ****************************************************************
+
+const_midnight_noon = ['01/01/2024 12:00:00 AM', '01/01/2024 12:59:59 AM', '06/30/2023 12:00:00 PM',
+                       '06/30/2023 12:30:15 PM', '12/31/2019 11:59:59 PM', '02/29/2024 01:00:00 AM']
+
+
+def _previous_calendar(dates: pd.Series) -> pd.DataFrame:
+    # what etl_crash_data derived before the fixed layout parsing
+    parsed = pd.to_datetime(dates, format=const_crash_date_format)
+    return pd.DataFrame({'CRASH_DATE': parsed, 'CRASH_YEAR': parsed.dt.year, 'CRASH_DAY_NAME': parsed.dt.day_name(),
+                         'CRASH_MONTH_NAME': parsed.dt.month_name()})
+
+
+@pytest.mark.parametrize('dates', [
+    const_midnight_noon,
+    # blank, missing and out of layout (unpadded) values take the pd.to_datetime fallback
+    const_midnight_noon + [np.nan, '', '3/9/2025 2:15:00 PM'],
+], ids=['fixed layout', 'fallback'])
+def test_calendar_fields_match_pandas(dates):
+    dates = pd.concat([pd.Series(dates, dtype=object),
+                       pd.Series(make_crash_frame(500)['CRASH_DATE'], dtype=object)], ignore_index=True)
+    expected = _previous_calendar(dates)
+
+    assert_series_equal(parse_crash_dates(dates), expected['CRASH_DATE'].astype('datetime64[ns]'), check_names=False)
+
+    df = etl_crash_data(pd.DataFrame({'CRASH_DATE': dates}))
+    assert_series_equal(df['CRASH_DATE'], expected['CRASH_DATE'].astype('datetime64[ns]'))
+    assert_series_equal(df['CRASH_YEAR'], expected['CRASH_YEAR'])
+    for column in ['CRASH_DAY_NAME', 'CRASH_MONTH_NAME']:
+        assert_series_equal(df[column].astype(object), expected[column].astype(object))
+
+
+# ****************************************************************
+# the projected, compact load holds the values of the full load with pandas' own dtypes
+# ****************************************************************
+
+def test_projected_compact_matches_full(tmp_path):
+    csvpath = write_crash_csv(3_000, str(tmp_path / 'crashes.csv'))
+    full = get_chicago_crash_data(csvpath, use_cache=False, compact=False, workers=1)
+
+    compact = get_chicago_crash_data(csvpath, use_cache=False, columns=const_plot_columns, workers=1)
+
+    # the requested columns and what the etl derives from them
+    assert sorted(compact.columns) == sorted(set(const_plot_columns) | {'CRASH_YEAR', 'CRASH_DAY_NAME',
+                                                                        'CRASH_MONTH_NAME'})
+    for column in const_category_columns:
+        assert isinstance(compact[column].dtype, pd.CategoricalDtype)
+    for column in const_injury_columns + ['CRASH_HOUR', 'CRASH_YEAR']:
+        assert pd.api.types.is_integer_dtype(compact[column]) and compact[column].dtype.itemsize <= 2, column
+
+    # the missing injury counts are filled with 0 either way
+    assert compact[const_injury_columns].notna().all().all()
+    assert full['INJURIES_TOTAL'].dtype == 'float64'
+    for column in compact.columns:
+        assert_series_equal(compact[column].astype(object), full[column].astype(object), check_dtype=False,
+                            obj=column)
@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules import export
+from modules.etl import get_chicago_crash_data
+from modules.export import export_figures, figure_matrix
+from modules.reusable import plot_crash_count_by_year, plot_crash_hour_of_day_vs_injuries_with_jitter
+
+
+# ****************************************************************
+# the batch export renders a figure again only when something it is drawn from changed
+# ****************************************************************
+
+@pytest.fixture(scope='module')
+def df(tmp_path_factory):
+    return get_chicago_crash_data(write_crash_csv(2_000, str(tmp_path_factory.mktemp('data') / 'crashes.csv')),
+                                  use_cache=False)
+
+
+def _export(df, outdir, minimalinjuries, **kwargs):
+    jobs = figure_matrix([plot_crash_count_by_year, plot_crash_hour_of_day_vs_injuries_with_jitter], [2020],
+                         minimalinjuries)
+    return export_figures(df, jobs, str(outdir), workers=1, progress=False, **kwargs)
+
+
+def test_unchanged_inputs_are_skipped(df, tmp_path):
+    first = _export(df, tmp_path, [1])
+    assert sorted(first['rendered']) == ['plot_crash_count_by_year',
+                                         'plot_crash_hour_of_day_vs_injuries_with_jitter_2020_injury1']
+    assert (tmp_path / 'plot_crash_count_by_year.png').exists()
+
+    again = _export(df, tmp_path, [1])
+    assert again['rendered'] == [] and len(again['skipped']) == 2
+
+
+def test_changed_arguments_render_again(df, tmp_path):
+    _export(df, tmp_path, [1])
+
+    # a new minimal injury renders its figure only, the others are unchanged
+    injuries = _export(df, tmp_path, [1, 2])
+    assert injuries['rendered'] == ['plot_crash_hour_of_day_vs_injuries_with_jitter_2020_injury2']
+
+    # a new resolution changes every file
+    assert len(_export(df, tmp_path, [1, 2], dpi=50)['rendered']) == 3
+
+
+def test_changed_modules_render_again(df, tmp_path, monkeypatch):
+    _export(df, tmp_path, [1])
+
+    # an edit to a helper the plots draw with (violins, density images, cube lookups, ...)
+    monkeypatch.setattr(export, '_modules_version', lambda: 'edited')
+    assert len(_export(df, tmp_path, [1])['rendered']) == 2
@@ -0,0 +1,31 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from benchmarks.bench_import import const_deferred_modules, const_probe, const_repo_root
+
+
+# ****************************************************************
+# importing the crash modules in a fresh interpreter loads no plotting, widget or http
+# library, makes no directory and stays quick
+# ****************************************************************
+
+# far above the import itself, only an eager library (or a download) coming back would reach it
+const_max_import_seconds = 10.0
+
+
+@pytest.mark.parametrize('statement', ['import modules.etl', 'import modules.reusable',
+                                       'import modules.etl, modules.reusable'])
+def test_import_defers_libraries(statement, tmp_path):
+    code = const_probe.format(statement=statement, deferred=const_deferred_modules)
+    # started in an empty directory, so anything made relative to it on import shows up there
+    output = subprocess.run([sys.executable, '-c', code], cwd=str(tmp_path), capture_output=True, text=True,
+                            check=True, env={**os.environ, 'PYTHONPATH': os.path.abspath(const_repo_root)})
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+
+    assert result['loaded'] == []
+    assert os.path.exists(tmp_path / 'assets' / 'data') == False
+    assert result['seconds'] < const_max_import_seconds
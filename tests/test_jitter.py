@@ -0,0 +1,34 @@
+import pandas as pd
+
+from modules.scatter import const_point_budget
+from modules.reusable import _injury_hour_points, prepare_dashboard
+from modules.etl import get_chicago_crash_data
+from benchmarks.synthetic import write_crash_csv
+
+
+# ****************************************************************
+# the jitter plot draws every crash unless the density image or the point budget is asked for
+# ****************************************************************
+
+def _over_budget() -> pd.Series:
+    index = pd.MultiIndex.from_tuples([(1, 8), (2, 17)], names=['INJURIES_TOTAL', 'CRASH_HOUR'])
+    return pd.Series([const_point_budget, 10], index=index)
+
+
+def test_default_scatters_every_crash():
+    points = _injury_hour_points(_over_budget(), 0.2)
+
+    assert points['mode'] == 'scatter'
+    assert len(points['x']) == const_point_budget + 10
+
+
+def test_budget_is_opt_in():
+    assert _injury_hour_points(_over_budget(), 0.2, 'auto')['mode'] == 'density'
+    assert len(_injury_hour_points(_over_budget(), 0.2, 'sample', 100)['x']) == 100
+
+
+def test_dashboard_default_scatters(tmp_path):
+    df = get_chicago_crash_data(write_crash_csv(2_000, str(tmp_path / 'crashes.csv')), use_cache=False)
+    panels = prepare_dashboard(df, 2020, 0, max_points=10, workers=1)
+
+    assert panels['injury_hours']['mode'] == 'scatter'
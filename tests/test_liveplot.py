@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules.cube import CrashCube
+from modules.etl import get_chicago_crash_data
+from modules.liveplot import LiveFigure
+from modules.reusable import LiveDashboard, LiveJitterPlot, LiveHourHistogram, LiveConditionHeatmap
+
+
+# ****************************************************************
+# LiveFigure is abstract - a subclass has to build and update its figure
+# ****************************************************************
+
+class BuildOnly(LiveFigure):
+
+    def _build(self, **params):
+        self.figure.add_subplot()
+
+
+class Bars(BuildOnly):
+
+    def _update(self, **params) -> bool:
+        return False
+
+
+def test_abstract():
+    with pytest.raises(TypeError):
+        LiveFigure((4, 3))
+    with pytest.raises(TypeError, match='_update'):
+        BuildOnly((4, 3))
+
+
+def test_subclass_renders():
+    live = Bars((4, 3), dpi=50)
+
+    live.render(year=2020)
+    live.render(year=2021)
+
+    assert live.counts['builds'] == 1
+    assert live.counts['rebuilds'] == 1
+
+
+# ****************************************************************
+# a live figure updated in place draws the same pixels as one built for the new parameters
+# ****************************************************************
+
+@pytest.fixture(scope='module')
+def crashes(tmp_path_factory):
+    df = get_chicago_crash_data(write_crash_csv(20_000, str(tmp_path_factory.mktemp('data') / 'crashes.csv')),
+                                use_cache=False)
+    return df, CrashCube.from_frame(df)
+
+
+def _render(live: LiveFigure, **params) -> np.ndarray:
+    # the jitter of the scatter points is random, both figures draw the same one
+    np.random.seed(521)
+    live.render(**params)
+    return np.asarray(live.canvas.buffer_rgba())
+
+
+# years whose crashes show the same weather and road conditions, so the heatmap is updated rather than built again
+@pytest.mark.parametrize('live, first, updates', [
+    (LiveJitterPlot, {'year': 2017, 'minimalinjury': 1},
+     [{'year': 2017, 'minimalinjury': 3}, {'year': 2020, 'minimalinjury': 3}]),
+    (LiveHourHistogram, {'year': 2017}, [{'year': 2020}, {'year': 2024}]),
+    (LiveConditionHeatmap, {'year': 2017}, [{'year': 2020}, {'year': 2024}]),
+    (LiveDashboard, {'year': 2017, 'minimalinjury': 1},
+     [{'year': 2017, 'minimalinjury': 3}, {'year': 2020, 'minimalinjury': 3}]),
+], ids=lambda value: getattr(value, '__name__', None))
+def test_update_matches_fresh_render(crashes, live, first, updates):
+    df, cube = crashes
+    updated = live(df, cube)
+    _render(updated, **first)
+
+    for params in updates:
+        pixels = _render(updated, **params)
+        assert np.array_equal(pixels, _render(live(df, cube), **params)), params
+
+    # every change was an update in place, and the figure was laid out only when it was built
+    assert updated.counts['builds'] == 1 and updated.counts['rebuilds'] == 0
+    assert updated.counts['full_draws'] == 1
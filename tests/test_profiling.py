@@ -0,0 +1,97 @@
+import json
+import time
+
+import pytest
+
+from modules.profiling import Profiler, profiled, profiler
+
+
+# ****************************************************************
+# nested spans and what they record, the reports built from the records, and nothing
+# recorded while profiling is off
+# ****************************************************************
+
+def _busy(seconds: float):
+    # cpu time, unlike a sleep
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def recorded():
+    profile = Profiler()
+    profile.enable()
+    try:
+        with profile.span('etl', 'outer'):
+            time.sleep(0.05)
+            with profile.span('aggregate', 'inner'):
+                _busy(0.1)
+                block = bytearray(10_000_000)
+                del block
+    finally:
+        profile.disable()
+    return profile
+
+
+def test_nested_spans(recorded):
+    inner, outer = recorded.records
+
+    assert (inner['name'], inner['depth']) == ('inner', 1)
+    assert (outer['name'], outer['depth']) == ('outer', 0)
+
+    assert outer['wall_seconds'] >= inner['wall_seconds'] + 0.05
+    # the parent's self time leaves out the time of its child
+    assert outer['self_seconds'] == pytest.approx(outer['wall_seconds'] - inner['wall_seconds'])
+    assert inner['self_seconds'] == inner['wall_seconds']
+
+    # the child spun the cpu, the parent slept apart from it
+    assert inner['cpu_seconds'] >= 0.05
+    assert outer['cpu_seconds'] - inner['cpu_seconds'] < 0.04
+
+    # the child's allocation peak counts for the parent too
+    assert inner['peak_bytes'] >= 10_000_000
+    assert outer['peak_bytes'] >= inner['peak_bytes']
+
+
+def test_reports(recorded):
+    frame = recorded.frame()
+    assert frame['name'].tolist() == ['inner', 'outer']
+    assert recorded.frame(start=1)['name'].tolist() == ['outer']
+
+    stats = recorded.stats()
+    assert stats.index.tolist() == ['aggregate', 'etl']
+    assert stats.loc['etl', 'wall_seconds'] == frame.loc[1, 'wall_seconds']
+    assert stats.loc['etl', 'peak_bytes'] == frame.loc[1, 'peak_bytes']
+    assert stats['spans'].tolist() == [1, 1]
+
+    summary = recorded.summary().splitlines()
+    assert len(summary) == 3 and summary[1].split()[:2] == ['aggregate', 'inner']
+    assert recorded.summary(start=recorded.mark()) == 'no spans recorded'
+
+
+def test_json_round_trip(recorded, tmp_path):
+    path = tmp_path / 'profile.json'
+    text = recorded.to_json(str(path))
+
+    loaded = json.loads(path.read_text())
+    assert loaded == json.loads(text)
+    assert loaded['spans'] == recorded.records
+    assert [stage['stage'] for stage in loaded['stages']] == ['aggregate', 'etl']
+
+
+def test_off_records_nothing():
+    profile = Profiler()
+    with profile.span('etl'):
+        pass
+    assert profile.records == [] and profile.enabled == False
+
+    # the shared profiler is off unless enabled, and decorated functions then only run
+    @profiled('aggregate')
+    def add(a, b):
+        return a + b
+
+    assert profiler.enabled == False
+    mark = profiler.mark()
+    assert add(1, 2) == 3
+    assert profiler.mark() == mark
@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib.figure
+import matplotlib.pyplot as plt
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules.etl import get_chicago_crash_data
+from modules.reusable import plot_crash_count_by_year, plot_histogram_crashes_by_year, \
+    plot_frequency_heatmap_weather_road_condition, create_dashboard
+from modules.rendercache import RenderCache, render_figure
+
+
+# ****************************************************************
+# render_figure on a render thread - the figures are drawn off pyplot, which is left alone
+# ****************************************************************
+
+@pytest.fixture(scope='module')
+def crashes(tmp_path_factory):
+    return get_chicago_crash_data(write_crash_csv(2_000, str(tmp_path_factory.mktemp('data') / 'crashes.csv')),
+                                  use_cache=False)
+
+
+@pytest.mark.parametrize('func, kwargs', [
+    (plot_crash_count_by_year, {}),
+    (plot_histogram_crashes_by_year, {'year': 2020}),
+    (plot_frequency_heatmap_weather_road_condition, {'year': 2020}),
+    (create_dashboard, {'year': 2020, 'workers': 1}),
+])
+def test_render_thread_leaves_pyplot_alone(crashes, func, kwargs):
+    plt.close('all')
+    current = plt.figure()
+    show = plt.show
+    rendered = []
+
+    thread = threading.Thread(target=lambda: rendered.append(render_figure(func, crashes, **kwargs)))
+    thread.start()
+    thread.join()
+
+    assert isinstance(rendered[0], matplotlib.figure.Figure)
+    assert len(rendered[0].axes) > 0
+    assert plt.get_fignums() == [current.number]
+    assert plt.gcf() is current
+    assert plt.show is show
+    plt.close('all')
+
+
+# ****************************************************************
+# one render cache shared by render threads drawing at once
+# ****************************************************************
+
+def test_shared_between_threads(crashes):
+    cache = RenderCache(max_entries=4, kind='png', dpi=20)
+    years = [2017, 2018, 2019, 2020, 2021, 2022] * 4
+
+    with ThreadPoolExecutor(4) as pool:
+        renders = list(pool.map(lambda year: cache.get(plot_histogram_crashes_by_year, crashes, year=year), years))
+
+    assert all(isinstance(png, bytes) for png in renders)
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == len(years)
+    assert stats['entries'] == len(cache) == 4
+    assert stats['bytes'] == sum(len(png) for png in cache._entries.values())
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules.etl import get_chicago_crash_data
+from modules.sample import CrashSample
+from modules.spatial import area_mask
+
+
+# ****************************************************************
+# a sample taken whole estimates the exact counts with no error, and any sample the exact total of its strata
+# ****************************************************************
+
+const_selections = [{}, {'year': 2020}, {'minimalinjury': 2}, {'year': 2021, 'minimalinjury': 1},
+                    {'area': (41.80, -87.75, 41.95, -87.60)}]
+
+
+@pytest.fixture(scope='module')
+def df(tmp_path_factory):
+    return get_chicago_crash_data(write_crash_csv(5_000, str(tmp_path_factory.mktemp('data') / 'crashes.csv')),
+                                  use_cache=False)
+
+
+def _selection(df, year: int = None, minimalinjury: int = None, area=None) -> pd.DataFrame:
+    mask = np.ones(len(df), dtype=bool)
+    if year is not None:
+        mask &= (df['CRASH_YEAR'] == year).to_numpy()
+    if minimalinjury is not None:
+        mask &= (df['INJURIES_TOTAL'] >= minimalinjury).to_numpy()
+    if area is not None:
+        mask &= area_mask(df['LATITUDE'].to_numpy(dtype='float64', na_value=np.nan),
+                          df['LONGITUDE'].to_numpy(dtype='float64', na_value=np.nan), area)
+    return df[mask]
+
+
+@pytest.mark.parametrize('selection', const_selections)
+def test_whole_sample_is_exact(df, selection):
+    sample = CrashSample.from_frame(df, fraction=1.0)
+    crashes = _selection(df, **selection)
+    hours = crashes['CRASH_HOUR'].value_counts().sort_index()
+
+    assert sample.total(**selection) == (len(crashes), 0.0)
+
+    counts = sample.counts(['CRASH_HOUR'], **selection)
+    assert np.array_equal(counts.index, hours.index)
+    assert np.allclose(counts['count'], hours.to_numpy()) and (counts['error'] == 0).all()
+
+    shares = sample.shares(['CRASH_HOUR'], **selection)
+    assert np.array_equal(shares.index, hours.index)
+    assert np.allclose(shares['share'], hours.to_numpy() / len(crashes))
+    assert np.allclose(shares['error'], 0)
+
+
+def test_partial_sample_totals_its_strata(df):
+    sample = CrashSample.from_frame(df, fraction=0.1, min_rows=5)
+    assert len(sample) < len(df)
+
+    # every crash of a stratum is in a selection of whole strata, so the estimate is exact
+    assert sample.total() == (len(df), 0.0)
+    for year in df['CRASH_YEAR'].unique():
+        count, error = sample.total(year=year)
+        assert np.isclose(count, (df['CRASH_YEAR'] == year).sum()) and np.isclose(error, 0)
+    shares = sample.shares(['CRASH_YEAR'])
+    assert np.isclose(shares['share'].sum(), 1.0) and np.allclose(shares['error'], 0)
@@ -0,0 +1,63 @@
+import time
+import threading
+
+import matplotlib.figure
+
+from modules.scheduler import RenderScheduler
+
+
+# ****************************************************************
+# closing a scheduler - every request gets its outcome and nothing is drawn afterwards
+# ****************************************************************
+
+def _plot(df, value=0, delay=0.0, pyplot=True):
+    time.sleep(delay)
+    return matplotlib.figure.Figure()
+
+
+def test_close_during_debounce():
+    scheduler = RenderScheduler(debounce=0.2)
+    scheduler.request(_plot, None, value=1)
+    scheduler.request(_plot, None, value=2)
+
+    scheduler.close()
+
+    assert scheduler.wait(timeout=1) == True
+    stats = scheduler.stats()
+    assert stats['in_flight'] == 0 and stats['superseded'] == 2
+
+    # the cancelled timers never submit to the stopped render thread
+    time.sleep(0.4)
+    assert scheduler.stats()['completed'] == 0
+
+
+def test_close_while_rendering():
+    scheduler = RenderScheduler(debounce=0)
+    scheduler.request(_plot, None, value=1, delay=0.5)
+    scheduler.request(_plot, None, value=2)
+
+    scheduler.close()
+
+    assert scheduler.wait(timeout=1) == True
+    # the running render finishes on its thread without being counted twice
+    time.sleep(0.7)
+    stats = scheduler.stats()
+    assert stats['requested'] == stats['superseded'] == 2
+    assert stats['in_flight'] == 0
+
+
+def test_requests_after_close_are_dropped():
+    errors = []
+    hook, threading.excepthook = threading.excepthook, lambda args: errors.append(args.exc_value)
+    try:
+        scheduler = RenderScheduler(debounce=0)
+        scheduler.close()
+        scheduler.request(_plot, None, value=1)
+        # a debounce timer that fired just as the scheduler closed
+        scheduler._submit(scheduler.generation, (_plot, None, (), {}))
+    finally:
+        threading.excepthook = hook
+
+    assert errors == []
+    assert scheduler.wait(timeout=1) == True
+    assert scheduler.stats()['superseded'] == 1
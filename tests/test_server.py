@@ -0,0 +1,62 @@
+import threading
+
+import matplotlib.figure
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules import server
+from modules.etl import get_chicago_crash_data
+from modules.scheduler import RenderScheduler
+from modules.server import CrashServer
+
+
+# ****************************************************************
+# CrashServer.load with the crash csv missing - it is downloaded first, or fails saying so
+# ****************************************************************
+
+def test_load_downloads_missing_csv(tmp_path, monkeypatch):
+    filepath = str(tmp_path / 'crashes.csv')
+    downloads = []
+
+    def download(storein):
+        downloads.append(storein)
+        write_crash_csv(300, storein)
+        return {'status': 'downloaded'}
+
+    monkeypatch.setattr(server, 'download_chicago_crashdata', download)
+    crashserver = CrashServer.load(filepath, str(tmp_path / 'cache'))
+
+    assert downloads == [filepath]
+    assert len(crashserver.df.frame) == 300
+
+
+def test_load_failed_download(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'download_chicago_crashdata', lambda storein: {'status': 'error'})
+
+    with pytest.raises(FileNotFoundError, match='could not be downloaded'):
+        CrashServer.load(str(tmp_path / 'crashes.csv'), str(tmp_path / 'cache'))
+
+
+# ****************************************************************
+# the sessions of a server render at the same time instead of queueing behind each other
+# ****************************************************************
+
+def test_sessions_render_in_parallel(tmp_path):
+    df = get_chicago_crash_data(write_crash_csv(300, str(tmp_path / 'crashes.csv')), use_cache=False)
+    crashserver = CrashServer(df, workers=2)
+    # each render only returns once the other one is drawing as well
+    barrier = threading.Barrier(2, timeout=10)
+
+    def plot(df, session, pyplot=True):
+        barrier.wait()
+        return matplotlib.figure.Figure()
+
+    schedulers = [RenderScheduler(debounce=0, executor=crashserver.executor, dispatch=lambda show: None)
+                  for _ in range(2)]
+    for session, scheduler in enumerate(schedulers):
+        scheduler.request(plot, crashserver.df, session=session)
+
+    for scheduler in schedulers:
+        assert scheduler.wait(20)
+        assert scheduler.stats()['completed'] == 1
+    crashserver.executor.shutdown()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from modules.spatial import SpatialIndex, area_mask, const_chicago_areas, const_chicago_extent, \
+    const_spatial_cell_degrees
+
+
+# ****************************************************************
+# the grid index answers every area with the rows a scan of all the coordinates finds
+# ****************************************************************
+
+@pytest.fixture(scope='module')
+def coordinates():
+    rng = np.random.default_rng(0)
+    south, west, north, east = const_chicago_extent
+    # crashes across and around the extent, some without a location
+    latitude = rng.uniform(south - 0.05, north + 0.05, 40_000)
+    longitude = rng.uniform(west - 0.05, east + 0.05, 40_000)
+    missing = rng.random(40_000) < 0.02
+    latitude[missing], longitude[missing] = np.nan, np.nan
+    # and some on the grid lines, where the cell of a crash and the edge of a box meet
+    lines = rng.integers(0, 40, (2, 500)) * const_spatial_cell_degrees
+    latitude[:500], longitude[:500] = south + lines[0], west + lines[1]
+    return latitude, longitude
+
+
+const_areas = list(const_chicago_areas.values()) + [
+    # boxes on cell boundaries, past the extent on each side, around all of it and wholly outside it
+    (const_chicago_extent[0] + 0.1, const_chicago_extent[1] + 0.1, const_chicago_extent[0] + 0.2,
+     const_chicago_extent[1] + 0.2),
+    (41.60, -88.00, 41.70, -87.80),
+    (41.95, -87.60, 42.10, -87.40),
+    (40.0, -89.0, 43.0, -86.0),
+    (43.0, -87.8, 43.5, -87.6),
+    (41.9, -87.6, 41.8, -87.7),
+    # circles inside, across the edge of and outside the extent
+    (41.88, -87.63, 2500.0),
+    (41.645, -87.94, 3000.0),
+    (42.05, -87.50, 4000.0),
+    (43.0, -87.0, 1000.0),
+]
+
+
+@pytest.mark.parametrize('area', const_areas)
+def test_query_matches_scan(coordinates, area):
+    latitude, longitude = coordinates
+    index = SpatialIndex(latitude, longitude)
+
+    assert np.array_equal(index.query(area), np.flatnonzero(area_mask(latitude, longitude, area)))
+
+
+def test_named_area_matches_its_bounds(coordinates):
+    index = SpatialIndex(*coordinates)
+
+    for name, area in const_chicago_areas.items():
+        assert np.array_equal(index.query(name), index.query(area)), name
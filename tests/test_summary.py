@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules.etl import get_chicago_crash_data
+from modules.summary import DistributionSummary
+
+
+# ****************************************************************
+# the moments of merged and subtracted summaries are the ones pandas computes on the rows left
+# ****************************************************************
+
+@pytest.fixture(scope='module')
+def df(tmp_path_factory):
+    return get_chicago_crash_data(write_crash_csv(3_000, str(tmp_path_factory.mktemp('data') / 'crashes.csv')),
+                                  use_cache=False)
+
+
+def _adjusted(moments: dict) -> tuple:
+    # DataFrame.skew and DataFrame.kurt are the sample (bias adjusted) estimators of the population moments
+    n, skewness, kurtosis = moments['n'], moments['skewness'], moments['kurtosis']
+    return (skewness * np.sqrt(n * (n - 1)) / (n - 2),
+            ((n + 1) * kurtosis + 6) * (n - 1) / ((n - 2) * (n - 3)))
+
+
+def _assert_matches(summary: DistributionSummary, rows):
+    hours = rows.groupby('CRASH_YEAR')['CRASH_HOUR']
+    assert summary.groups() == sorted(hours.groups)
+
+    for year, values in hours:
+        moments = summary.moments(year)
+        skewness, kurtosis = _adjusted(moments)
+        assert moments['n'] == len(values)
+        assert np.isclose(moments['mean'], values.mean())
+        assert np.isclose(moments['std'], values.std(ddof=0))
+        assert np.isclose(skewness, values.skew()), year
+        assert np.isclose(kurtosis, values.kurt()), year
+
+        edges, counts = summary.bin_counts(year)
+        expected = values.value_counts().sort_index()
+        assert np.array_equal(edges, expected.index) and np.array_equal(counts, expected.to_numpy())
+
+
+def test_merge_matches_pandas(df):
+    first, second = df.iloc[:2_000], df.iloc[2_000:]
+
+    merged = DistributionSummary.from_frame(first).merge(DistributionSummary.from_frame(second))
+
+    _assert_matches(merged, df)
+
+
+def test_subtract_matches_pandas(df):
+    removed = df.iloc[::7]
+
+    summary = DistributionSummary.from_frame(df).merge(DistributionSummary.from_frame(removed), sign=-1)
+
+    _assert_matches(summary, df.drop(index=removed.index))
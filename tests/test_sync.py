@@ -0,0 +1,172 @@
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from benchmarks.synthetic import write_crash_csv
+from modules.etl import sync_chicago_crashdata, get_chicago_crash_data, const_crash_date_format, \
+    const_export_date_columns
+from modules.datacache import load_cached_frame
+
+
+# ****************************************************************
+# sync_chicago_crashdata against a stubbed SODA endpoint - the high water mark query,
+# the CRASH_RECORD_ID merge of overlapping and updated records and the cache patch
+# ****************************************************************
+
+class SodaHandler(BaseHTTPRequestHandler):
+    """
+    Answers SODA csv queries with the records on the server, paged by $limit and $offset like the city's api.
+    The query parameters of every request are kept on the server for the tests to look at.
+    """
+
+    def do_GET(self):
+        params = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+        self.server.requests.append(params)
+        offset, limit = int(params.get('$offset', 0)), int(params.get('$limit', 1000))
+        body = self.server.records.iloc[offset:offset + limit].to_csv(index=False).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def soda_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SodaHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/resource/85ca-t3if.csv'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _soda_records(rows: pd.DataFrame) -> pd.DataFrame:
+    # rows of the export as the api returns them - lower case names and ISO timestamps
+    records = rows.copy()
+    for column in const_export_date_columns:
+        parsed = pd.to_datetime(records[column].where(records[column] != ''), format=const_crash_date_format)
+        records[column] = parsed.dt.strftime('%Y-%m-%dT%H:%M:%S.000').fillna('')
+    records.columns = [column.lower() for column in records.columns]
+    return records
+
+
+def test_sync_merges_new_and_updated_records(tmp_path, soda_server):
+    storein = write_crash_csv(600, str(tmp_path / 'crashes.csv'))
+    cache_dir = str(tmp_path / 'cache')
+    get_chicago_crash_data(storein, cache_dir=cache_dir)
+
+    store = pd.read_csv(storein, dtype=str, keep_default_na=False)
+    dates = pd.to_datetime(store['CRASH_DATE'], format=const_crash_date_format)
+    latest = store[dates == dates.max()]
+
+    # an older crash whose injuries were corrected after the export
+    updated = store[dates < dates.max()].iloc[[0]].copy()
+    updated['INJURIES_TOTAL'] = '7.0'
+
+    # three crashes after the high water mark, one of them repeated on the next page with a late correction
+    new = store.iloc[[1, 2, 3]].copy()
+    new['CRASH_RECORD_ID'] = ['new-1', 'new-2', 'new-3']
+    new['CRASH_DATE'] = (dates.max() + pd.to_timedelta([1, 2, 3], unit='h')).strftime(const_crash_date_format)
+    repeat = new.iloc[[2]].copy()
+    repeat['INJURIES_TOTAL'] = '2.0'
+
+    # the high water mark row comes back unchanged, as it does on every sync
+    soda_server.records = _soda_records(pd.concat([latest, updated, new, repeat], ignore_index=True))
+
+    stats = sync_chicago_crashdata(storein, soda_server.url, page_size=2, cache_dir=cache_dir)
+
+    # the $where starts at the newest local crash and the pages run until a short one
+    where = soda_server.requests[0]['$where']
+    assert where.startswith(f"crash_date >= '{dates.max():%Y-%m-%dT%H:%M:%S}'")
+    assert [request['$offset'] for request in soda_server.requests] == ['0', '2', '4', '6']
+
+    assert stats['status'] == 'synced'
+    assert stats['added'] == 3
+    assert stats['replaced'] == 1
+    assert stats['replaced_ids'] == set(updated['CRASH_RECORD_ID'])
+
+    # the merged csv - one copy of every crash, the updates applied
+    merged = pd.read_csv(storein, dtype=str, keep_default_na=False)
+    assert len(merged) == len(store) + 3
+    assert merged['CRASH_RECORD_ID'].is_unique
+    byid = merged.set_index('CRASH_RECORD_ID')
+    assert byid.loc[updated['CRASH_RECORD_ID'].iloc[0], 'INJURIES_TOTAL'] == '7.0'
+    assert byid.loc['new-3', 'INJURIES_TOTAL'] == '2.0'
+    assert set(store['CRASH_RECORD_ID']) | {'new-1', 'new-2', 'new-3'} == set(merged['CRASH_RECORD_ID'])
+
+    # the cache was patched to the new store, and holds what a full load of it gives
+    patched = load_cached_frame(storein, None, cache_dir)
+    assert patched is not None
+    assert_frame_equal(patched, get_chicago_crash_data(storein, use_cache=False))
+
+
+def test_sync_up_to_date(tmp_path, soda_server):
+    storein = write_crash_csv(200, str(tmp_path / 'crashes.csv'))
+    store = pd.read_csv(storein, dtype=str, keep_default_na=False)
+    dates = pd.to_datetime(store['CRASH_DATE'], format=const_crash_date_format)
+    soda_server.records = _soda_records(store[dates == dates.max()])
+
+    stats = sync_chicago_crashdata(storein, soda_server.url, cache_dir=str(tmp_path / 'cache'))
+
+    assert stats['status'] == 'up_to_date'
+    assert pd.read_csv(storein, dtype=str, keep_default_na=False).equals(store)
+
+
+def test_sync_appends_without_reading_the_store(tmp_path, soda_server, monkeypatch):
+    storein = write_crash_csv(400, str(tmp_path / 'crashes.csv'))
+    cache_dir = str(tmp_path / 'cache')
+    get_chicago_crash_data(storein, cache_dir=cache_dir)
+
+    store = pd.read_csv(storein, dtype=str, keep_default_na=False)
+    dates = pd.to_datetime(store['CRASH_DATE'], format=const_crash_date_format)
+    new = store.iloc[[1, 2, 3]].copy()
+    new['CRASH_RECORD_ID'] = ['new-1', 'new-2', 'new-3']
+    new['CRASH_DATE'] = (dates.max() + pd.to_timedelta([1, 2, 3], unit='h')).strftime(const_crash_date_format)
+
+    # the first sync finds the mark in the cache and records the rows stored at it
+    soda_server.records = _soda_records(pd.concat([store[dates == dates.max()], new.iloc[:2]], ignore_index=True))
+    assert sync_chicago_crashdata(storein, soda_server.url, cache_dir=cache_dir)['added'] == 2
+
+    with open(storein, 'rb') as f:
+        before = f.read()
+    reads = []
+    read_csv = pd.read_csv
+
+    def counted_read_csv(*args, **kwargs):
+        if kwargs.get('chunksize') is not None:
+            reads.append(args[0])
+        return read_csv(*args, **kwargs)
+
+    # the mark's row comes back unchanged with one new crash - appended, the store is not read
+    soda_server.records = _soda_records(new.iloc[1:])
+    monkeypatch.setattr(pd, 'read_csv', counted_read_csv)
+    stats = sync_chicago_crashdata(storein, soda_server.url, cache_dir=cache_dir)
+    monkeypatch.undo()
+
+    assert reads == []
+    assert stats['status'] == 'synced' and stats['added'] == 1 and stats['replaced'] == 0
+    with open(storein, 'rb') as f:
+        assert f.read().startswith(before)
+    assert_frame_equal(load_cached_frame(storein, None, cache_dir), get_chicago_crash_data(storein, use_cache=False))
+
+    # a correction of the row at the mark replaces the stored copy
+    corrected = new.iloc[[2]].copy()
+    corrected['INJURIES_TOTAL'] = '4.0'
+    soda_server.records = _soda_records(corrected)
+    stats = sync_chicago_crashdata(storein, soda_server.url, cache_dir=cache_dir)
+
+    assert stats['replaced_ids'] == {'new-3'} and stats['added'] == 0
+    merged = pd.read_csv(storein, dtype=str, keep_default_na=False)
+    assert len(merged) == len(store) + 3 and merged['CRASH_RECORD_ID'].is_unique
+    assert merged.set_index('CRASH_RECORD_ID').loc['new-3', 'INJURIES_TOTAL'] == '4.0'
+    assert_frame_equal(load_cached_frame(storein, None, cache_dir), get_chicago_crash_data(storein, use_cache=False))
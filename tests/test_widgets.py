@@ -0,0 +1,48 @@
+import pytest
+
+from benchmarks.synthetic import write_crash_csv
+from modules.etl import get_chicago_crash_data
+from modules.sample import load_crash_sample
+from modules.scheduler import RenderScheduler
+from modules.reusable import setup_interactive_jitter, setup_histogram_crashes_by_year, \
+    setup_heatmap_weather_road_condition_by_year, create_interactive_dashboard
+
+
+# ****************************************************************
+# the widget setups - drawn in the kernel unless asked for the background, and a sample they cannot
+# preview from is called out
+# ****************************************************************
+
+const_setups = [setup_interactive_jitter, setup_histogram_crashes_by_year, setup_heatmap_weather_road_condition_by_year,
+                create_interactive_dashboard]
+
+
+@pytest.fixture(scope='module')
+def crashes(tmp_path_factory):
+    csvpath = write_crash_csv(2_000, str(tmp_path_factory.mktemp('data') / 'crashes.csv'))
+    return csvpath, get_chicago_crash_data(csvpath, use_cache=False)
+
+
+@pytest.mark.parametrize('setup', const_setups)
+def test_defaults_draw_in_the_kernel(crashes, setup):
+    _, df = crashes
+    scheduler = RenderScheduler()
+
+    setup(df, scheduler=scheduler, display=False)
+
+    # the scheduler is only used with background=True
+    assert scheduler.stats()['requested'] == 0
+
+
+@pytest.mark.parametrize('setup', const_setups)
+@pytest.mark.parametrize('background, persistent', [(False, False), (True, True)])
+def test_unused_sample_warns(crashes, tmp_path, setup, background, persistent):
+    csvpath, df = crashes
+    sample = load_crash_sample(csvpath, df, str(tmp_path), 0.1)
+
+    scheduler = RenderScheduler()
+
+    with pytest.warns(UserWarning, match='sample previews need background=True and persistent=False'):
+        setup(df, background=background, persistent=persistent, scheduler=scheduler, display=False, sample=sample)
+    scheduler.wait(30)
+    scheduler.close()